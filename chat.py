@@ -1,7 +1,7 @@
 #!/usr/bin/env python3.11
 # chat.py — Haruka terminal chat with persistent memory
 
-import os, sys, json, time, requests, pathlib, datetime, glob
+import os, sys, json, time, uuid, requests, pathlib, datetime, glob
 from typing import TypedDict, List, Optional
 
 API = os.environ.get("HARUKA_API", "http://127.0.0.1:8000")
@@ -43,7 +43,8 @@ def newest_artifact_since(ts: float) -> Optional[pathlib.Path]:
     return max(files, key=lambda p: p.stat().st_mtime) if files else None
 
 def queue(intent: str, instruction: str, context: dict):
-    payload = {"intent": intent, "instruction": instruction, "context": context}
+    # the request_id puts chat turns in the interactive lane, ahead of scheduled batch work
+    payload = {"intent": intent, "instruction": instruction, "context": context, "request_id": uuid.uuid4().hex}
     r = requests.post(f"{API}/task", headers={"content-type":"application/json"}, data=json.dumps(payload), timeout=30)
     r.raise_for_status()
     return r.json()
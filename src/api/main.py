@@ -1,15 +1,64 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict
-import redis
-import json
+from contextlib import asynccontextmanager
+import redis.asyncio as aioredis
 import uuid
 import os
+import asyncio
 from datetime import datetime
+from task_queue import enqueue
+from task_status import record_queued, get_task_status, get_week_counts
+from task_events import stream_task_events
+from result_codec import result_key, decode_result
+
+# Shared async Redis clients, created at startup and closed at shutdown.
+# Request handlers borrow from a bounded pool and wait (up to
+# REDIS_POOL_TIMEOUT) when it is exhausted instead of erroring. Pub/sub
+# subscriptions for /tasks/stream hold their connection for the whole
+# stream, so they get a pool of their own. Task results are binary
+# (see result_codec.py) and are read through a non-decoding client.
+REDIS_POOL_SIZE = int(os.getenv('REDIS_POOL_SIZE', '50'))
+REDIS_POOL_TIMEOUT = float(os.getenv('REDIS_POOL_TIMEOUT', '5'))
+redis_client: Optional[aioredis.Redis] = None
+pubsub_client: Optional[aioredis.Redis] = None
+result_client: Optional[aioredis.Redis] = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global redis_client, pubsub_client, result_client
+    redis_host = os.getenv('REDIS_HOST', 'redis')
+    pool = aioredis.BlockingConnectionPool(
+        host=redis_host,
+        port=6379,
+        decode_responses=True,
+        max_connections=REDIS_POOL_SIZE,
+        timeout=REDIS_POOL_TIMEOUT
+    )
+    pubsub_pool = aioredis.ConnectionPool(host=redis_host, port=6379, decode_responses=True)
+    result_pool = aioredis.BlockingConnectionPool(
+        host=redis_host,
+        port=6379,
+        max_connections=REDIS_POOL_SIZE,
+        timeout=REDIS_POOL_TIMEOUT
+    )
+    redis_client = aioredis.Redis(connection_pool=pool)
+    pubsub_client = aioredis.Redis(connection_pool=pubsub_pool)
+    result_client = aioredis.Redis(connection_pool=result_pool)
+    try:
+        yield
+    finally:
+        await redis_client.aclose()
+        await pubsub_client.aclose()
+        await result_client.aclose()
+        await pool.disconnect()
+        await pubsub_pool.disconnect()
+        await result_pool.disconnect()
 
 # Create the FastAPI app FIRST
-app = FastAPI(title="Nanika - CalmOps Assistant")
+app = FastAPI(title="Nanika - CalmOps Assistant", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -20,18 +69,57 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Redis connection
-redis_client = redis.Redis(
-    host=os.getenv('REDIS_HOST', 'redis'),
-    port=6379,
-    decode_responses=True
-)
+WEEK_TASKS = {
+    1: ['validate_problem', 'create_framework'],
+    2: ['generate_landing', 'find_pilots'],
+    3: ['setup_operations'],
+    4: ['create_case_study', 'launch_content'],
+    5: ['develop_referrals', 'scale_outreach'],
+    6: ['scale_outreach'],
+    7: ['close_full_price']
+}
+
+TASK_TYPES = sorted({task_type for tasks in WEEK_TASKS.values() for task_type in tasks})
+TARGET_MARKETS = ['new_york', 'new_jersey', 'south_florida', 'los_angeles']
+MAX_BULK_TASKS = int(os.getenv('MAX_BULK_TASKS', '1000'))
+
+def new_task(task_type: str, week: int, market: str, pin_market: bool = False) -> Dict:
+    task = {
+        'id': str(uuid.uuid4()),
+        'type': task_type,
+        'week': week,
+        'market': market,
+        'timestamp': datetime.now().isoformat()
+    }
+    # scale_outreach sweeps every market unless the caller asked for one
+    if pin_market:
+        task['markets'] = [market]
+    return task
+
+def check_markets(markets: List[str], allow_all: bool = False):
+    unknown = [m for m in markets if m not in TARGET_MARKETS and not (allow_all and m == 'all')]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown markets: {unknown}")
+
+async def submit_tasks(tasks: List[Dict]):
+    """Enqueue tasks together with their status records in one transaction"""
+    async with redis_client.pipeline(transaction=True) as pipe:
+        for task in tasks:
+            enqueue(pipe, 'nanika_queue', task)
+            record_queued(pipe, 'nanika_queue', task)
+        await pipe.execute()
 
 # Request models
 class CalmOpsValidationRequest(BaseModel):
     market: str = "all"
     week: int = 1
 
+class BulkSubmitRequest(BaseModel):
+    # Empty task_types means "each week's scheduled tasks"; markets may include "all"
+    task_types: List[str] = []
+    markets: List[str] = ["new_york"]
+    weeks: List[int] = [1]
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -43,7 +131,7 @@ async def root():
 @app.get("/health")
 async def health():
     try:
-        redis_client.ping()
+        await redis_client.ping()
         return {"status": "healthy", "redis": "connected"}
     except:
         return {"status": "unhealthy", "redis": "disconnected"}
@@ -58,7 +146,7 @@ async def validate_problem(request: CalmOpsValidationRequest):
         'timestamp': datetime.now().isoformat()
     }
     
-    redis_client.lpush('nanika_queue', json.dumps(task))
+    await submit_tasks([task])
     
     return {
         'task_id': task['id'],
@@ -67,34 +155,21 @@ async def validate_problem(request: CalmOpsValidationRequest):
     }
 
 @app.post("/calmops/execute-week/{week_number}")
-async def execute_week_tasks(week_number: int):
+async def execute_week_tasks(week_number: int, market: Optional[str] = None):
     """Execute all tasks for a given week"""
+    if market is not None:
+        check_markets([market])
     
-    week_tasks = {
-        1: ['validate_problem', 'create_framework'],
-        2: ['generate_landing', 'find_pilots'],
-        3: ['setup_operations'],
-        4: ['create_case_study', 'launch_content'],
-        5: ['develop_referrals', 'scale_outreach'],
-        6: ['scale_outreach'],
-        7: ['close_full_price']
-    }
-    
-    tasks = week_tasks.get(week_number, [])
+    tasks = WEEK_TASKS.get(week_number, [])
     if not tasks:
         return {"error": f"No tasks defined for week {week_number}"}
     
-    task_ids = []
-    for task_type in tasks:
-        task = {
-            'id': str(uuid.uuid4()),
-            'type': task_type,
-            'week': week_number,
-            'market': 'new_york',
-            'timestamp': datetime.now().isoformat()
-        }
-        redis_client.lpush('nanika_queue', json.dumps(task))
-        task_ids.append({'task_type': task_type, 'task_id': task['id']})
+    queued = [
+        new_task(task_type, week_number, market or 'new_york', pin_market=market is not None)
+        for task_type in tasks
+    ]
+    await submit_tasks(queued)
+    task_ids = [{'task_type': task['type'], 'task_id': task['id']} for task in queued]
     
     return {
         'week': week_number,
@@ -103,23 +178,59 @@ async def execute_week_tasks(week_number: int):
         'message': f'Week {week_number} tasks queued for processing'
     }
 
+@app.post("/calmops/bulk")
+async def bulk_submit(request: BulkSubmitRequest):
+    """Queue task types x markets x weeks in a single Redis transaction"""
+    unknown = [task_type for task_type in request.task_types if task_type not in TASK_TYPES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown task types: {unknown}")
+    check_markets(request.markets, allow_all=True)
+    
+    markets = []
+    for market in request.markets:
+        for m in (TARGET_MARKETS if market == 'all' else [market]):
+            if m not in markets:
+                markets.append(m)
+    
+    # Markets the caller listed pin each task to its market; the default does not
+    pin = 'markets' in request.model_fields_set
+    queued = [
+        new_task(task_type, week, market, pin_market=pin)
+        for week in request.weeks
+        for task_type in (request.task_types or WEEK_TASKS.get(week, []))
+        for market in markets
+    ]
+    if not queued:
+        raise HTTPException(status_code=400, detail="Nothing to queue")
+    if len(queued) > MAX_BULK_TASKS:
+        raise HTTPException(status_code=400, detail=f"{len(queued)} tasks exceeds the limit of {MAX_BULK_TASKS}")
+    
+    await submit_tasks(queued)
+    
+    return {
+        'tasks_queued': len(queued),
+        'task_ids': [
+            {'task_type': t['type'], 'market': t['market'], 'week': t['week'], 'task_id': t['id']}
+            for t in queued
+        ],
+        'message': f'{len(queued)} tasks queued across {len(markets)} market(s) and {len(request.weeks)} week(s)'
+    }
+
 @app.get("/calmops/week-status/{week_number}")
 async def get_week_status(week_number: int):
     """Check status of all tasks for a week"""
     
-    week_tasks = {
-        1: ['validate_problem', 'create_framework'],
-        2: ['generate_landing', 'find_pilots'],
-        3: ['setup_operations'],
-        4: ['create_case_study', 'launch_content'],
-        5: ['develop_referrals', 'scale_outreach'],
-        6: ['scale_outreach'],
-        7: ['close_full_price']
-    }
+    expected_tasks = WEEK_TASKS.get(week_number, [])
+    counts = await get_week_counts(redis_client, week_number)
     
-    expected_tasks = week_tasks.get(week_number, [])
-    completed = []
-    pending = expected_tasks.copy()
+    # A task type is complete once it has run and nothing of that type is still queued or running
+    completed = [
+        task_type for task_type in expected_tasks
+        if task_type in counts
+        and counts[task_type]['done'] > 0
+        and counts[task_type]['queued'] + counts[task_type]['running'] == 0
+    ]
+    pending = [task_type for task_type in expected_tasks if task_type not in completed]
     
     progress = (len(completed) / len(expected_tasks) * 100) if expected_tasks else 0
     
@@ -128,24 +239,78 @@ async def get_week_status(week_number: int):
         'tasks_completed': completed,
         'tasks_pending': pending,
         'overall_progress': f'{progress:.0f}%',
-        'total_tasks': len(expected_tasks)
+        'total_tasks': len(expected_tasks),
+        'status_counts': counts
+    }
+
+@app.get("/search/cache-stats")
+async def search_cache_stats():
+    """Hit/miss counters of the workers' shared Serper cache"""
+    stats = await redis_client.hgetall('search_cache:stats')
+    hits, misses = int(stats.get('hits', 0)), int(stats.get('misses', 0))
+    # led: calls actually made; joined: callers served by an identical call in flight
+    flights = await redis_client.hgetall('single_flight:stats')
+    # {sweep}:new / {sweep}:seen: results incremental sweeps processed or skipped
+    seen = await redis_client.hgetall('seen_filter:stats')
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': f'{hits / (hits + misses) * 100:.0f}%' if hits + misses else 'n/a',
+        'single_flight': {field: int(value) for field, value in flights.items()},
+        'seen_filter': {field: int(value) for field, value in seen.items()}
     }
 
+@app.get("/calmops/call-costs")
+async def call_costs():
+    """External call totals per task handler, as counted by the workers"""
+    handlers = sorted(await redis_client.smembers('call_costs:handlers'))
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for handler in handlers:
+            pipe.hgetall(f'call_costs:{handler}')
+        totals = await pipe.execute()
+    
+    report = {}
+    for handler, fields in zip(handlers, totals):
+        tasks = int(fields.pop('tasks', 0))
+        counters = {field: float(value) if field.endswith(':seconds') else int(value) for field, value in fields.items()}
+        calls = sum(value for field, value in counters.items() if field.endswith(':calls'))
+        report[handler] = {
+            'tasks': tasks,
+            'calls_per_task': round(calls / tasks, 1) if tasks else 0,
+            'totals': counters
+        }
+    return report
+
 @app.get("/task/{task_id}")
 async def get_task_result(task_id: str):
     """Get results of a queued task"""
-    result = redis_client.get(f'result:{task_id}')
+    raw = await result_client.get(result_key(task_id))
+    result = await asyncio.to_thread(decode_result, raw) if raw else None
+    
+    if result is not None:
+        return result
     
-    if result:
-        return json.loads(result)
-    else:
-        queue_length = redis_client.llen('nanika_queue')
+    status = await get_task_status(redis_client, 'nanika_queue', task_id)
+    if not status:
         return {
             'task_id': task_id,
-            'status': 'pending',
-            'queue_position': queue_length,
-            'message': 'Task is still processing or not found'
+            'status': 'not_found',
+            'message': 'No task with this id, or its record has expired'
         }
+    return status
+
+@app.get("/tasks/stream")
+async def stream_tasks(ids: str = Query(..., description="Comma-separated task ids")):
+    """Push progress and results for one or more tasks as server-sent events"""
+    task_ids = [task_id.strip() for task_id in ids.split(',') if task_id.strip()]
+    if not task_ids:
+        raise HTTPException(status_code=400, detail="No task ids given")
+    
+    return StreamingResponse(
+        stream_task_events(pubsub_client, result_client, task_ids),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 if __name__ == "__main__":
     import uvicorn
@@ -2,9 +2,10 @@ from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 from pydantic import BaseModel
+from typing import Optional
+from task_queue import enqueue
 import os
 import redis
-import json
 import pathlib
 import datetime
 
@@ -19,6 +20,8 @@ class Task(BaseModel):
     intent: str
     instruction: str
     context: dict = {}
+    # set by interactive callers (chat) so the task goes to the fast lane
+    request_id: Optional[str] = None
 
 @app.get("/health")
 def health():
@@ -27,8 +30,8 @@ def health():
 @app.post("/task")
 def task(t: Task):
     payload = t.model_dump()
-    r.lpush("nanika:tasks", json.dumps(payload))
-    return {"queued": True}
+    enqueue(r, "nanika:tasks", payload)
+    return {"queued": True, "request_id": payload["request_id"]}
 
 @app.get("/latest")
 def latest():
@@ -0,0 +1,35 @@
+import os
+import json
+import zlib
+import msgpack
+from pathlib import Path
+from typing import Dict, Optional
+
+# Decoder for task results written by src/worker/result_codec.py: inline
+# zlib-compressed msgpack, a reference to a blob file on the shared /data
+# volume, or a plain JSON string from older workers.
+RESULT_BLOB_DIR = Path(os.getenv('RESULT_BLOB_DIR', '/data/results'))
+
+INLINE_PREFIX = b'\x00nkz'
+BLOB_PREFIX = b'\x00nkb'
+
+
+def result_key(task_id: str) -> str:
+    return f"result:{task_id}"
+
+
+def decode_result(raw) -> Optional[Dict]:
+    """Decode a raw result:{id} value; does blocking file I/O for blob results"""
+    if raw is None:
+        return None
+    if isinstance(raw, str):
+        raw = raw.encode()
+    if raw.startswith(INLINE_PREFIX):
+        return msgpack.unpackb(zlib.decompress(raw[len(INLINE_PREFIX):]), raw=False)
+    if raw.startswith(BLOB_PREFIX):
+        path = RESULT_BLOB_DIR / raw[len(BLOB_PREFIX):].decode()
+        try:
+            return msgpack.unpackb(zlib.decompress(path.read_bytes()), raw=False)
+        except FileNotFoundError:
+            return None
+    return json.loads(raw)
@@ -0,0 +1,54 @@
+import json
+import asyncio
+from typing import AsyncIterator, List
+from result_codec import result_key, decode_result
+
+KEEPALIVE_SECONDS = 15
+
+
+def task_channel(task_id: str) -> str:
+    return f"task_events:{task_id}"
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _load_result(result_client, task_id: str):
+    raw = await result_client.get(result_key(task_id))
+    return await asyncio.to_thread(decode_result, raw) if raw else None
+
+
+async def stream_task_events(client, result_client, task_ids: List[str]) -> AsyncIterator[str]:
+    """Server-sent events for many tasks over one connection.
+
+    Emits every progress event the worker publishes and a final 'done' event
+    (with the result) per task, then closes once all tasks are done.
+    """
+    pubsub = client.pubsub()
+    await pubsub.subscribe(*[task_channel(task_id) for task_id in task_ids])
+    pending = set(task_ids)
+    try:
+        # Tasks that finished before we subscribed will never publish again
+        existing = await result_client.mget([result_key(task_id) for task_id in task_ids])
+        for task_id, raw in zip(task_ids, existing):
+            if raw:
+                pending.discard(task_id)
+                result = await asyncio.to_thread(decode_result, raw)
+                yield _sse('done', {'task_id': task_id, 'event': 'done', 'result': result})
+
+        while pending:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=KEEPALIVE_SECONDS)
+            if message is None:
+                yield ": keepalive\n\n"
+                continue
+            event = json.loads(message['data'])
+            if event['event'] == 'done':
+                if event['task_id'] not in pending:
+                    continue
+                pending.discard(event['task_id'])
+                event['result'] = await _load_result(result_client, event['task_id'])
+            yield _sse(event['event'], event)
+    finally:
+        await pubsub.unsubscribe()
+        await pubsub.aclose()
@@ -0,0 +1,30 @@
+import os
+import json
+
+# Must match QUEUE_BACKEND on the worker side: 'list' (lpush/brpop) or
+# 'streams' (Redis Stream read through a consumer group).
+QUEUE_BACKEND = os.getenv('QUEUE_BACKEND', 'list')
+
+
+def task_lane(task: dict) -> str:
+    """Tasks carrying a request_id have someone waiting on them"""
+    return 'interactive' if task.get('request_id') else 'batch'
+
+
+def lane_key(name: str, lane: str) -> str:
+    return f"{name}:interactive" if lane == 'interactive' else name
+
+
+def stream_key(name: str) -> str:
+    return f"{name}:stream"
+
+
+def enqueue(client, name: str, task: dict):
+    """Add a task to its lane of the named queue using the configured backend.
+
+    Works on sync clients and on pipelines of either kind.
+    """
+    key = lane_key(name, task_lane(task))
+    if QUEUE_BACKEND == 'streams':
+        return client.xadd(stream_key(key), {'task': json.dumps(task)})
+    return client.lpush(key, json.dumps(task))
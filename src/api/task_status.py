@@ -0,0 +1,91 @@
+import os
+import time
+from datetime import datetime
+from typing import Dict, Optional
+from task_queue import lane_key, task_lane
+
+# Status records shared with the worker (see src/worker/task_status.py):
+#   task:{id}              hash: status, type, week, lane, enqueued/started/finished times
+#   queue_index:{lane key} zset of queued task ids scored by enqueue time
+#   week_progress:{week}   hash of '{type}:{status}' counters
+#   task_durations         hash holding a moving average of task run time
+STATUS_TTL = 7 * 24 * 3600
+STATUSES = ('queued', 'running', 'done', 'failed')
+
+# Total tasks the worker fleet runs at once (replicas x WORKER_CONCURRENCY),
+# used to turn a queue position into a wait estimate.
+WORKER_SLOTS = max(1, int(os.getenv('WORKER_SLOTS', '1')))
+
+
+def status_key(task_id: str) -> str:
+    return f"task:{task_id}"
+
+
+def week_key(week) -> str:
+    return f"week_progress:{week}"
+
+
+def queue_index_key(name: str, lane: str) -> str:
+    return f"queue_index:{lane_key(name, lane)}"
+
+
+def record_queued(pipe, name: str, task: dict):
+    """Queue the status writes for a new task on a pipeline"""
+    lane = task_lane(task)
+    now = time.time()
+    pipe.hset(status_key(task['id']), mapping={
+        'status': 'queued',
+        'type': task['type'],
+        'week': task.get('week', 'none'),
+        'lane': lane,
+        'enqueued_at': now
+    })
+    pipe.expire(status_key(task['id']), STATUS_TTL)
+    pipe.zadd(queue_index_key(name, lane), {task['id']: now})
+    pipe.hincrby(week_key(task.get('week', 'none')), f"{task['type']}:queued", 1)
+
+
+def _iso(value) -> Optional[str]:
+    return datetime.fromtimestamp(float(value)).isoformat() if value else None
+
+
+async def get_task_status(client, name: str, task_id: str) -> Optional[Dict]:
+    """Status record plus queue position and wait estimate for queued tasks"""
+    record = await client.hgetall(status_key(task_id))
+    if not record:
+        return None
+
+    status = {
+        'task_id': task_id,
+        'status': record['status'],
+        'type': record.get('type'),
+        'week': record.get('week'),
+        'enqueued_at': _iso(record.get('enqueued_at')),
+        'started_at': _iso(record.get('started_at')),
+        'finished_at': _iso(record.get('finished_at'))
+    }
+    if record['status'] == 'queued':
+        lane = record.get('lane', 'batch')
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.zrank(queue_index_key(name, lane), task_id)
+            pipe.zcard(queue_index_key(name, 'interactive'))
+            pipe.hget('task_durations', 'avg_seconds')
+            rank, interactive_waiting, avg_seconds = await pipe.execute()
+        if rank is not None:
+            # Batch tasks also wait behind whatever is in the interactive lane
+            position = rank + 1 + (interactive_waiting if lane == 'batch' else 0)
+            status['queue_position'] = position
+            if avg_seconds:
+                status['estimated_wait_seconds'] = round(position * float(avg_seconds) / WORKER_SLOTS)
+    elif record['status'] == 'running' and record.get('started_at'):
+        status['running_seconds'] = round(time.time() - float(record['started_at']))
+    return status
+
+
+async def get_week_counts(client, week) -> Dict[str, Dict[str, int]]:
+    """Per task type status counts for a week, from a single hash read"""
+    counts: Dict[str, Dict[str, int]] = {}
+    for field, value in (await client.hgetall(week_key(week))).items():
+        task_type, _, status = field.rpartition(':')
+        counts.setdefault(task_type, dict.fromkeys(STATUSES, 0))[status] = int(value)
+    return counts
@@ -0,0 +1,83 @@
+import threading
+import contextvars
+from typing import Dict, Optional
+
+# Per-task accounting of external calls. A ledger is made current when a task
+# starts (like the checkpoint memo) and every search and generation call made
+# while it runs is counted into it, whichever helper makes the call:
+#   search:{backend}   calls, errors, bytes, seconds
+#   generate:{model}   calls, errors, bytes, seconds, tokens (Ollama eval_count)
+#   saved              calls avoided, by source: cache, checkpoint, coalesced
+# The totals go into the task result under 'external_calls' and are added to
+# the call_costs:{task type} hash so expensive handlers show up over time.
+COSTS_PREFIX = 'call_costs'
+HANDLERS_KEY = f"{COSTS_PREFIX}:handlers"
+
+_current: contextvars.ContextVar = contextvars.ContextVar('call_costs', default=None)
+_lock = threading.Lock()
+
+
+def begin() -> Dict:
+    ledger = {'calls': {}, 'saved': {}}
+    _current.set(ledger)
+    return ledger
+
+
+def record(kind: str, target: str, seconds: float, size: int = 0, ok: bool = True, tokens: int = 0):
+    """Count one external call against the current task, if any"""
+    ledger = _current.get()
+    if ledger is None:
+        return
+    with _lock:
+        entry = ledger['calls'].setdefault(
+            f"{kind}:{target}", {'calls': 0, 'errors': 0, 'bytes': 0, 'seconds': 0.0, 'tokens': 0}
+        )
+        entry['calls'] += 1
+        entry['errors'] += 0 if ok else 1
+        entry['bytes'] += size
+        entry['seconds'] += seconds
+        entry['tokens'] += tokens
+
+
+def saved(source: str):
+    """Count a call that was answered without going out (cache, checkpoint, coalesced)"""
+    ledger = _current.get()
+    if ledger is None:
+        return
+    with _lock:
+        ledger['saved'][source] = ledger['saved'].get(source, 0) + 1
+
+
+def summary(ledger: Optional[Dict]) -> Dict:
+    """Ledger in the shape attached to task results"""
+    if not ledger:
+        return {}
+    calls = {
+        name: dict(entry, seconds=round(entry['seconds'], 3))
+        for name, entry in sorted(ledger['calls'].items())
+    }
+    return {
+        'calls': calls,
+        'saved': dict(ledger['saved']),
+        'total_calls': sum(entry['calls'] for entry in calls.values()),
+        'total_seconds': round(sum(entry['seconds'] for entry in calls.values()), 3)
+    }
+
+
+def flush(client, task_type: str, ledger: Optional[Dict]):
+    """Add a finished task's ledger to the per-handler totals in Redis.
+
+    Works with both redis clients; on redis.asyncio await the return value.
+    """
+    key = f"{COSTS_PREFIX}:{task_type}"
+    pipe = client.pipeline(transaction=False)
+    pipe.sadd(HANDLERS_KEY, task_type)
+    pipe.hincrby(key, 'tasks', 1)
+    for name, entry in (ledger or {}).get('calls', {}).items():
+        for field in ('calls', 'errors', 'bytes', 'tokens'):
+            if entry[field]:
+                pipe.hincrby(key, f"{name}:{field}", entry[field])
+        pipe.hincrbyfloat(key, f"{name}:seconds", round(entry['seconds'], 3))
+    for source, count in (ledger or {}).get('saved', {}).items():
+        pipe.hincrby(key, f"saved:{source}", count)
+    return pipe.execute()
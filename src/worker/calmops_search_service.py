@@ -1,10 +1,29 @@
 import os
-import requests
 import json
-from typing import Dict, List, Optional
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
 from datetime import datetime
 from enum import Enum
-import time
+import checkpoint
+import call_costs
+from search_cache import SearchCache, cache_key
+from single_flight import SingleFlight
+from search_backends import SearchRouter
+from signals import PILOT_SIGNALS, VALIDATION_SIGNALS
+from entities import EntityIndex
+from prospect_store import ProspectStore
+from seen_filter import SEARCH_INCREMENTAL, SeenFilter
+from scoring import best_per_key, pilot_scores, rank, score_validation_results
+from contacts import (
+    CONTACT_LOOKUP, CONTACT_RESULTS, DECISION_MAKER_ROLES, ContactCache,
+    contact_query, decision_makers, name_from_title, parse_contacts
+)
+
+# Searches that fan out (markets x queries, companies x roles) run on up to
+# this many threads at once. Results are always merged in input order, so
+# the output does not depend on which request happens to finish first.
+SEARCH_FANOUT = max(1, int(os.getenv('SEARCH_FANOUT', '8')))
 
 class CalmOpsPriority(Enum):
     """Aligned with your top 10 priorities for CalmOps"""
@@ -18,8 +37,15 @@ class CalmOpsPriority(Enum):
 
 class CalmOpsSearchService:
     def __init__(self):
-        self.api_key = os.getenv('8c05dfce5bdd4f7a982c7c4604208a44e2502179Y')
-        self.base_url = "https://google.serper.dev/search"
+        self.api_key = os.getenv('SERPER_API_KEY')
+        self.cache = SearchCache()
+        self.search = SearchRouter(serper_api_key=self.api_key)
+        self.contacts = ContactCache()
+        self.entities = EntityIndex()
+        self.store = ProspectStore()
+        self.seen_validate = SeenFilter('validate')
+        self.seen_outreach = SeenFilter('outreach')
+        self.flights = SingleFlight('serper')
         
         # Target markets - avoiding SF
         self.target_markets = {
@@ -45,15 +71,21 @@ class CalmOpsSearchService:
             }
         }
         
-    def validate_problem_search(self, market: str = 'all', week_number: int = 1) -> Dict:
+    def validate_problem_search(self, market: str = 'all', week_number: int = 1,
+                               incremental: Optional[bool] = None) -> Dict:
         """
         Week 1 Priority: Find 10 target prospects with visible workflow challenges
+        
+        Incremental runs (SEARCH_INCREMENTAL) only process results no earlier run has seen.
         """
+        incremental = SEARCH_INCREMENTAL if incremental is None else incremental
         results = {
             'priority': 'VALIDATE_PROBLEM',
             'week': week_number,
             'prospects': [],
-            'decision_makers': []
+            'decision_makers': [],
+            'incremental': incremental,
+            'skipped_seen': 0
         }
         
         # Determine which markets to search
@@ -63,6 +95,7 @@ class CalmOpsSearchService:
             markets_to_search = [market] if market in self.target_markets else ['new_york']
         
         # Search queries for finding companies with workflow pain
+        searches = []
         for market_key in markets_to_search:
             market_config = self.target_markets[market_key]
             
@@ -72,26 +105,37 @@ class CalmOpsSearchService:
                 f"Series A Series B companies {market_config['query_suffix']} hiring creative",
                 f"fast growing startups {market_config['query_suffix']} marketing team",
             ]
-            
-            for query in validation_queries:
-                try:
-                    search_results = self._search(query)
-                    prospects = self._extract_validation_prospects(search_results, market_key)
-                    results['prospects'].extend(prospects)
-                    time.sleep(0.5)  # Rate limiting
-                except Exception as e:
-                    print(f"Search error for query '{query}': {e}")
+            searches.extend((market_key, query) for query in validation_queries)
+        
+        def run_search(search):
+            market_key, query = search
+            try:
+                search_results = self._search(query, profile='bulk')
+                return [(result, market_key) for result in search_results.get('organic', [])]
+            except Exception as e:
+                print(f"Search error for query '{query}': {e}")
+                return []
+        
+        # Every result from the sweep is scored in one batch
+        rows = [row for found in self._fan_out(run_search, searches) for row in found]
+        results['prospects'] = self._validation_prospects(rows)
                     
         # Deduplicate and score
         results['prospects'] = self._score_validation_prospects(results['prospects'])
+        if incremental:
+            fresh = self.seen_validate.check(results['prospects'])
+            results['skipped_seen'] = len(results['prospects']) - sum(fresh)
+            results['prospects'] = [prospect for prospect, new in zip(results['prospects'], fresh) if new]
         
-        # Find decision makers for top prospects
-        for prospect in results['prospects'][:10]:
-            try:
-                decision_makers = self._find_decision_makers(prospect)
-                results['decision_makers'].extend(decision_makers)
-            except Exception as e:
-                print(f"Error finding decision makers: {e}")
+        # Find decision makers for top prospects, all companies at once
+        for found in self._fan_out(self._find_decision_makers, results['prospects'][:10]):
+            results['decision_makers'].extend(found)
+        
+        self.store.upsert_prospects(results['prospects'], 'validate_problem')
+        self.store.upsert_contacts(results['decision_makers'])
+        if incremental:
+            # Only the prospects followed up here count as handled; the rest stay new
+            self.seen_validate.mark(results['prospects'][:10])
                 
         return results
     
@@ -100,11 +144,13 @@ class CalmOpsSearchService:
         Week 2-3 Priority: Find best candidates for pilot program
         """
         pilot_candidates = []
+        researched = []
         
         for prospect in validated_prospects[:5]:  # Top 5 validated prospects
             company_name = prospect.get('company_name', '')
             if not company_name:
                 continue
+            researched.append(prospect)
                 
             # Deep dive search on each validated prospect
             queries = [
@@ -124,24 +170,34 @@ class CalmOpsSearchService:
                     results = self._search(query)
                     signals = self._extract_pilot_signals(results)
                     company_intel['signals'].extend(signals)
-                    time.sleep(0.5)  # Rate limiting
                 except Exception as e:
                     print(f"Error researching {company_name}: {e}")
                     
-            company_intel['pilot_score'] = self._calculate_pilot_score(company_intel)
             pilot_candidates.append(company_intel)
             
+        scores = pilot_scores([candidate['signals'] for candidate in pilot_candidates])
+        for candidate, score in zip(pilot_candidates, scores.tolist()):
+            candidate['pilot_score'] = score
+        # Back onto the validated prospects' rows, so the store keeps the pilot scores
+        self.store.upsert_prospects([
+            {**prospect, **candidate}
+            for prospect, candidate in zip(researched, pilot_candidates)
+        ], 'find_pilots')
+            
         return {
-            'pilot_candidates': sorted(pilot_candidates, 
-                                      key=lambda x: x['pilot_score'], 
-                                      reverse=True)[:3]
+            'pilot_candidates': [pilot_candidates[i] for i in rank(scores, limit=3)]
         }
     
-    def scale_outreach_targets(self, market: str, target_count: int = 50) -> Dict:
+    def scale_outreach_targets(self, market: str, target_count: int = 50,
+                               incremental: Optional[bool] = None) -> Dict:
         """
         Week 5-6 Priority: Find 50 target companies for scaled outreach
+        
+        Incremental runs (SEARCH_INCREMENTAL) skip companies an earlier run already handled.
         """
+        incremental = SEARCH_INCREMENTAL if incremental is None else incremental
         targets = []
+        skipped = 0
         
         # Get market configuration
         market_config = self.target_markets.get(market, self.target_markets['new_york'])
@@ -151,118 +207,96 @@ class CalmOpsSearchService:
             query = f"{sector} companies {market_config['query_suffix']} {market_config['companies_size']}"
             
             try:
-                results = self._search(query, num_results=20)
+                results = self._search(query, num_results=20, profile='bulk')
                 companies = self._extract_outreach_targets(results, market, sector)
                 targets.extend(companies)
-                time.sleep(0.5)  # Rate limiting
             except Exception as e:
                 print(f"Outreach search error for {sector}: {e}")
+        
+        if incremental:
+            fresh = self.seen_outreach.check(targets)
+            skipped = len(targets) - sum(fresh)
+            targets = [target for target, new in zip(targets, fresh) if new]
                 
-        # Find LinkedIn contacts for top targets
-        for target in targets[:min(target_count, len(targets))]:
-            company_name = target.get('company_name', '')
-            if not company_name:
-                continue
-                
-            linkedin_query = f"site:linkedin.com/in creative director {company_name} OR CMO OR marketing operations"
-            try:
-                results = self._search(linkedin_query, num_results=5)
-                target['contacts'] = self._extract_linkedin_contacts(results)
-                time.sleep(0.5)  # Rate limiting
-            except Exception as e:
-                print(f"LinkedIn search error for {company_name}: {e}")
+        # Find LinkedIn contacts for top targets, sharing each company's contact lookup
+        top_targets = [t for t in targets[:target_count] if t.get('company_name')]
+        found = self._fan_out(lambda target: self._company_contacts(target['company_name']), top_targets)
+        for target, contacts in zip(top_targets, found):
+            target['contacts'] = self._outreach_contacts(contacts)
+        
+        self.store.upsert_prospects(targets, 'scale_outreach')
+        self.store.upsert_contacts([contact for contacts in found for contact in contacts])
+        if incremental:
+            # Targets past target_count are not returned, so they stay new
+            self.seen_outreach.mark(targets[:target_count])
                 
         return {
             'outreach_targets': targets[:target_count],
             'by_sector': self._group_by_sector(targets),
             'by_market': market,
-            'total_found': len(targets)
+            'total_found': len(targets),
+            'incremental': incremental,
+            'skipped_seen': skipped
         }
     
-    def _search(self, query: str, num_results: int = 10) -> Dict:
-        """Execute search via Serper API using requests"""
-        headers = {
-            'X-API-KEY': self.api_key,
-            'Content-Type': 'application/json'
-        }
-        
-        payload = {
-            'q': query,
-            'num': num_results,
-            'gl': 'us',
-            'hl': 'en'
-        }
-        
+    def _fan_out(self, fn: Callable, items: List) -> List:
+        """Call fn on each item on up to SEARCH_FANOUT threads; results keep input order"""
+        if SEARCH_FANOUT == 1 or len(items) <= 1:
+            return [fn(item) for item in items]
+        pool = ThreadPoolExecutor(max_workers=min(SEARCH_FANOUT, len(items)))
         try:
-            response = requests.post(
-                self.base_url,
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise Exception(f"Serper API error: {response.status_code} - {response.text}")
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"Request failed: {e}")
+            # A context copy per call so every thread sees this task's checkpoint
+            futures = [pool.submit(contextvars.copy_context().run, fn, item) for item in items]
+            return [future.result() for future in futures]
+        finally:
+            # Don't hold up a drain (DrainTimeout) waiting on queued searches
+            pool.shutdown(wait=False, cancel_futures=True)
+    
+    def _search(self, query: str, num_results: int = 10, profile: str = 'precise') -> Dict:
+        """Execute search on the best available backend for the profile"""
+        key = checkpoint.memo_key('serper', query, num_results, profile)
+        cached = checkpoint.recall('search', key)
+        if cached is not None:
+            call_costs.saved('checkpoint')
+            return cached
+        cached = self.cache.get(query, num_results, 'us', 'en', profile)
+        if cached is not None:
+            call_costs.saved('cache')
+            checkpoint.remember('search', key, cached)
+            return cached
+        
+        # Identical queries running elsewhere share one request
+        results = self.flights.do(
+            cache_key(query, num_results, 'us', 'en', profile),
+            lambda: self._fetch(query, num_results, profile)
+        )
+        checkpoint.remember('search', key, results)
+        return results
+    
+    def _fetch(self, query: str, num_results: int, profile: str) -> Dict:
+        """Search request for a query nobody else is fetching right now"""
+        results = self.search.search(query, num_results, 'us', 'en', profile=profile)
+        self.cache.set(query, num_results, 'us', 'en', results, profile)
+        return results
     
     def _extract_validation_prospects(self, search_results: Dict, market: str) -> List[Dict]:
         """Extract companies showing workflow pain signals"""
-        prospects = []
-        
-        for result in search_results.get('organic', []):
-            text = (result.get('title', '') + ' ' + result.get('snippet', '')).lower()
-            
-            # Pain signals to look for
-            pain_signals = {
-                'growing_pains': any(term in text for term in 
-                                   ['growing pains', 'scaling challenges', 'rapid growth']),
-                'workflow_issues': any(term in text for term in 
-                                     ['workflow', 'coordination', 'collaboration challenges']),
-                'hiring_creative': any(term in text for term in 
-                                     ['hiring creative', 'hiring marketing', 'building team']),
-                'series_funding': any(term in text for term in 
-                                    ['series a', 'series b', 'raised', 'funding']),
-                'operational': any(term in text for term in 
-                                 ['operations', 'efficiency', 'productivity'])
-            }
-            
-            if sum(pain_signals.values()) >= 2:  # At least 2 pain signals
-                prospects.append({
-                    'title': result.get('title'),
-                    'snippet': result.get('snippet'),
-                    'link': result.get('link'),
-                    'company_name': self._extract_company_name(result),
-                    'pain_signals': pain_signals,
-                    'market': market,
-                    'validation_score': sum(pain_signals.values()) / len(pain_signals)
-                })
-                
-        return prospects
+        return self._validation_prospects([(result, market) for result in search_results.get('organic', [])])
+    
+    def _validation_prospects(self, rows: List[tuple]) -> List[Dict]:
+        """Prospects with at least 2 pain signals from (search result, market) rows"""
+        return score_validation_results(rows, VALIDATION_SIGNALS, self._extract_company_name)
     
     def _score_validation_prospects(self, prospects: List[Dict]) -> List[Dict]:
         """Score and deduplicate prospects"""
-        # Deduplicate by company name
-        seen_companies = {}
-        for prospect in prospects:
-            company = prospect.get('company_name', '')
-            if not company:
-                continue
-                
-            if company not in seen_companies:
-                seen_companies[company] = prospect
-            else:
-                # Keep the one with higher score
-                if prospect.get('validation_score', 0) > seen_companies[company].get('validation_score', 0):
-                    seen_companies[company] = prospect
-                    
-        # Sort by validation score
-        unique_prospects = list(seen_companies.values())
-        unique_prospects.sort(key=lambda x: x.get('validation_score', 0), reverse=True)
-        
-        return unique_prospects
+        # Deduplicate by company, keeping each company's best-scored prospect.
+        # "Acme Inc.", "Acme | LinkedIn" and acme.com resolve to one entity.
+        named = [prospect for prospect in prospects if prospect.get('company_name', '')]
+        entity_ids = self.entities.resolve([(prospect['company_name'], prospect.get('link')) for prospect in named])
+        for prospect, entity_id in zip(named, entity_ids):
+            prospect['entity_id'] = entity_id
+        winners = best_per_key(entity_ids, [prospect.get('validation_score', 0) for prospect in named])
+        return [named[i] for i in winners]
     
     def _extract_company_name(self, result: Dict) -> str:
         """Extract company name from search result"""
@@ -282,72 +316,62 @@ class CalmOpsSearchService:
         company = prospect.get('company_name', '')
         if not company:
             return []
-            
-        decision_makers = []
-        roles = ['Creative Director', 'CMO', 'VP Marketing', 'Marketing Operations Manager']
         
-        for role in roles:
-            query = f"site:linkedin.com/in {role} {company}"
-            try:
-                results = self._search(query, num_results=3)
-                for result in results.get('organic', []):
-                    decision_makers.append({
-                        'company': company,
-                        'role': role,
-                        'linkedin_url': result.get('link'),
-                        'name': self._extract_name_from_title(result.get('title', '')),
-                        'snippet': result.get('snippet')
-                    })
-                time.sleep(0.5)  # Rate limiting
-            except Exception as e:
-                print(f"Error finding {role} at {company}: {e}")
-                continue
-                
-        return decision_makers
+        if CONTACT_LOOKUP == 'per_role':
+            lookups = self._fan_out(lambda role: self._find_role(company, role), DECISION_MAKER_ROLES)
+            return [decision_maker for found in lookups for decision_maker in found]
+        return decision_makers(self._company_contacts(company))
+    
+    def _company_contacts(self, company: str) -> List[Dict]:
+        """Every LinkedIn contact at a company from one combined query, cached per company"""
+        contacts = self.contacts.get(company)
+        if contacts is not None:
+            call_costs.saved('cache')
+            return contacts
+        try:
+            results = self._search(contact_query(company), num_results=CONTACT_RESULTS)
+        except Exception as e:
+            print(f"LinkedIn search error for {company}: {e}")
+            return []
+        contacts = parse_contacts(company, results)
+        self.contacts.set(company, contacts)
+        return contacts
+    
+    def _find_role(self, company: str, role: str) -> List[Dict]:
+        """LinkedIn profiles for one role at one company"""
+        query = f"site:linkedin.com/in {role} {company}"
+        try:
+            results = self._search(query, num_results=3)
+        except Exception as e:
+            print(f"Error finding {role} at {company}: {e}")
+            return []
+        return [{
+            'company': company,
+            'role': role,
+            'linkedin_url': result.get('link'),
+            'name': self._extract_name_from_title(result.get('title', '')),
+            'snippet': result.get('snippet')
+        } for result in results.get('organic', [])]
     
     def _extract_name_from_title(self, title: str) -> str:
         """Extract name from LinkedIn title"""
-        name = title.split(' - ')[0].strip()
-        name = name.replace(' on LinkedIn', '').replace(' | LinkedIn', '')
-        return name
+        return name_from_title(title)
     
     def _extract_pilot_signals(self, search_results: Dict) -> List[str]:
         """Extract signals for pilot scoring"""
         signals = []
         
         for result in search_results.get('organic', []):
-            text = (result.get('title', '') + ' ' + result.get('snippet', '')).lower()
-            
-            signal_terms = [
-                'workflow', 'project management', 'collaboration',
-                'creative team', 'marketing operations', 'delays',
-                'efficiency', 'productivity', 'scaling', 'growing'
-            ]
-            
-            for term in signal_terms:
-                if term in text and term not in signals:
+            text = result.get('title', '') + ' ' + result.get('snippet', '')
+            for term in PILOT_SIGNALS.ordered_terms(text):
+                if term not in signals:
                     signals.append(term)
                     
         return signals
     
     def _calculate_pilot_score(self, company_intel: Dict) -> float:
         """Calculate pilot candidate score"""
-        signals = company_intel.get('signals', [])
-        
-        # High value signals
-        high_value = ['workflow', 'delays', 'scaling', 'project management']
-        medium_value = ['creative team', 'marketing operations', 'efficiency']
-        
-        score = 0.0
-        for signal in signals:
-            if signal in high_value:
-                score += 0.3
-            elif signal in medium_value:
-                score += 0.2
-            else:
-                score += 0.1
-                
-        return min(score, 1.0)  # Cap at 1.0
+        return float(pilot_scores([company_intel.get('signals', [])])[0])
     
     def _extract_outreach_targets(self, search_results: Dict, market: str, sector: str) -> List[Dict]:
         """Extract companies for outreach"""
@@ -366,19 +390,14 @@ class CalmOpsSearchService:
             
         return targets
     
-    def _extract_linkedin_contacts(self, search_results: Dict) -> List[Dict]:
-        """Extract LinkedIn contacts from search results"""
-        contacts = []
-        
-        for result in search_results.get('organic', []):
-            if 'linkedin.com/in' in result.get('link', ''):
-                contacts.append({
-                    'name': self._extract_name_from_title(result.get('title', '')),
-                    'linkedin_url': result.get('link'),
-                    'title_snippet': result.get('snippet', '')
-                })
-                
-        return contacts
+    def _outreach_contacts(self, contacts: List[Dict]) -> List[Dict]:
+        """Outreach view of a company's LinkedIn contacts"""
+        return [{
+            'name': contact['name'],
+            'role': contact['role'],
+            'linkedin_url': contact['linkedin_url'],
+            'title_snippet': contact.get('snippet') or ''
+        } for contact in contacts]
     
     def _group_by_sector(self, targets: List[Dict]) -> Dict[str, List[Dict]]:
         """Group targets by sector"""
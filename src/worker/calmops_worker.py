@@ -1,43 +1,70 @@
+import os
 import redis
 import json
 import time
 from datetime import datetime
 from typing import Dict, List
-from calmops_search_service import CalmOpsSearchService, CalmOpsPriority
+from calmops_search_service import CalmOpsSearchService
+from task_queue import TaskQueue
+from task_events import publish_event
+from task_status import TaskStatus
+from result_codec import RESULT_TTL, result_key, encode_result
+import checkpoint
+import call_costs
+from prospect_store import reuse_cutoff
+from checkpoint import DrainTimeout, GracefulDrain
 
 class CalmOpsWorker:
     def __init__(self):
         self.redis_client = redis.Redis(host='redis', port=6379, decode_responses=True)
+        # Results are stored in binary form (see result_codec.py)
+        self.result_redis = redis.Redis(host='redis', port=6379)
         self.search_service = CalmOpsSearchService()
+        self.queue = TaskQueue(self.redis_client, 'calmops_queue')
+        self.status = TaskStatus(self.redis_client, 'calmops_queue')
         
     def run(self):
         """Main worker loop"""
         print("CalmOps Worker started...")
+        self.queue.start_keepalive()
+        drain = GracefulDrain()
+        item, progress = None, None
         
-        while True:
-            try:
-                # Check for tasks in queue
-                task_json = self.redis_client.brpop('calmops_queue', timeout=5)
-                
-                if task_json:
-                    task = json.loads(task_json[1])
-                    self.process_task(task)
-                else:
-                    # No tasks, wait
-                    time.sleep(1)
+        try:
+            while not drain.stopping:
+                try:
+                    # Check for tasks in queue (interactive lane first)
+                    item = self.queue.pop(timeout=5)
                     
-            except Exception as e:
-                print(f"Worker error: {e}")
-                time.sleep(5)
+                    if item:
+                        progress = checkpoint.begin(item.task)
+                        self.process_task(item.task, item.lane)
+                        self.queue.ack(item)
+                        item = None
+                        
+                except Exception as e:
+                    print(f"Worker error: {e}")
+                    time.sleep(5)
+        except DrainTimeout:
+            # Shutdown deadline hit mid-task: requeue it with the searches done so far
+            if item:
+                self.queue.requeue(item, checkpoint.with_checkpoint(item.task, progress))
+                self.status.set(item.task, item.lane, 'queued')
+                print(f"Requeued task {item.task.get('id')} for the next worker")
+        finally:
+            drain.done()
     
-    def process_task(self, task: Dict):
+    def process_task(self, task: Dict, lane: str = 'batch'):
         """Process different task types"""
         task_type = task.get('type')
         task_id = task.get('id')
         
         print(f"Processing task {task_id} of type {task_type}")
+        ledger = call_costs.begin()
         
         try:
+            self.status.set(task, lane, 'running')
+
             if task_type == 'validate_problem':
                 result = self.validate_problem_task(task)
             elif task_type == 'find_pilots':
@@ -56,28 +83,38 @@ class CalmOpsWorker:
                 result = self.create_mvp_rubric_task(task)
             else:
                 result = {'error': f'Unknown task type: {task_type}'}
+            result['external_calls'] = call_costs.summary(ledger)
+            self.record_costs(task, ledger)
                 
-            # Store result
-            self.redis_client.setex(
-                f'result:{task_id}',
-                3600,  # Expire after 1 hour
-                json.dumps(result)
-            )
+            # Store result (expires after 1 hour)
+            self.result_redis.setex(result_key(task_id), RESULT_TTL, encode_result(task_id, result))
+            self.status.set(task, lane, 'failed' if 'error' in result else 'done')
+            publish_event(self.redis_client, task_id, 'done')
             
             # Save to file
             self.save_to_artifact(result, task_type)
             
         except Exception as e:
             print(f"Error processing task {task_id}: {e}")
-            error_result = {'error': str(e), 'task_id': task_id}
-            self.redis_client.setex(f'result:{task_id}', 3600, json.dumps(error_result))
+            error_result = {'error': str(e), 'task_id': task_id, 'external_calls': call_costs.summary(ledger)}
+            self.record_costs(task, ledger)
+            self.result_redis.setex(result_key(task_id), RESULT_TTL, encode_result(task_id, error_result))
+            self.status.set(task, lane, 'failed')
+            publish_event(self.redis_client, task_id, 'done')
+    
+    def record_costs(self, task: Dict, ledger: Dict):
+        """Add the task's external calls to its handler's running totals"""
+        try:
+            call_costs.flush(self.redis_client, task.get('type', 'unknown'), ledger)
+        except Exception as e:
+            print(f"Could not record call costs for {task.get('id')}: {e}")
     
     def validate_problem_task(self, task: Dict) -> Dict:
         """Week 1: Find and validate prospects"""
         market = task.get('market', 'all')
         
         print(f"Searching for validation prospects in {market}")
-        results = self.search_service.validate_problem_search(market)
+        results = self.search_service.validate_problem_search(market, incremental=task.get('incremental'))
         
         # Enhance with additional analysis
         top_prospects = results['prospects'][:10]
@@ -87,6 +124,7 @@ class CalmOpsWorker:
             'type': 'validation',
             'market': market,
             'total_prospects_found': len(results['prospects']),
+            'skipped_seen': results['skipped_seen'],
             'top_10_prospects': top_prospects,
             'decision_makers': results['decision_makers'],
             'timestamp': datetime.now().isoformat(),
@@ -97,6 +135,14 @@ class CalmOpsWorker:
         """Week 2-3: Find pilot candidates"""
         validated_prospects = task.get('validated_prospects', [])
         
+        if not validated_prospects and task.get('market'):
+            # Earlier validation runs for the market, instead of new searches
+            cutoff = reuse_cutoff()
+            if cutoff:
+                validated_prospects = self.search_service.store.top_by_market(
+                    task['market'], 5, seen_since=cutoff, source='validate_problem'
+                )
+        
         if not validated_prospects:
             return {'error': 'No validated prospects provided'}
             
@@ -117,13 +163,14 @@ class CalmOpsWorker:
         target_count = task.get('target_count', 50)
         
         print(f"Finding {target_count} outreach targets in {market}")
-        results = self.search_service.scale_outreach_targets(market, target_count)
+        results = self.search_service.scale_outreach_targets(market, target_count, incremental=task.get('incremental'))
         
         return {
             'task_id': task.get('id'),
             'type': 'scaled_outreach',
             'market': market,
             'targets_found': results['total_found'],
+            'skipped_seen': results['skipped_seen'],
             'outreach_targets': results['outreach_targets'],
             'by_sector': results['by_sector'],
             'timestamp': datetime.now().isoformat()
@@ -172,13 +219,13 @@ class CalmOpsWorker:
                 # Reuse validation extraction logic; market not relevant here
                 extracted = self.search_service._extract_validation_prospects(search_results, market='custom')
                 prospects.extend(extracted)
-                time.sleep(0.5)
             except Exception as e:
                 print(f"Error during prospect search for '{kw}': {e}")
                 continue
 
         # Deduplicate and score as in validation
         unique_prospects = self.search_service._score_validation_prospects(prospects)
+        self.search_service.store.upsert_prospects(unique_prospects, 'search_prospects')
 
         return {
             'task_id': task.get('id'),
@@ -0,0 +1,85 @@
+import os
+import json
+import signal
+import hashlib
+import contextvars
+from typing import Dict, Optional
+
+# Graceful shutdown for the worker loops. On SIGTERM a worker stops taking
+# new tasks and gives in-flight ones DRAIN_TIMEOUT seconds to finish. Tasks
+# still running after that are put back on the queue together with their
+# checkpoint: every search and generation result they had already obtained,
+# keyed by a hash of the request, so the re-run replays those for free.
+DRAIN_TIMEOUT = int(os.getenv('WORKER_DRAIN_TIMEOUT', '45'))
+
+_current: contextvars.ContextVar = contextvars.ContextVar('checkpoint', default=None)
+
+
+class DrainTimeout(BaseException):
+    """Raised in a sync worker when the drain deadline passes mid-task.
+
+    A BaseException so the broad `except Exception` blocks in the search and
+    LLM helpers do not swallow it.
+    """
+
+
+def begin(task: Dict) -> Dict:
+    """Make the task's checkpoint (restored from a previous run, if any) current"""
+    checkpoint = task.get('checkpoint') or {}
+    _current.set(checkpoint)
+    return checkpoint
+
+
+def memo_key(*parts) -> str:
+    return hashlib.sha1(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+def recall(kind: str, key: str):
+    checkpoint = _current.get()
+    if checkpoint is None:
+        return None
+    return checkpoint.get(kind, {}).get(key)
+
+
+def remember(kind: str, key: str, value):
+    checkpoint = _current.get()
+    if checkpoint is not None and value is not None:
+        checkpoint.setdefault(kind, {})[key] = value
+
+
+def with_checkpoint(task: Dict, checkpoint: Optional[Dict]) -> Dict:
+    """Copy of the task carrying its partial progress, ready to requeue"""
+    task = dict(task)
+    if checkpoint:
+        task['checkpoint'] = checkpoint
+    task['requeued'] = task.get('requeued', 0) + 1
+    return task
+
+
+class GracefulDrain:
+    """SIGTERM/SIGINT handling for the synchronous worker loops.
+
+    The first signal sets `stopping` so the loop takes no more tasks, and arms
+    an alarm that raises DrainTimeout if the current task is still running
+    after DRAIN_TIMEOUT seconds.
+    """
+
+    def __init__(self, deadline: int = DRAIN_TIMEOUT):
+        self.deadline = deadline
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGALRM, self._expired)
+
+    def _stop(self, signum, frame):
+        if self.stopping:
+            return
+        print(f"Signal {signum}: draining, {self.deadline}s to finish the current task")
+        self.stopping = True
+        signal.alarm(self.deadline)
+
+    def _expired(self, signum, frame):
+        raise DrainTimeout()
+
+    def done(self):
+        signal.alarm(0)
@@ -0,0 +1,140 @@
+import os
+import re
+import json
+import zlib
+import redis
+import redis.asyncio as aioredis
+from typing import Dict, List, Optional
+from search_cache import normalize_query
+from redis_settings import connection_kwargs
+
+# Batched contact discovery: instead of one site:linkedin.com/in search per
+# role, a company gets a single OR-combined query and each profile found is
+# attributed to a role by matching its title. The parsed contacts are kept
+# per company (contacts:{company}) so decision-maker and outreach lookups for
+# the same company share one search. CONTACT_LOOKUP=per_role restores the
+# one-query-per-role behaviour.
+CONTACT_LOOKUP = os.getenv('CONTACT_LOOKUP', 'batched')
+CONTACT_CACHE_TTL = int(os.getenv('CONTACT_CACHE_TTL', str(7 * 24 * 3600)))
+CONTACT_RESULTS = 10
+PER_ROLE_LIMIT = 3
+
+DECISION_MAKER_ROLES = ['Creative Director', 'CMO', 'VP Marketing', 'Marketing Operations Manager']
+
+# Title fragments per role, most specific first; the first role to match wins
+ROLE_TITLES = {
+    'CMO': [r'\bcmo\b', r'chief marketing officer'],
+    'VP Marketing': [r'\bvp,? (of )?marketing\b', r'vice president,? (of )?marketing', r'head of marketing'],
+    'Marketing Operations Manager': [r'marketing op(eration)?s\b', r'\bmops\b'],
+    'Creative Director': [r'creative director', r'head of creative', r'\becd\b'],
+}
+_ROLE_PATTERNS = [(role, re.compile('|'.join(patterns), re.I)) for role, patterns in ROLE_TITLES.items()]
+
+
+# Search terms for roles whose full title is too narrow to query for
+ROLE_QUERY_TERMS = {'Marketing Operations Manager': 'marketing operations'}
+
+
+def contact_query(company: str, roles: List[str] = DECISION_MAKER_ROLES) -> str:
+    """One LinkedIn query covering every role at a company"""
+    terms = [ROLE_QUERY_TERMS.get(role, role) for role in roles]
+    alternatives = ' OR '.join(f'"{term}"' if ' ' in term else term for term in terms)
+    return f"site:linkedin.com/in {company} ({alternatives})"
+
+
+def match_role(text: str) -> Optional[str]:
+    for role, pattern in _ROLE_PATTERNS:
+        if pattern.search(text):
+            return role
+    return None
+
+
+def name_from_title(title: str) -> str:
+    """Extract name from LinkedIn title"""
+    name = title.split(' - ')[0].strip()
+    name = name.replace(' on LinkedIn', '').replace(' | LinkedIn', '')
+    return name
+
+
+def parse_contacts(company: str, search_results: Dict) -> List[Dict]:
+    """LinkedIn profiles from a contact query, each tagged with a role or None"""
+    contacts = []
+    for result in search_results.get('organic', []):
+        link = result.get('link', '')
+        if 'linkedin.com/in' not in link:
+            continue
+        title = result.get('title', '')
+        # The headline after the name carries the job title; fall back to the snippet
+        headline = title.split(' - ', 1)[1] if ' - ' in title else ''
+        contacts.append({
+            'company': company,
+            'role': match_role(headline) or match_role(result.get('snippet', '')),
+            'linkedin_url': link,
+            'name': name_from_title(title),
+            'snippet': result.get('snippet')
+        })
+    return contacts
+
+
+def decision_makers(contacts: List[Dict], roles: List[str] = DECISION_MAKER_ROLES) -> List[Dict]:
+    """Contacts with a wanted role, at most PER_ROLE_LIMIT each, in role order"""
+    found = []
+    for role in roles:
+        found.extend([c for c in contacts if c['role'] == role][:PER_ROLE_LIMIT])
+    return found
+
+
+def contact_key(company: str) -> str:
+    return f"contacts:{normalize_query(company)}"
+
+
+class ContactCache:
+    """Per-company contacts for synchronous code. Redis errors count as misses."""
+
+    def __init__(self, client=None, ttl: int = CONTACT_CACHE_TTL):
+        self.client = client or redis.Redis(**connection_kwargs())
+        self.ttl = ttl
+
+    def get(self, company: str) -> Optional[List[Dict]]:
+        if self.ttl <= 0:
+            return None
+        try:
+            raw = self.client.get(contact_key(company))
+        except redis.RedisError as e:
+            print(f"Contact cache unavailable: {e}")
+            return None
+        return json.loads(zlib.decompress(raw)) if raw else None
+
+    def set(self, company: str, contacts: List[Dict]):
+        if self.ttl <= 0:
+            return
+        try:
+            self.client.setex(contact_key(company), self.ttl, zlib.compress(json.dumps(contacts).encode()))
+        except redis.RedisError as e:
+            print(f"Contact cache unavailable: {e}")
+
+
+class AsyncContactCache:
+    """Per-company contacts for async code. Redis errors count as misses."""
+
+    def __init__(self, client=None, ttl: int = CONTACT_CACHE_TTL):
+        self.client = client or aioredis.Redis(**connection_kwargs())
+        self.ttl = ttl
+
+    async def get(self, company: str) -> Optional[List[Dict]]:
+        if self.ttl <= 0:
+            return None
+        try:
+            raw = await self.client.get(contact_key(company))
+        except redis.RedisError as e:
+            print(f"Contact cache unavailable: {e}")
+            return None
+        return json.loads(zlib.decompress(raw)) if raw else None
+
+    async def set(self, company: str, contacts: List[Dict]):
+        if self.ttl <= 0:
+            return
+        try:
+            await self.client.setex(contact_key(company), self.ttl, zlib.compress(json.dumps(contacts).encode()))
+        except redis.RedisError as e:
+            print(f"Contact cache unavailable: {e}")
@@ -4,6 +4,7 @@ from typing import Dict, Any
 import asyncio
 from search_service import WebSearchService
 from llm_service import OllamaService
+from scoring import rank, relevance_scores
 
 class EnhancedWorker:
     def __init__(self):
@@ -78,20 +79,21 @@ class EnhancedWorker:
         search_query = f"{industry} companies {location} office expansion new headquarters"
         results = await self.search_service.search_companies(search_query, location)
         
-        # Process into leads
-        leads = []
-        for company in results.get('companies', []):
-            lead = {
-                'company': company.get('title'),
-                'snippet': company.get('snippet'),
-                'url': company.get('link'),
-                'domain': company.get('domain'),
-                'relevance_score': self._calculate_relevance(company, criteria)
-            }
-            leads.append(lead)
+        # Process into leads, scored as one batch
+        companies = results.get('companies', [])
+        scores = relevance_scores(
+            [company.get('snippet', '') for company in companies], criteria.get('keywords', [])
+        )
+        leads = [{
+            'company': company.get('title'),
+            'snippet': company.get('snippet'),
+            'url': company.get('link'),
+            'domain': company.get('domain'),
+            'relevance_score': score
+        } for company, score in zip(companies, scores.tolist())]
             
         # Sort by relevance
-        leads.sort(key=lambda x: x['relevance_score'], reverse=True)
+        leads = [leads[i] for i in rank(scores)]
         
         return {
             'leads': leads[:10],  # Top 10 leads
@@ -102,17 +104,4 @@ class EnhancedWorker:
     
     def _calculate_relevance(self, company: Dict, criteria: Dict) -> float:
         """Calculate relevance score based on criteria"""
-        score = 0.5  # Base score
-        
-        keywords = criteria.get('keywords', [])
-        snippet = company.get('snippet', '').lower()
-        
-        for keyword in keywords:
-            if keyword.lower() in snippet:
-                score += 0.1
-                
-        # Boost for specific indicators
-        if any(term in snippet for term in ['expansion', 'new office', 'headquarters', 'moving']):
-            score += 0.2
-            
-        return min(score, 1.0)
+        return float(relevance_scores([company.get('snippet', '')], criteria.get('keywords', []))[0])
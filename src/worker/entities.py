@@ -0,0 +1,315 @@
+import os
+import re
+import hashlib
+import difflib
+import redis
+import redis.asyncio as aioredis
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+from redis_settings import connection_kwargs
+
+# Company entity resolution for prospect dedup. Each search result is reduced
+# to match keys:
+#   domain:{acme.com}   its canonical website domain (not job boards, LinkedIn...)
+#   name:{acme}         its normalized company name, and the name implied by
+#                       the domain label or a linkedin.com/company/ slug
+# The domain keys count only when the domain label agrees with the company
+# name (acme.com for "Acme Studios"), so an article about one company on a
+# news or blog host does not pass as that company's site; a host that carries
+# several company names in a batch never has its domain used as a key.
+# Results sharing any key are one company. Names that still differ slightly
+# ("acme studio" / "acme studios") are compared only within their blocks: the
+# first and last letters of the name's distinctive words, so generic words
+# like "creative" do not pile every name into one block and matching stays
+# near-linear. Every key resolved is kept under entities:key:{key} for
+# ENTITY_INDEX_TTL days, so a company gets the same id in every run and
+# worker; a bad merge ages out, or is undone at once by deleting its keys.
+# Redis errors fall back to resolving within the batch only.
+ENTITY_MATCH_RATIO = float(os.getenv('ENTITY_MATCH_RATIO', '0.93'))
+ENTITY_INDEX_TTL = int(float(os.getenv('ENTITY_INDEX_TTL_DAYS', '30')) * 86400)
+KEY_PREFIX = 'entities:key'
+BLOCK_PREFIX = 'entities:block'
+
+# Hosts whose pages are about companies but are not their websites
+AGGREGATOR_DOMAINS = {
+    'linkedin.com', 'glassdoor.com', 'indeed.com', 'crunchbase.com', 'builtin.com', 'builtinnyc.com',
+    'inc.com', 'forbes.com', 'bloomberg.com', 'techcrunch.com', 'ziprecruiter.com', 'wellfound.com',
+    'angel.co', 'facebook.com', 'instagram.com', 'twitter.com', 'x.com', 'youtube.com', 'medium.com',
+    'wikipedia.org', 'zoominfo.com', 'clutch.co', 'yelp.com', 'prnewswire.com', 'businesswire.com',
+}
+GENERIC_WORDS = {
+    'and', 'the', 'of', 'creative', 'studio', 'studios', 'agency', 'group', 'media', 'marketing', 'digital',
+    'labs', 'partners', 'brands', 'company', 'design', 'health', 'tech', 'technologies', 'solutions',
+}
+BLOCK_CHARS = 4
+LEGAL_SUFFIXES = {'inc', 'llc', 'ltd', 'limited', 'corp', 'corporation', 'co', 'plc', 'pbc', 'gmbh', 'lp', 'llp'}
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+
+
+def canonical_domain(link: Optional[str]) -> Optional[str]:
+    """Registrable domain of a link, e.g. https://www.acme.co.uk/about -> acme.co.uk"""
+    if not link:
+        return None
+    host = (urlparse(link if '//' in link else f"//{link}").hostname or '').rstrip('.')
+    labels = [label for label in host.split('.') if label]
+    if len(labels) < 2:
+        return None
+    # acme.co.uk, acme.com.au: short second-level label under a country TLD
+    size = 3 if len(labels) >= 3 and len(labels[-1]) == 2 and len(labels[-2]) <= 3 else 2
+    return '.'.join(labels[-size:])
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """Lowercase name without punctuation, legal suffixes or a leading 'the'"""
+    words = _NON_WORD.sub(' ', (name or '').lower().replace('&', ' and ')).split()
+    while words and words[-1] in LEGAL_SUFFIXES:
+        words.pop()
+    if len(words) > 1 and words[0] == 'the':
+        words = words[1:]
+    return ' '.join(words)
+
+
+def domain_label(domain: str) -> str:
+    """Name a domain implies, e.g. acme-goods.co.uk -> acme goods"""
+    return normalize_name(domain.split('.')[0].replace('-', ' '))
+
+
+def label_agrees(name: str, label: str) -> bool:
+    """Whether a normalized company name could be the one behind a domain label"""
+    if not name:
+        return True
+    label = label.replace(' ', '')
+    compact = name.replace(' ', '')
+    core = ''.join(word for word in name.split() if word not in GENERIC_WORDS)
+    return len(label) >= 3 and (label in compact or (len(core) >= 3 and core in label))
+
+
+def match_keys(name: Optional[str], link: Optional[str]) -> List[str]:
+    """Keys identifying a company, most specific first"""
+    keys = []
+    normalized = normalize_name(name)
+    domain = canonical_domain(link)
+    if domain and domain not in AGGREGATOR_DOMAINS:
+        label = domain_label(domain)
+        if label_agrees(normalized, label):
+            keys.append(f"domain:{domain}")
+            if len(label) >= 3:
+                keys.append(f"name:{label}")
+    elif domain == 'linkedin.com' and '/company/' in link:
+        slug = urlparse(link).path.split('/company/', 1)[1].split('/')[0]
+        slug = normalize_name(slug.replace('-', ' '))
+        if slug:
+            keys.append(f"name:{slug}")
+    if normalized:
+        keys.append(f"name:{normalized}")
+        # The domain label has no spaces, so match "Acme Goods" to acmegoods.com too
+        if ' ' in normalized:
+            keys.append(f"name:{normalized.replace(' ', '')}")
+    return list(dict.fromkeys(keys))
+
+
+def blocks_of(name: str) -> List[str]:
+    core = ''.join(word for word in name.split() if word not in GENERIC_WORDS) or name.replace(' ', '')
+    return list(dict.fromkeys([f"^{core[:BLOCK_CHARS]}", f"{core[-BLOCK_CHARS:]}$"]))
+
+
+def similar(a: str, b: str) -> bool:
+    matcher = difflib.SequenceMatcher(None, a, b)
+    # The cheap upper bounds rule out most pairs before the real ratio
+    return (matcher.real_quick_ratio() >= ENTITY_MATCH_RATIO and matcher.quick_ratio() >= ENTITY_MATCH_RATIO
+            and matcher.ratio() >= ENTITY_MATCH_RATIO)
+
+
+def entity_id(key: str) -> str:
+    """Ids derive from a company's first key, so concurrent workers agree on them"""
+    return hashlib.sha1(key.encode()).hexdigest()[:12]
+
+
+class _Groups:
+    """Union-find over batch rows"""
+
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, row: int) -> int:
+        while self.parent[row] != row:
+            self.parent[row] = self.parent[self.parent[row]]
+            row = self.parent[row]
+        return row
+
+    def union(self, a: int, b: int):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[max(a, b)] = min(a, b)
+
+
+def resolve(records: List[Tuple[Optional[str], Optional[str]]], known: Dict[str, str],
+            blocks: Dict[str, Dict[str, str]]) -> Tuple[List[str], Dict[str, str]]:
+    """Entity id per (name, link) record.
+
+    known maps keys already resolved to their entity, blocks maps a block to
+    the names already filed under it. Returns the ids and the key -> id
+    mappings that are new.
+    """
+    keys = [match_keys(name, link) for name, link in records]
+    shared = _shared_hosts(records)
+    if shared:
+        keys = [[key for key in row_keys if key not in shared] for row_keys in keys]
+    groups = _Groups(len(records))
+    owner = {}
+    for row, row_keys in enumerate(keys):
+        for key in row_keys:
+            groups.union(row, owner.setdefault(key, row))
+
+    # Near-identical names within a block, against each other and the index
+    block_names: Dict[str, Dict[str, int]] = {}
+    fuzzy_known = {}
+    for name in dict.fromkeys(normalize_name(name) for name, _ in records):
+        if not name:
+            continue
+        row = owner[f"name:{name}"]
+        for block in blocks_of(name):
+            peers = block_names.setdefault(block, {})
+            for other, other_row in peers.items():
+                if similar(name, other):
+                    groups.union(row, other_row)
+            peers[name] = row
+            if f"name:{name}" in known:
+                continue
+            for other, other_id in blocks.get(block, {}).items():
+                if similar(name, other):
+                    fuzzy_known.setdefault(row, other_id)
+                    break
+    fuzzy_known = {groups.find(row): entity for row, entity in fuzzy_known.items()}
+
+    # One id per group: an indexed key's entity, else a new id from the first key
+    group_ids = {}
+    for row, row_keys in enumerate(keys):
+        root = groups.find(row)
+        for key in row_keys:
+            if key in known:
+                group_ids.setdefault(root, known[key])
+                break
+    for row, row_keys in enumerate(keys):
+        root = groups.find(row)
+        if root not in group_ids:
+            group_ids[root] = fuzzy_known.get(root) or entity_id(row_keys[0] if row_keys else f"row:{records[row]}")
+
+    ids = [group_ids[groups.find(row)] for row in range(len(records))]
+    new = {}
+    for row_keys, entity in zip(keys, ids):
+        for key in row_keys:
+            if key not in known:
+                new.setdefault(key, entity)
+    return ids, new
+
+
+def _shared_hosts(records) -> set:
+    """Domain keys of hosts that carry company names their label disagrees with"""
+    shared = set()
+    for name, link in records:
+        domain = canonical_domain(link)
+        if domain and domain not in AGGREGATOR_DOMAINS:
+            label = domain_label(domain)
+            if not label_agrees(normalize_name(name), label):
+                shared.add(f"domain:{domain}")
+    return shared
+
+
+def _block_keys(records) -> List[str]:
+    names = {normalize_name(name) for name, _ in records} - {''}
+    return sorted({f"{BLOCK_PREFIX}:{block}" for name in names for block in blocks_of(name)})
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class _IndexBase:
+    @staticmethod
+    def _lookups(records):
+        lookup_keys = list(dict.fromkeys(key for name, link in records for key in match_keys(name, link)))
+        return lookup_keys, _block_keys(records)
+
+    @staticmethod
+    def _load(pipe, lookup_keys, block_keys):
+        if lookup_keys:
+            pipe.mget([f"{KEY_PREFIX}:{key}" for key in lookup_keys])
+        for block_key in block_keys:
+            pipe.hgetall(block_key)
+
+    @staticmethod
+    def _loaded(lookup_keys, block_keys, replies):
+        found, block_replies = (replies[0], replies[1:]) if lookup_keys else ([], replies)
+        known = {key: _decode(entity) for key, entity in zip(lookup_keys, found or []) if entity}
+        blocks = {
+            block_key[len(BLOCK_PREFIX) + 1:]: {_decode(n): _decode(e) for n, e in reply.items()}
+            for block_key, reply in zip(block_keys, block_replies)
+        }
+        return known, blocks
+
+    @staticmethod
+    def _store(pipe, records, new: Dict[str, str]):
+        for key, entity in new.items():
+            pipe.set(f"{KEY_PREFIX}:{key}", entity, nx=True, ex=ENTITY_INDEX_TTL)
+        for name in {normalize_name(name) for name, _ in records}:
+            if f"name:{name}" in new:
+                for block in blocks_of(name):
+                    pipe.hsetnx(f"{BLOCK_PREFIX}:{block}", name, new[f"name:{name}"])
+                    pipe.expire(f"{BLOCK_PREFIX}:{block}", ENTITY_INDEX_TTL)
+
+
+class EntityIndex(_IndexBase):
+    """Entity resolution for synchronous code"""
+
+    def __init__(self, client=None):
+        self.client = client or redis.Redis(**connection_kwargs())
+
+    def resolve(self, records: List[Tuple[Optional[str], Optional[str]]]) -> List[str]:
+        """Entity id for each (company name, link) record"""
+        if not records:
+            return []
+        lookup_keys, block_keys = self._lookups(records)
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            self._load(pipe, lookup_keys, block_keys)
+            known, blocks = self._loaded(lookup_keys, block_keys, pipe.execute())
+        except redis.RedisError as e:
+            print(f"Entity index unavailable, resolving within batch: {e}")
+            return resolve(records, {}, {})[0]
+        ids, new = resolve(records, known, blocks)
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            self._store(pipe, records, new)
+            pipe.execute()
+        except redis.RedisError as e:
+            print(f"Entity index unavailable: {e}")
+        return ids
+
+
+class AsyncEntityIndex(_IndexBase):
+    """Entity resolution for async code"""
+
+    def __init__(self, client=None):
+        self.client = client or aioredis.Redis(**connection_kwargs())
+
+    async def resolve(self, records: List[Tuple[Optional[str], Optional[str]]]) -> List[str]:
+        """Entity id for each (company name, link) record"""
+        if not records:
+            return []
+        lookup_keys, block_keys = self._lookups(records)
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            self._load(pipe, lookup_keys, block_keys)
+            known, blocks = self._loaded(lookup_keys, block_keys, await pipe.execute())
+        except redis.RedisError as e:
+            print(f"Entity index unavailable, resolving within batch: {e}")
+            return resolve(records, {}, {})[0]
+        ids, new = resolve(records, known, blocks)
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            self._store(pipe, records, new)
+            await pipe.execute()
+        except redis.RedisError as e:
+            print(f"Entity index unavailable: {e}")
+        return ids
@@ -0,0 +1,54 @@
+import os
+import httpx
+
+# One long-lived HTTP client per worker process, shared by every search path
+# (worker.py, calmops_search_service.py, search_service.py) so calls to
+# google.serper.dev reuse pooled keep-alive connections instead of paying a
+# TCP+TLS handshake per query. HTTP/2 lets concurrent searches multiplex over
+# a single connection; it needs the optional h2 package (httpx[http2]) and
+# falls back to HTTP/1.1 without it.
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '64'))
+HTTP_KEEPALIVE = int(os.getenv('HTTP_KEEPALIVE', '20'))
+
+try:
+    import h2  # noqa: F401
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+_async_client = None
+_sync_client = None
+
+
+def _options():
+    return {
+        'http2': HTTP2,
+        'timeout': httpx.Timeout(30.0, connect=10.0),
+        'limits': httpx.Limits(
+            max_connections=HTTP_POOL_SIZE,
+            max_keepalive_connections=HTTP_KEEPALIVE,
+            keepalive_expiry=60
+        )
+    }
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Shared client for async code; all callers must run on the same event loop"""
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(**_options())
+    return _async_client
+
+
+def get_sync_client() -> httpx.Client:
+    global _sync_client
+    if _sync_client is None or _sync_client.is_closed:
+        _sync_client = httpx.Client(**_options())
+    return _sync_client
+
+
+async def aclose_async_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
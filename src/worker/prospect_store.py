@@ -0,0 +1,334 @@
+import os
+import json
+import sqlite3
+import asyncio
+import threading
+from pathlib import Path
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from entities import AGGREGATOR_DOMAINS, canonical_domain, match_keys, normalize_name
+
+# Every prospect and contact the search handlers find, kept in an embedded
+# SQLite database on the /data volume instead of only in result:{id} keys
+# that expire after an hour. A prospect is one company in one market (keyed
+# by its entity id, else its best match key); seeing it again updates it in
+# place, keeps its best scores and moves last_seen. Scores on different
+# scales get their own columns: validation_score (share of pain signals,
+# from validation sweeps), pilot_score (pilot research) and score (anything
+# else, e.g. outreach), and top_by_market sorts by the column that belongs
+# to the source it asks for. Its source stays the
+# handler that first found it, so a later pilot or outreach pass does not
+# hide a validated prospect from validation reuse. Writes are batched, one
+# transaction per call. Downstream tasks ask for the top prospects in a
+# market instead of searching again; PROSPECT_REUSE_DAYS bounds how old those
+# may be (0 turns reuse off). SQLite errors are logged and treated as misses.
+PROSPECT_DB = Path(os.getenv('PROSPECT_DB', '/data/prospects.db'))
+PROSPECT_REUSE_DAYS = float(os.getenv('PROSPECT_REUSE_DAYS', '7'))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS prospects (
+    id INTEGER PRIMARY KEY,
+    prospect_key TEXT NOT NULL,
+    market TEXT NOT NULL DEFAULT '',
+    company TEXT,
+    domain TEXT,
+    link TEXT,
+    sector TEXT,
+    score REAL,
+    validation_score REAL,
+    pilot_score REAL,
+    source TEXT,
+    data TEXT,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    times_seen INTEGER NOT NULL DEFAULT 1,
+    UNIQUE (prospect_key, market)
+);
+CREATE INDEX IF NOT EXISTS prospects_company ON prospects (company COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS prospects_domain ON prospects (domain);
+CREATE INDEX IF NOT EXISTS prospects_market_score ON prospects (market, score DESC);
+CREATE INDEX IF NOT EXISTS prospects_sector_score ON prospects (sector, score DESC);
+CREATE INDEX IF NOT EXISTS prospects_score ON prospects (score DESC);
+CREATE INDEX IF NOT EXISTS prospects_source ON prospects (market, source);
+CREATE INDEX IF NOT EXISTS prospects_first_seen ON prospects (first_seen);
+CREATE INDEX IF NOT EXISTS prospects_last_seen ON prospects (last_seen);
+
+CREATE TABLE IF NOT EXISTS contacts (
+    id INTEGER PRIMARY KEY,
+    linkedin_url TEXT NOT NULL UNIQUE,
+    company TEXT,
+    company_key TEXT,
+    role TEXT,
+    name TEXT,
+    snippet TEXT,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS contacts_company ON contacts (company_key);
+CREATE INDEX IF NOT EXISTS contacts_role ON contacts (role);
+CREATE INDEX IF NOT EXISTS contacts_last_seen ON contacts (last_seen);
+"""
+
+# Score columns added after the first release; databases from then get them on open
+_SCORE_COLUMNS = ['validation_score', 'pilot_score']
+_SCORE_INDEXES = """
+CREATE INDEX IF NOT EXISTS prospects_market_validation ON prospects (market, validation_score DESC);
+CREATE INDEX IF NOT EXISTS prospects_market_pilot ON prospects (market, pilot_score DESC);
+"""
+
+_UPSERT_PROSPECT = """
+INSERT INTO prospects (prospect_key, market, company, domain, link, sector, score, validation_score, pilot_score,
+                       source, data, first_seen, last_seen)
+VALUES (:prospect_key, :market, :company, :domain, :link, :sector, :score, :validation_score, :pilot_score,
+        :source, :data, :seen, :seen)
+ON CONFLICT (prospect_key, market) DO UPDATE SET
+    company = excluded.company,
+    domain = COALESCE(excluded.domain, prospects.domain),
+    link = COALESCE(excluded.link, prospects.link),
+    sector = COALESCE(excluded.sector, prospects.sector),
+    score = MAX(COALESCE(excluded.score, prospects.score), COALESCE(prospects.score, excluded.score)),
+    validation_score = MAX(COALESCE(excluded.validation_score, prospects.validation_score),
+                           COALESCE(prospects.validation_score, excluded.validation_score)),
+    pilot_score = MAX(COALESCE(excluded.pilot_score, prospects.pilot_score),
+                      COALESCE(prospects.pilot_score, excluded.pilot_score)),
+    source = COALESCE(prospects.source, excluded.source),
+    data = excluded.data,
+    last_seen = excluded.last_seen,
+    times_seen = prospects.times_seen + 1
+"""
+
+_UPSERT_CONTACT = """
+INSERT INTO contacts (linkedin_url, company, company_key, role, name, snippet, first_seen, last_seen)
+VALUES (:linkedin_url, :company, :company_key, :role, :name, :snippet, :seen, :seen)
+ON CONFLICT (linkedin_url) DO UPDATE SET
+    company = excluded.company,
+    company_key = excluded.company_key,
+    role = COALESCE(excluded.role, contacts.role),
+    name = excluded.name,
+    snippet = excluded.snippet,
+    last_seen = excluded.last_seen
+"""
+
+# Which score column top_by_market sorts a source's prospects by
+SOURCE_SCORES = {
+    'validate_problem': 'validation_score',
+    'search_prospects': 'validation_score',
+    'find_pilots': 'pilot_score',
+}
+
+
+def reuse_cutoff() -> Optional[str]:
+    """Oldest last_seen a downstream task may reuse, or None when reuse is off"""
+    if PROSPECT_REUSE_DAYS <= 0:
+        return None
+    return (datetime.now() - timedelta(days=PROSPECT_REUSE_DAYS)).isoformat()
+
+
+def _number(value) -> Optional[float]:
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def _scores(prospect: Dict, source: str) -> Dict:
+    """A prospect's scores by column"""
+    scores = {
+        'score': None,
+        'validation_score': _number(prospect.get('validation_score')),
+        'pilot_score': _number(prospect.get('pilot_score')),
+    }
+    # A handler's plain 'score' is on its own column's scale (task1's pain share is a validation score)
+    column = SOURCE_SCORES.get(source, 'score')
+    if scores[column] is None:
+        scores[column] = _number(prospect.get('score'))
+    return scores
+
+
+def _prospect_row(prospect: Dict, source: str, seen: str) -> Optional[Dict]:
+    company = prospect.get('company_name') or prospect.get('company')
+    link = prospect.get('link') or prospect.get('url')
+    keys = match_keys(company, link)
+    if not (prospect.get('entity_id') or keys):
+        return None
+    domain = canonical_domain(link)
+    return {
+        'prospect_key': prospect.get('entity_id') or keys[0],
+        'market': prospect.get('market') or '',
+        'company': company,
+        'domain': domain if domain not in AGGREGATOR_DOMAINS else None,
+        'link': link,
+        'sector': prospect.get('sector'),
+        **_scores(prospect, source),
+        'source': source,
+        'data': json.dumps(prospect, default=str),
+        'seen': seen
+    }
+
+
+def _contact_row(contact: Dict, seen: str) -> Optional[Dict]:
+    if not contact.get('linkedin_url'):
+        return None
+    return {
+        'linkedin_url': contact['linkedin_url'],
+        'company': contact.get('company'),
+        'company_key': normalize_name(contact.get('company')),
+        'role': contact.get('role'),
+        'name': contact.get('name'),
+        'snippet': contact.get('snippet'),
+        'seen': seen
+    }
+
+
+def _prospect_from_row(row: sqlite3.Row) -> Dict:
+    prospect = json.loads(row['data']) if row['data'] else {}
+    prospect.setdefault('company', row['company'])
+    prospect.setdefault('company_name', row['company'])
+    prospect.update({
+        'market': row['market'],
+        'sector': row['sector'],
+        'domain': row['domain'],
+        'first_seen': row['first_seen'],
+        'last_seen': row['last_seen'],
+        'times_seen': row['times_seen']
+    })
+    for column in ('score', 'validation_score', 'pilot_score'):
+        if row[column] is not None:
+            prospect[column] = row[column]
+    return prospect
+
+
+class ProspectStore:
+    """Prospect and contact store for synchronous code; one connection per thread"""
+
+    def __init__(self, path: Path = PROSPECT_DB):
+        self.path = Path(path)
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Several worker processes share the file: WAL lets readers run during writes
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(_SCHEMA)
+            self._add_score_columns(conn)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _add_score_columns(conn: sqlite3.Connection):
+        columns = {row['name'] for row in conn.execute('PRAGMA table_info(prospects)')}
+        missing = [column for column in _SCORE_COLUMNS if column not in columns]
+        if missing:
+            with conn:
+                for column in missing:
+                    conn.execute(f'ALTER TABLE prospects ADD COLUMN {column} REAL')
+                # Validation sweeps' scores were kept in the shared score column
+                if 'validation_score' in missing:
+                    conn.execute("""
+                        UPDATE prospects SET validation_score = score, score = NULL
+                        WHERE source IN ('validate_problem', 'search_prospects')
+                    """)
+        conn.executescript(_SCORE_INDEXES)
+
+    def upsert_prospects(self, prospects: List[Dict], source: str) -> int:
+        """Add or refresh prospects in one transaction; returns how many were written"""
+        seen = datetime.now().isoformat()
+        rows = [row for row in (_prospect_row(p, source, seen) for p in prospects) if row]
+        if not rows:
+            return 0
+        try:
+            conn = self._connection()
+            with conn:
+                conn.executemany(_UPSERT_PROSPECT, rows)
+        except (sqlite3.Error, OSError) as e:
+            print(f"Prospect store unavailable: {e}")
+            return 0
+        return len(rows)
+
+    def upsert_contacts(self, contacts: List[Dict]) -> int:
+        """Add or refresh contacts in one transaction; returns how many were written"""
+        seen = datetime.now().isoformat()
+        rows = [row for row in (_contact_row(c, seen) for c in contacts) if row]
+        if not rows:
+            return 0
+        try:
+            conn = self._connection()
+            with conn:
+                conn.executemany(_UPSERT_CONTACT, rows)
+        except (sqlite3.Error, OSError) as e:
+            print(f"Prospect store unavailable: {e}")
+            return 0
+        return len(rows)
+
+    def top_by_market(self, market: str, limit: int = 10, sector: Optional[str] = None,
+                      seen_since: Optional[str] = None, source: Optional[str] = None) -> List[Dict]:
+        """Best-scored prospects in a market, optionally one sector or source and seen since a time.
+
+        Prospects are ranked by the score column of the source asked for
+        (validation_score for validate_problem, plain score without one).
+        """
+        query = 'SELECT * FROM prospects WHERE market = ?'
+        params = [market]
+        if sector is not None:
+            query += ' AND sector = ?'
+            params.append(sector)
+        if source is not None:
+            query += ' AND source = ?'
+            params.append(source)
+        if seen_since is not None:
+            query += ' AND last_seen >= ?'
+            params.append(seen_since)
+        # NULL scores sort last; the (market, <column>) indexes serve this order
+        query += f' ORDER BY {SOURCE_SCORES.get(source, "score")} DESC, last_seen DESC LIMIT ?'
+        params.append(limit)
+        return self._prospects(query, params)
+
+    def find(self, company: Optional[str] = None, domain: Optional[str] = None) -> List[Dict]:
+        """Every market's record of a company, by name or website domain"""
+        if domain:
+            return self._prospects('SELECT * FROM prospects WHERE domain = ?', [canonical_domain(domain) or domain])
+        return self._prospects('SELECT * FROM prospects WHERE company = ? COLLATE NOCASE', [company])
+
+    def contacts_for(self, company: str, role: Optional[str] = None) -> List[Dict]:
+        query = 'SELECT * FROM contacts WHERE company_key = ?'
+        params = [normalize_name(company)]
+        if role is not None:
+            query += ' AND role = ?'
+            params.append(role)
+        try:
+            return [dict(row) for row in self._connection().execute(query + ' ORDER BY last_seen DESC', params)]
+        except (sqlite3.Error, OSError) as e:
+            print(f"Prospect store unavailable: {e}")
+            return []
+
+    def _prospects(self, query: str, params: List) -> List[Dict]:
+        try:
+            return [_prospect_from_row(row) for row in self._connection().execute(query, params)]
+        except (sqlite3.Error, OSError) as e:
+            print(f"Prospect store unavailable: {e}")
+            return []
+
+
+class AsyncProspectStore:
+    """Prospect and contact store for async code; queries run on a worker thread"""
+
+    def __init__(self, path: Path = PROSPECT_DB):
+        self.store = ProspectStore(path)
+
+    async def upsert_prospects(self, prospects: List[Dict], source: str) -> int:
+        return await asyncio.to_thread(self.store.upsert_prospects, prospects, source)
+
+    async def upsert_contacts(self, contacts: List[Dict]) -> int:
+        return await asyncio.to_thread(self.store.upsert_contacts, contacts)
+
+    async def top_by_market(self, market: str, limit: int = 10, sector: Optional[str] = None,
+                            seen_since: Optional[str] = None, source: Optional[str] = None) -> List[Dict]:
+        return await asyncio.to_thread(self.store.top_by_market, market, limit, sector, seen_since, source)
+
+    async def find(self, company: Optional[str] = None, domain: Optional[str] = None) -> List[Dict]:
+        return await asyncio.to_thread(self.store.find, company, domain)
+
+    async def contacts_for(self, company: str, role: Optional[str] = None) -> List[Dict]:
+        return await asyncio.to_thread(self.store.contacts_for, company, role)
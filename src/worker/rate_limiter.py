@@ -0,0 +1,112 @@
+import os
+import time
+import asyncio
+import redis
+import redis.asyncio as aioredis
+from redis_settings import connection_kwargs
+
+# Cluster-wide token bucket for Serper, kept in Redis so every worker process
+# draws from the same budget. Callers wait for a token instead of sleeping a
+# fixed interval after each call. On a 429 the shared refill rate is halved;
+# every granted token then wins back 2% of the configured rate (AIMD).
+SERPER_RATE = float(os.getenv('SERPER_RATE', '5'))      # tokens per second
+SERPER_BURST = float(os.getenv('SERPER_BURST', '5'))    # bucket capacity
+MIN_RATE_FRACTION = 0.1
+
+_TAKE = """
+local max_rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts', 'rate')
+local rate = tonumber(bucket[3]) or max_rate
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    rate = math.min(max_rate, rate + max_rate * 0.02)
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now, 'rate', rate)
+redis.call('EXPIRE', KEYS[1], 3600)
+return tostring(wait)
+"""
+
+_PENALIZE = """
+local max_rate = tonumber(ARGV[1])
+local rate = tonumber(redis.call('HGET', KEYS[1], 'rate')) or max_rate
+rate = math.max(max_rate * tonumber(ARGV[2]), rate / 2)
+redis.call('HSET', KEYS[1], 'rate', rate, 'tokens', 0)
+return tostring(rate)
+"""
+
+
+class _BucketBase:
+    def __init__(self, client, name: str, rate: float, burst: float):
+        self.key = f"rate_limit:{name}"
+        self.rate = rate
+        self.burst = burst
+        self._take = client.register_script(_TAKE)
+        self._penalize = client.register_script(_PENALIZE)
+
+    def _take_args(self):
+        return {'keys': [self.key], 'args': [self.rate, self.burst, 1]}
+
+    def _penalize_args(self):
+        return {'keys': [self.key], 'args': [self.rate, MIN_RATE_FRACTION]}
+
+
+class RateLimiter(_BucketBase):
+    """Blocking token bucket for synchronous callers"""
+
+    def __init__(self, name: str = 'serper', client=None, rate: float = SERPER_RATE, burst: float = SERPER_BURST):
+        super().__init__(client or redis.Redis(**connection_kwargs()), name, rate, burst)
+
+    def acquire(self):
+        while True:
+            try:
+                wait = float(self._take(**self._take_args()))
+            except redis.RedisError as e:
+                print(f"Rate limiter unavailable, not throttling: {e}")
+                return
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def penalize(self):
+        """Back off after the API answered 429"""
+        try:
+            rate = float(self._penalize(**self._penalize_args()))
+            print(f"Rate limited by upstream; {self.key} now {rate:.2f}/s")
+        except redis.RedisError as e:
+            print(f"Rate limiter unavailable: {e}")
+
+
+class AsyncRateLimiter(_BucketBase):
+    """Token bucket for async callers; waiting does not block the event loop"""
+
+    def __init__(self, name: str = 'serper', client=None, rate: float = SERPER_RATE, burst: float = SERPER_BURST):
+        super().__init__(client or aioredis.Redis(**connection_kwargs()), name, rate, burst)
+
+    async def acquire(self):
+        while True:
+            try:
+                wait = float(await self._take(**self._take_args()))
+            except redis.RedisError as e:
+                print(f"Rate limiter unavailable, not throttling: {e}")
+                return
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    async def penalize(self):
+        """Back off after the API answered 429"""
+        try:
+            rate = float(await self._penalize(**self._penalize_args()))
+            print(f"Rate limited by upstream; {self.key} now {rate:.2f}/s")
+        except redis.RedisError as e:
+            print(f"Rate limiter unavailable: {e}")
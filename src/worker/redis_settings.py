@@ -0,0 +1,9 @@
+import os
+
+# Where the worker's Redis-backed helpers (search cache, rate limiter, single
+# flight, contact cache, entity index, seen filter) connect when they are not
+# handed a client.
+
+
+def connection_kwargs():
+    return {'host': os.getenv('REDIS_HOST', 'redis'), 'port': int(os.getenv('REDIS_PORT', '6379'))}
@@ -0,0 +1,74 @@
+import os
+import time
+import json
+import zlib
+import msgpack
+from pathlib import Path
+from typing import Dict, Optional
+
+# Task results are stored in Redis as zlib-compressed msgpack. Results whose
+# compressed form is larger than RESULT_BLOB_THRESHOLD bytes go to a blob file
+# under RESULT_BLOB_DIR (shared with the API through the /data volume) and
+# Redis only keeps a reference to it. src/api/result_codec.py decodes both,
+# plus the plain JSON strings written before this format existed.
+RESULT_TTL = 3600
+RESULT_BLOB_THRESHOLD = int(os.getenv('RESULT_BLOB_THRESHOLD', str(64 * 1024)))
+RESULT_BLOB_DIR = Path(os.getenv('RESULT_BLOB_DIR', '/data/results'))
+
+INLINE_PREFIX = b'\x00nkz'
+BLOB_PREFIX = b'\x00nkb'
+
+_next_prune = 0.0
+
+
+def result_key(task_id: str) -> str:
+    return f"result:{task_id}"
+
+
+def _prune_blobs():
+    """Drop blob files older than the Redis TTL that referenced them"""
+    global _next_prune
+    if time.time() < _next_prune:
+        return
+    _next_prune = time.time() + 600
+    cutoff = time.time() - RESULT_TTL
+    for path in RESULT_BLOB_DIR.glob('*.bin'):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+        except OSError:
+            pass
+
+
+def encode_result(task_id: str, result: Dict) -> bytes:
+    """Encode a result for SETEX, offloading it to disk if it is large.
+
+    Does file I/O for large results; call it via asyncio.to_thread from async code.
+    """
+    packed = zlib.compress(msgpack.packb(result, use_bin_type=True), 6)
+    if len(packed) <= RESULT_BLOB_THRESHOLD:
+        return INLINE_PREFIX + packed
+
+    RESULT_BLOB_DIR.mkdir(parents=True, exist_ok=True)
+    path = RESULT_BLOB_DIR / f"{task_id}.bin"
+    tmp = path.with_suffix('.tmp')
+    tmp.write_bytes(packed)
+    os.replace(tmp, path)
+    _prune_blobs()
+    return BLOB_PREFIX + path.name.encode()
+
+
+def decode_result(raw) -> Optional[Dict]:
+    if raw is None:
+        return None
+    if isinstance(raw, str):
+        raw = raw.encode()
+    if raw.startswith(INLINE_PREFIX):
+        return msgpack.unpackb(zlib.decompress(raw[len(INLINE_PREFIX):]), raw=False)
+    if raw.startswith(BLOB_PREFIX):
+        path = RESULT_BLOB_DIR / raw[len(BLOB_PREFIX):].decode()
+        try:
+            return msgpack.unpackb(zlib.decompress(path.read_bytes()), raw=False)
+        except FileNotFoundError:
+            return None
+    return json.loads(raw)
@@ -0,0 +1,116 @@
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+from signals import SignalMatcher
+
+# Batch scoring for prospect sweeps. A result set becomes one matrix (a row
+# per result, a column per signal) and scores, thresholds and rankings are
+# computed over the whole matrix instead of one dict at a time. Outputs match
+# the per-prospect code they replace:
+#   validation_scores   share of validation signals present (sum/len)
+#   pilot_scores        0.3 / 0.2 / 0.1 per signal by tier, capped at 1.0
+#   relevance_scores    0.5 + 0.1 per keyword + 0.2 for a move, capped at 1.0
+# Pilot scores are summed in whole tenths, so a candidate's score no longer
+# depends on the order its signals were found in.
+MIN_VALIDATION_SIGNALS = 2
+
+# Pilot signal weights in tenths; any other signal is worth one
+PILOT_WEIGHTS = {
+    'workflow': 3, 'delays': 3, 'scaling': 3, 'project management': 3,
+    'creative team': 2, 'marketing operations': 2, 'efficiency': 2,
+}
+PILOT_DEFAULT_WEIGHT = 1
+
+MOVE_TERMS = ['expansion', 'new office', 'headquarters', 'moving']
+
+
+def signal_matrix(texts: Sequence[str], matcher: SignalMatcher) -> np.ndarray:
+    """Bool matrix of which signals each text shows, columns in lexicon order"""
+    matrix = np.zeros((len(texts), len(matcher.lexicon)), dtype=bool)
+    for row, text in enumerate(texts):
+        matrix[row] = list(matcher.signals(text).values())
+    return matrix
+
+
+def validation_scores(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Validation score per row, and which rows have enough signals to keep"""
+    counts = matrix.sum(axis=1)
+    return counts / matrix.shape[1], counts >= MIN_VALIDATION_SIGNALS
+
+
+def pilot_scores(signal_lists: Sequence[Sequence[str]]) -> np.ndarray:
+    """Pilot candidate score per list of signals"""
+    rows = np.repeat(np.arange(len(signal_lists)), [len(signals) for signals in signal_lists])
+    weights = np.fromiter(
+        (PILOT_WEIGHTS.get(signal, PILOT_DEFAULT_WEIGHT) for signals in signal_lists for signal in signals),
+        dtype=np.int64, count=len(rows)
+    )
+    tenths = np.bincount(rows, weights=weights, minlength=len(signal_lists))
+    return np.minimum(tenths / 10, 1.0)
+
+
+def _relevance_table(keywords: int) -> np.ndarray:
+    """Every reachable relevance score, added up the way the old loop did"""
+    table = np.empty((keywords + 1, 2))
+    for matched in range(keywords + 1):
+        score = 0.5
+        for _ in range(matched):
+            score += 0.1
+        table[matched] = [min(score, 1.0), min(score + 0.2, 1.0)]
+    return table
+
+
+def relevance_scores(snippets: Sequence[str], keywords: Sequence[str]) -> np.ndarray:
+    """Lead relevance per snippet for the given search keywords"""
+    keywords = [keyword.lower() for keyword in keywords]
+    matched = np.zeros(len(snippets), dtype=np.int64)
+    moving = np.zeros(len(snippets), dtype=np.int64)
+    for row, snippet in enumerate(snippets):
+        snippet = snippet.lower()
+        matched[row] = sum(keyword in snippet for keyword in keywords)
+        moving[row] = any(term in snippet for term in MOVE_TERMS)
+    return _relevance_table(len(keywords))[matched, moving]
+
+
+def rank(scores: np.ndarray, limit: Optional[int] = None) -> np.ndarray:
+    """Row indices by descending score, ties in input order (like a stable reverse sort)"""
+    order = np.argsort(-np.asarray(scores, dtype=float), kind='stable')
+    return order if limit is None else order[:limit]
+
+
+def best_per_key(keys: Sequence[str], scores: np.ndarray) -> np.ndarray:
+    """Row indices of the highest-scoring row for each key, ranked.
+
+    Ties within a key go to the earliest row; ties between keys keep the
+    order in which the keys first appeared.
+    """
+    if not len(keys):
+        return np.zeros(0, dtype=np.int64)
+    scores = np.asarray(scores, dtype=float)
+    _, first, codes = np.unique(np.asarray(keys, dtype=object), return_index=True, return_inverse=True)
+    rows = np.arange(len(keys))
+    # Sorted by key, then score descending, then row: each key's winner comes first
+    order = np.lexsort((rows, -scores, codes))
+    winners = order[np.r_[True, codes[order][1:] != codes[order][:-1]]]
+    return winners[np.lexsort((first[codes[winners]], -scores[winners]))]
+
+
+def score_validation_results(rows: Sequence[Tuple[Dict, str]], matcher: SignalMatcher,
+                             company_name) -> List[Dict]:
+    """Validation prospects from (search result, market) rows, scored in one batch"""
+    texts = [result.get('title', '') + ' ' + result.get('snippet', '') for result, _ in rows]
+    matrix = signal_matrix(texts, matcher)
+    scores, keep = validation_scores(matrix)
+    names = list(matcher.lexicon)
+    prospects = []
+    for row in np.flatnonzero(keep):
+        result, market = rows[row]
+        prospects.append({
+            'title': result.get('title'),
+            'snippet': result.get('snippet'),
+            'link': result.get('link'),
+            'company_name': company_name(result),
+            'pain_signals': dict(zip(names, matrix[row].tolist())),
+            'market': market,
+            'validation_score': float(scores[row])
+        })
+    return prospects
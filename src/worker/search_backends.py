@@ -0,0 +1,472 @@
+import os
+import re
+import time
+import html
+import asyncio
+import threading
+import contextvars
+import httpx
+import http_pool
+import call_costs
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+from rate_limiter import RateLimiter, AsyncRateLimiter
+
+# Every search path goes through one router that knows these backends, all
+# normalized to Serper's shape ({'organic': [{title, link, snippet,
+# position}]}, plus 'backend' naming who answered):
+#   serper      google.serper.dev, paid, needs SERPER_API_KEY
+#   serper_alt  the same with a second account (SERPER_ALT_API_KEY), if set
+#   searxng     the compose `searxng` service's JSON API, free and local
+#   duckduckgo  the DuckDuckGo HTML page, free, no key
+# A profile gives the preference order: 'precise' lookups (decision makers,
+# company research) try Serper first, 'bulk' sweeps try the local engine
+# first. Within that order, backends are ranked by measured health (below),
+# and a failing backend falls through to the next one. A reply with no
+# results (SearxNG with its engines unresponsive, DuckDuckGo's anti-bot
+# page) counts as a failure, so it is neither returned nor cached.
+SERPER_URL = os.getenv('SERPER_URL', 'https://google.serper.dev/search')  # or the local stand-in, serper_standin.py
+SEARXNG_URL = os.getenv('SEARXNG_URL', 'http://searxng:8080')
+SEARCH_PROFILES = {
+    'precise': os.getenv('SEARCH_PRECISE_BACKENDS', 'serper,serper_alt,searxng,duckduckgo').split(','),
+    'bulk': os.getenv('SEARCH_BULK_BACKENDS', 'searxng,duckduckgo,serper,serper_alt').split(','),
+}
+
+# Health is an exponentially weighted average per backend and per process.
+# A backend is demoted while its error rate is above SEARCH_MAX_ERROR_RATE or
+# its latency above SEARCH_SLOW_SECONDS; after SEARCH_PROBE_INTERVAL seconds
+# without traffic it gets another chance. The rest are ranked by expected
+# seconds per good answer (latency / (1 - error rate)) in SEARCH_RANK_STEP
+# bands, with backends not measured yet after the measured ones; within a
+# band the profile's order holds, so a backend only jumps ahead of a
+# preferred one when it is clearly faster.
+SEARCH_MAX_ERROR_RATE = float(os.getenv('SEARCH_MAX_ERROR_RATE', '0.5'))
+SEARCH_SLOW_SECONDS = float(os.getenv('SEARCH_SLOW_SECONDS', '10'))
+SEARCH_RANK_STEP = float(os.getenv('SEARCH_RANK_STEP', '1.0'))
+SEARCH_PROBE_INTERVAL = 60
+HEALTH_DECAY = 0.2
+
+# Opt-in hedging: when the first backend has not answered within the
+# SEARCH_HEDGE_PERCENTILE of its recent latencies, the same query also goes
+# to the next backend in the plan (SearxNG, or a second Serper account set
+# via SERPER_ALT_API_KEY) and the first answer wins; the loser is cancelled.
+# Until enough samples exist the delay is SEARCH_HEDGE_DELAY. At most
+# SEARCH_HEDGE_BUDGET of searches are hedged, which bounds the extra cost.
+# Synchronous routers run hedged pairs on SEARCH_HEDGE_WORKERS threads (two
+# per SEARCH_FANOUT search thread by default); when every one is busy, for
+# instance with losers still waiting on a stuck backend, searches go out
+# unhedged instead of queueing behind them.
+SEARCH_HEDGE = os.getenv('SEARCH_HEDGE', '0') == '1'
+SEARCH_HEDGE_PERCENTILE = float(os.getenv('SEARCH_HEDGE_PERCENTILE', '95'))
+SEARCH_HEDGE_DELAY = float(os.getenv('SEARCH_HEDGE_DELAY', '2.0'))
+SEARCH_HEDGE_BUDGET = float(os.getenv('SEARCH_HEDGE_BUDGET', '0.1'))
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY = 0.2
+SEARCH_HEDGE_WORKERS = max(2, int(os.getenv('SEARCH_HEDGE_WORKERS', str(2 * int(os.getenv('SEARCH_FANOUT', '8'))))))
+
+
+class SearchError(Exception):
+    pass
+
+
+class RateLimited(SearchError):
+    pass
+
+
+class _PrimaryFailed(SearchError):
+    """The first backend of a hedged pair failed before the hedge went out"""
+
+
+class _Backend:
+    name = ''
+    timeout = 15.0
+    limiter = None
+
+    def available(self) -> bool:
+        return True
+
+    def request(self, query: str, num: int, gl: Optional[str], hl: Optional[str]) -> Dict:
+        """Keyword arguments for httpx's client.request()"""
+        raise NotImplementedError
+
+    def parse(self, response: httpx.Response, num: int) -> Dict:
+        raise NotImplementedError
+
+    def _check(self, response: httpx.Response):
+        if response.status_code == 429:
+            raise RateLimited(f"{self.name} rate limited")
+        if response.status_code != 200:
+            raise SearchError(f"{self.name} error: {response.status_code}")
+
+
+class SerperBackend(_Backend):
+    name = 'serper'
+    timeout = 30.0
+    limiter = 'serper'
+
+    def __init__(self, api_key: Optional[str] = None, name: str = 'serper'):
+        self.api_key = api_key
+        # A second account has its own quota, so its own token bucket
+        self.name = self.limiter = name
+
+    def available(self) -> bool:
+        return bool(self.api_key)
+
+    def request(self, query, num, gl, hl):
+        payload = {'q': query, 'num': num}
+        if gl:
+            payload['gl'] = gl
+        if hl:
+            payload['hl'] = hl
+        return {
+            'method': 'POST',
+            'url': SERPER_URL,
+            'headers': {'X-API-KEY': self.api_key, 'Content-Type': 'application/json'},
+            'json': payload
+        }
+
+    def parse(self, response, num):
+        self._check(response)
+        return response.json()
+
+
+class SearxngBackend(_Backend):
+    name = 'searxng'
+
+    def __init__(self, base_url: str = SEARXNG_URL):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, query, num, gl, hl):
+        params = {'q': query, 'format': 'json'}
+        if hl:
+            params['language'] = f"{hl}-{gl.upper()}" if gl else hl
+        return {'method': 'GET', 'url': f"{self.base_url}/search", 'params': params}
+
+    def parse(self, response, num):
+        self._check(response)
+        data = response.json()
+        if not data.get('results'):
+            unresponsive = [engine[0] if isinstance(engine, list) else engine
+                            for engine in data.get('unresponsive_engines', [])]
+            raise SearchError(f"no results, unresponsive engines: {', '.join(unresponsive) or 'none'}")
+        organic = [{
+            'title': item.get('title', ''),
+            'link': item.get('url', ''),
+            'snippet': item.get('content', ''),
+            'position': position
+        } for position, item in enumerate(data['results'][:num], 1)]
+        return {'organic': organic}
+
+
+_DDG_LINK = re.compile(r'class="result__a"[^>]*href="([^"]+)"[^>]*>(.*?)</a>', re.S)
+_DDG_SNIPPET = re.compile(r'class="result__snippet"[^>]*>(.*?)</a>', re.S)
+_TAGS = re.compile(r'<[^>]+>')
+
+
+def _strip(fragment: str) -> str:
+    return html.unescape(_TAGS.sub('', fragment)).strip()
+
+
+class DuckDuckGoBackend(_Backend):
+    name = 'duckduckgo'
+
+    def request(self, query, num, gl, hl):
+        return {
+            'method': 'POST',
+            'url': 'https://html.duckduckgo.com/html/',
+            'data': {'q': query},
+            'headers': {'User-Agent': 'Mozilla/5.0'}
+        }
+
+    def parse(self, response, num):
+        self._check(response)
+        snippets = [_strip(s) for s in _DDG_SNIPPET.findall(response.text)]
+        organic = []
+        for position, (href, title) in enumerate(_DDG_LINK.findall(response.text)[:num], 1):
+            # Result links go through a /l/?uddg=<target> redirect
+            target = parse_qs(urlparse(html.unescape(href)).query).get('uddg', [href])[0]
+            organic.append({
+                'title': _strip(title),
+                'link': target,
+                'snippet': snippets[position - 1] if position <= len(snippets) else '',
+                'position': position
+            })
+        if not organic:
+            # Also what the anti-bot challenge page looks like
+            raise SearchError("no results on the page")
+        return {'organic': organic}
+
+
+class _Health:
+    def __init__(self):
+        self.latency = None
+        self.error_rate = 0.0
+        self.last_used = 0.0
+        self.samples = deque(maxlen=200)
+
+    def record(self, seconds: Optional[float], ok: bool):
+        self.last_used = time.monotonic()
+        self.error_rate += HEALTH_DECAY * ((0.0 if ok else 1.0) - self.error_rate)
+        if seconds is not None:
+            self.latency = seconds if self.latency is None else self.latency + HEALTH_DECAY * (seconds - self.latency)
+            if ok:
+                self.samples.append(seconds)
+
+    def hedge_delay(self) -> float:
+        """How long to wait on this backend before hedging"""
+        if len(self.samples) < HEDGE_MIN_SAMPLES:
+            return SEARCH_HEDGE_DELAY
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(len(ordered) * SEARCH_HEDGE_PERCENTILE / 100))
+        return max(HEDGE_MIN_DELAY, ordered[index])
+
+    def expected(self) -> float:
+        """Seconds per good answer; backends not measured yet rank as the slowest healthy ones"""
+        if self.latency is None:
+            return SEARCH_SLOW_SECONDS
+        return self.latency / max(1.0 - self.error_rate, 0.05)
+
+    def demoted(self) -> bool:
+        if time.monotonic() - self.last_used > SEARCH_PROBE_INTERVAL:
+            return False
+        slow = self.latency is not None and self.latency > SEARCH_SLOW_SECONDS
+        return self.error_rate > SEARCH_MAX_ERROR_RATE or slow
+
+
+class _RouterBase:
+    def __init__(self, serper_api_key: Optional[str] = None, hedge: bool = SEARCH_HEDGE):
+        self.backends = {
+            backend.name: backend
+            for backend in (
+                SerperBackend(serper_api_key or os.getenv('SERPER_API_KEY')),
+                SerperBackend(os.getenv('SERPER_ALT_API_KEY'), name='serper_alt'),
+                SearxngBackend(),
+                DuckDuckGoBackend()
+            )
+        }
+        self.health = {name: _Health() for name in self.backends}
+        self.hedge = hedge
+        self.searches = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def plan(self, profile: str) -> List[_Backend]:
+        """Backends to try for a profile, healthiest first and demoted ones last"""
+        names = [n.strip() for n in SEARCH_PROFILES.get(profile, SEARCH_PROFILES['precise'])]
+        backends = [self.backends[n] for n in names if n in self.backends and self.backends[n].available()]
+        # A stable sort, so ties keep the profile's order
+        return sorted(backends, key=lambda backend: (
+            self.health[backend.name].demoted(), int(self.health[backend.name].expected() // SEARCH_RANK_STEP)
+        ))
+
+    def stats(self) -> Dict[str, Dict]:
+        stats = {
+            name: {
+                'latency': round(h.latency, 3) if h.latency is not None else None,
+                'error_rate': round(h.error_rate, 3),
+                'demoted': h.demoted()
+            }
+            for name, h in self.health.items()
+        }
+        stats['hedging'] = {'searches': self.searches, 'hedged': self.hedges, 'hedge_won': self.hedge_wins}
+        return stats
+
+    def _hedge_for(self, plan: List[_Backend], hedge: Optional[bool]) -> Optional[float]:
+        """Delay before hedging the first backend with the second, or None for no hedge"""
+        self.searches += 1
+        if not (self.hedge if hedge is None else hedge) or len(plan) < 2:
+            return None
+        if self.hedges >= SEARCH_HEDGE_BUDGET * self.searches:
+            return None
+        return self.health[plan[0].name].hedge_delay()
+
+    def _succeeded(self, backend: _Backend, started: float, response: httpx.Response, results: Dict) -> Dict:
+        seconds = time.monotonic() - started
+        self.health[backend.name].record(seconds, True)
+        call_costs.record('search', backend.name, seconds, len(response.content))
+        results['backend'] = backend.name
+        return results
+
+    def _failed(self, backend: _Backend, started: float, error: Exception):
+        seconds = time.monotonic() - started
+        self.health[backend.name].record(seconds, False)
+        call_costs.record('search', backend.name, seconds, ok=False)
+        print(f"Search backend {backend.name} failed, falling back: {error}")
+
+    @staticmethod
+    def _exhausted(query: str, errors: List[str]) -> SearchError:
+        return SearchError(f"All search backends failed for '{query}': {'; '.join(errors) or 'none available'}")
+
+
+class SearchRouter(_RouterBase):
+    """Search across backends for synchronous callers"""
+
+    def __init__(self, client=None, serper_api_key: Optional[str] = None, hedge: bool = SEARCH_HEDGE):
+        super().__init__(serper_api_key, hedge)
+        self.limiters = {name: RateLimiter(name, client) for name in ('serper', 'serper_alt')}
+        # Threads for hedged pairs; a losing request cannot be interrupted
+        # mid-flight here, so it is left to finish and its answer dropped.
+        self._hedge_pool = None
+        self._hedge_slots = threading.BoundedSemaphore(SEARCH_HEDGE_WORKERS)
+
+    def _attempt(self, backend: _Backend, query, num, gl, hl) -> Dict:
+        if backend.limiter:
+            self.limiters[backend.limiter].acquire()
+        started = time.monotonic()
+        try:
+            response = http_pool.get_sync_client().request(
+                timeout=backend.timeout, **backend.request(query, num, gl, hl)
+            )
+            return self._succeeded(backend, started, response, backend.parse(response, num))
+        except (httpx.HTTPError, ValueError, SearchError) as e:
+            if isinstance(e, RateLimited) and backend.limiter:
+                self.limiters[backend.limiter].penalize()
+            self._failed(backend, started, e)
+            raise SearchError(f"{backend.name}: {e}") from e
+
+    def _submit(self, backend: _Backend, query, num, gl, hl):
+        """Run an attempt on a hedge thread, or None when every thread is busy"""
+        if not self._hedge_slots.acquire(blocking=False):
+            return None
+        if self._hedge_pool is None:
+            self._hedge_pool = ThreadPoolExecutor(max_workers=SEARCH_HEDGE_WORKERS)
+        # Context copies so the hedged calls are counted against the caller's task
+        future = self._hedge_pool.submit(contextvars.copy_context().run, self._attempt, backend, query, num, gl, hl)
+        future.add_done_callback(lambda _: self._hedge_slots.release())
+        return future
+
+    def _hedged(self, first, primary: _Backend, secondary: _Backend, delay: float, query, num, gl, hl) -> Dict:
+        done, _ = wait([first], timeout=delay)
+        if done:
+            try:
+                return first.result()
+            except SearchError as e:
+                raise _PrimaryFailed(str(e)) from e
+        second = self._submit(secondary, query, num, gl, hl)
+        if second is None:
+            # No thread for the hedge: wait the first out, then fall through as unhedged
+            try:
+                return first.result()
+            except SearchError as e:
+                try:
+                    return self._attempt(secondary, query, num, gl, hl)
+                except SearchError as e2:
+                    raise SearchError(f"{e}; {e2}") from e2
+        self.hedges += 1
+        print(f"Search on {primary.name} slower than {delay:.2f}s, hedging with {secondary.name}")
+        pending, error = {first, second}, None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                    if future is second:
+                        self.hedge_wins += 1
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def search(self, query: str, num: int = 10, gl: Optional[str] = None, hl: Optional[str] = None,
+               profile: str = 'precise', hedge: Optional[bool] = None) -> Dict:
+        plan = self.plan(profile)
+        errors = []
+        delay = self._hedge_for(plan, hedge)
+        first = self._submit(plan[0], query, num, gl, hl) if delay is not None else None
+        if first is not None:
+            try:
+                return self._hedged(first, plan[0], plan[1], delay, query, num, gl, hl)
+            except SearchError as e:
+                errors.append(str(e))
+                # Go on from the first backend that no request went to
+                plan = plan[1:] if isinstance(e, _PrimaryFailed) else plan[2:]
+        for backend in plan:
+            try:
+                return self._attempt(backend, query, num, gl, hl)
+            except SearchError as e:
+                errors.append(str(e))
+        raise self._exhausted(query, errors)
+
+
+class AsyncSearchRouter(_RouterBase):
+    """Search across backends for async callers"""
+
+    def __init__(self, client=None, serper_api_key: Optional[str] = None, slots: Optional[asyncio.Semaphore] = None,
+                 hedge: bool = SEARCH_HEDGE):
+        super().__init__(serper_api_key, hedge)
+        self.limiters = {name: AsyncRateLimiter(name, client) for name in ('serper', 'serper_alt')}
+        self.slots = slots
+
+    async def _request(self, backend: _Backend, query, num, gl, hl) -> httpx.Response:
+        kwargs = backend.request(query, num, gl, hl)
+        if self.slots is None:
+            return await http_pool.get_async_client().request(timeout=backend.timeout, **kwargs)
+        async with self.slots:
+            return await http_pool.get_async_client().request(timeout=backend.timeout, **kwargs)
+
+    async def _attempt(self, backend: _Backend, query, num, gl, hl) -> Dict:
+        if backend.limiter:
+            await self.limiters[backend.limiter].acquire()
+        started = time.monotonic()
+        try:
+            response = await self._request(backend, query, num, gl, hl)
+            return self._succeeded(backend, started, response, backend.parse(response, num))
+        except asyncio.CancelledError:
+            # A hedge loser still went out, so it still costs
+            call_costs.record('search', backend.name, time.monotonic() - started, ok=False)
+            raise
+        except (httpx.HTTPError, ValueError, SearchError) as e:
+            if isinstance(e, RateLimited) and backend.limiter:
+                await self.limiters[backend.limiter].penalize()
+            self._failed(backend, started, e)
+            raise SearchError(f"{backend.name}: {e}") from e
+
+    async def _hedged(self, primary: _Backend, secondary: _Backend, delay: float, query, num, gl, hl) -> Dict:
+        first = asyncio.ensure_future(self._attempt(primary, query, num, gl, hl))
+        pending = {first}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done:
+                try:
+                    return first.result()
+                except SearchError as e:
+                    raise _PrimaryFailed(str(e)) from e
+            self.hedges += 1
+            print(f"Search on {primary.name} slower than {delay:.2f}s, hedging with {secondary.name}")
+            second = asyncio.ensure_future(self._attempt(secondary, query, num, gl, hl))
+            pending.add(second)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # The loser (or both, if we were cancelled) stops here
+            for task in pending:
+                task.cancel()
+
+    async def search(self, query: str, num: int = 10, gl: Optional[str] = None, hl: Optional[str] = None,
+                     profile: str = 'precise', hedge: Optional[bool] = None) -> Dict:
+        plan = self.plan(profile)
+        errors = []
+        delay = self._hedge_for(plan, hedge)
+        if delay is not None:
+            try:
+                return await self._hedged(plan[0], plan[1], delay, query, num, gl, hl)
+            except SearchError as e:
+                errors.append(str(e))
+                # Go on from the first backend that no request went to
+                plan = plan[1:] if isinstance(e, _PrimaryFailed) else plan[2:]
+        for backend in plan:
+            try:
+                return await self._attempt(backend, query, num, gl, hl)
+            except SearchError as e:
+                errors.append(str(e))
+        raise self._exhausted(query, errors)
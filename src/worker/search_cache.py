@@ -0,0 +1,84 @@
+import os
+import json
+import zlib
+import hashlib
+import redis
+import redis.asyncio as aioredis
+from typing import Dict, Optional
+from redis_settings import connection_kwargs
+
+# Serper responses cached in Redis and shared by every worker process and
+# search path. Keys cover the normalized query plus num/gl/hl and the search
+# profile, so results a 'bulk' sweep got from SearxNG or DuckDuckGo are never
+# served to a 'precise' (Serper-first) search; values are
+# zlib-compressed JSON. Hit/miss counts live in the search_cache:stats hash.
+SEARCH_CACHE_TTL = int(os.getenv('SEARCH_CACHE_TTL', str(24 * 3600)))
+STATS_KEY = 'search_cache:stats'
+
+
+def normalize_query(query: str) -> str:
+    return ' '.join(query.lower().split())
+
+
+def cache_key(query: str, num: int, gl: Optional[str] = None, hl: Optional[str] = None,
+              profile: str = 'precise') -> str:
+    digest = hashlib.sha1(json.dumps([normalize_query(query), num, gl, hl, profile]).encode()).hexdigest()
+    return f"search_cache:{digest}"
+
+
+class SearchCache:
+    """Cache for synchronous search code. Redis errors count as misses."""
+
+    def __init__(self, client=None, ttl: int = SEARCH_CACHE_TTL):
+        self.client = client or redis.Redis(**connection_kwargs())
+        self.ttl = ttl
+
+    def get(self, query: str, num: int, gl: Optional[str] = None, hl: Optional[str] = None,
+            profile: str = 'precise') -> Optional[Dict]:
+        if self.ttl <= 0:
+            return None
+        try:
+            raw = self.client.get(cache_key(query, num, gl, hl, profile))
+            self.client.hincrby(STATS_KEY, 'hits' if raw else 'misses', 1)
+        except redis.RedisError as e:
+            print(f"Search cache unavailable: {e}")
+            return None
+        return json.loads(zlib.decompress(raw)) if raw else None
+
+    def set(self, query: str, num: int, gl: Optional[str], hl: Optional[str], results: Dict,
+            profile: str = 'precise'):
+        if self.ttl <= 0:
+            return
+        try:
+            self.client.setex(cache_key(query, num, gl, hl, profile), self.ttl, zlib.compress(json.dumps(results).encode()))
+        except redis.RedisError as e:
+            print(f"Search cache unavailable: {e}")
+
+
+class AsyncSearchCache:
+    """Cache for async search code. Redis errors count as misses."""
+
+    def __init__(self, client=None, ttl: int = SEARCH_CACHE_TTL):
+        self.client = client or aioredis.Redis(**connection_kwargs())
+        self.ttl = ttl
+
+    async def get(self, query: str, num: int, gl: Optional[str] = None, hl: Optional[str] = None,
+                  profile: str = 'precise') -> Optional[Dict]:
+        if self.ttl <= 0:
+            return None
+        try:
+            raw = await self.client.get(cache_key(query, num, gl, hl, profile))
+            await self.client.hincrby(STATS_KEY, 'hits' if raw else 'misses', 1)
+        except redis.RedisError as e:
+            print(f"Search cache unavailable: {e}")
+            return None
+        return json.loads(zlib.decompress(raw)) if raw else None
+
+    async def set(self, query: str, num: int, gl: Optional[str], hl: Optional[str], results: Dict,
+                  profile: str = 'precise'):
+        if self.ttl <= 0:
+            return
+        try:
+            await self.client.setex(cache_key(query, num, gl, hl, profile), self.ttl, zlib.compress(json.dumps(results).encode()))
+        except redis.RedisError as e:
+            print(f"Search cache unavailable: {e}")
@@ -1,9 +1,25 @@
 import os
-import httpx
-import json
-from typing import Dict, List, Optional
-from datetime import datetime
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional
 from enum import Enum
+import call_costs
+from search_cache import AsyncSearchCache, cache_key
+from single_flight import AsyncSingleFlight
+from search_backends import AsyncSearchRouter
+from signals import VALIDATION_SIGNALS
+from scoring import best_per_key, score_validation_results
+from entities import AsyncEntityIndex
+from prospect_store import AsyncProspectStore
+from seen_filter import SEARCH_INCREMENTAL, AsyncSeenFilter
+from contacts import (
+    CONTACT_LOOKUP, CONTACT_RESULTS, DECISION_MAKER_ROLES, AsyncContactCache,
+    contact_query, decision_makers, parse_contacts
+)
+
+# Searches that fan out (queries, companies x roles) run at most this many
+# at once. Results are always merged in input order, so the output does not
+# depend on which request happens to finish first.
+SEARCH_FANOUT = max(1, int(os.getenv('SEARCH_FANOUT', '8')))
 
 class CalmOpsPriority(Enum):
     """Aligned with your top 10 priorities for CalmOps"""
@@ -17,8 +33,15 @@ class CalmOpsPriority(Enum):
 
 class CalmOpsSearchService:
     def __init__(self):
-        self.api_key = os.getenv('8c05dfce5bdd4f7a982c7c4604208a44e2502179')
-        self.base_url = "https://google.serper.dev/search"
+        self.api_key = os.getenv('SERPER_API_KEY')
+        self.cache = AsyncSearchCache()
+        self.search = AsyncSearchRouter(serper_api_key=self.api_key)
+        self.contacts = AsyncContactCache()
+        self.entities = AsyncEntityIndex()
+        self.store = AsyncProspectStore()
+        self.seen_validate = AsyncSeenFilter('validate')
+        self.seen_outreach = AsyncSeenFilter('outreach')
+        self.flights = AsyncSingleFlight('serper')
         
         # Target markets - avoiding SF as you mentioned
         self.target_markets = {
@@ -44,15 +67,21 @@ class CalmOpsSearchService:
             }
         }
         
-    async def validate_problem_search(self, market: str = 'all', week_number: int = 1) -> Dict:
+    async def validate_problem_search(self, market: str = 'all', week_number: int = 1,
+                                     incremental: Optional[bool] = None) -> Dict:
         """
         Week 1 Priority: Find 10 target prospects with visible workflow challenges
+        
+        Incremental runs (SEARCH_INCREMENTAL) only process results no earlier run has seen.
         """
+        incremental = SEARCH_INCREMENTAL if incremental is None else incremental
         results = {
             'priority': 'VALIDATE_PROBLEM',
             'week': week_number,
             'prospects': [],
-            'decision_makers': []
+            'decision_makers': [],
+            'incremental': incremental,
+            'skipped_seen': 0
         }
         
         # Search queries specifically for finding companies with workflow pain
@@ -66,21 +95,34 @@ class CalmOpsSearchService:
             f"project management creative teams {market}"
         ]
         
-        for query in validation_queries:
+        async def run_search(query):
             try:
-                search_results = await self._search(query)
-                prospects = self._extract_validation_prospects(search_results, market)
-                results['prospects'].extend(prospects)
+                search_results = await self._search(query, profile='bulk')
+                return [(result, market) for result in search_results.get('organic', [])]
             except Exception as e:
                 print(f"Search error: {e}")
+                return []
+        
+        # Every result from the sweep is scored in one batch
+        rows = [row for found in await self._fan_out(run_search, validation_queries) for row in found]
+        results['prospects'] = self._validation_prospects(rows)
                 
         # Deduplicate and score
-        results['prospects'] = self._score_validation_prospects(results['prospects'])
+        results['prospects'] = await self._score_validation_prospects(results['prospects'])
+        if incremental:
+            fresh = await self.seen_validate.check(results['prospects'])
+            results['skipped_seen'] = len(results['prospects']) - sum(fresh)
+            results['prospects'] = [prospect for prospect, new in zip(results['prospects'], fresh) if new]
+        
+        # Find decision makers for top prospects, all companies at once
+        for found in await self._fan_out(self._find_decision_makers, results['prospects'][:10]):
+            results['decision_makers'].extend(found)
         
-        # Find decision makers for top prospects
-        for prospect in results['prospects'][:10]:
-            decision_makers = await self._find_decision_makers(prospect)
-            results['decision_makers'].extend(decision_makers)
+        await self.store.upsert_prospects(results['prospects'], 'validate_problem')
+        await self.store.upsert_contacts(results['decision_makers'])
+        if incremental:
+            # Only the prospects followed up here count as handled; the rest stay new
+            await self.seen_validate.mark(results['prospects'][:10])
             
         return results
     
@@ -118,6 +160,12 @@ class CalmOpsSearchService:
                     
             company_intel['pilot_score'] = self._calculate_pilot_score(company_intel)
             pilot_candidates.append(company_intel)
+        
+        # Back onto the validated prospects' rows, so the store keeps the pilot scores
+        await self.store.upsert_prospects([
+            {**prospect, **candidate}
+            for prospect, candidate in zip(validated_prospects, pilot_candidates)
+        ], 'find_pilots')
             
         return {
             'pilot_candidates': sorted(pilot_candidates, 
@@ -156,11 +204,16 @@ class CalmOpsSearchService:
     
     async def scale_outreach_targets(self, 
                                     market: str,
-                                    target_count: int = 50) -> Dict:
+                                    target_count: int = 50,
+                                    incremental: Optional[bool] = None) -> Dict:
         """
         Week 5-6 Priority: Find 50 target companies for scaled outreach
+        
+        Incremental runs (SEARCH_INCREMENTAL) skip companies an earlier run already handled.
         """
+        incremental = SEARCH_INCREMENTAL if incremental is None else incremental
         targets = []
+        skipped = 0
         
         # Industry-specific searches for each market
         market_config = self.target_markets.get(market, self.target_markets['new_york'])
@@ -169,87 +222,79 @@ class CalmOpsSearchService:
             query = f"{sector} companies {market_config['query_suffix']} {market_config['companies_size']}"
             
             try:
-                results = await self._search(query, num_results=20)
+                results = await self._search(query, num_results=20, profile='bulk')
                 companies = self._extract_outreach_targets(results, market, sector)
                 targets.extend(companies)
             except Exception as e:
                 print(f"Outreach search error: {e}")
+        
+        if incremental:
+            fresh = await self.seen_outreach.check(targets)
+            skipped = len(targets) - sum(fresh)
+            targets = [target for target, new in zip(targets, fresh) if new]
                 
-        # LinkedIn specific searches for decision makers
-        for target in targets[:target_count]:
-            linkedin_query = f"site:linkedin.com/in creative director {target['company_name']} OR CMO OR marketing operations"
-            try:
-                results = await self._search(linkedin_query)
-                target['contacts'] = self._extract_linkedin_contacts(results)
-            except Exception as e:
-                print(f"LinkedIn search error: {e}")
+        # LinkedIn contacts for top targets, sharing each company's contact lookup
+        top_targets = [t for t in targets[:target_count] if t.get('company_name')]
+        contacts = await self._fan_out(lambda target: self._company_contacts(target['company_name']), top_targets)
+        for target, found in zip(top_targets, contacts):
+            target['contacts'] = [{
+                'name': contact['name'],
+                'role': contact['role'],
+                'linkedin_url': contact['linkedin_url'],
+                'title_snippet': contact.get('snippet') or ''
+            } for contact in found]
+        
+        await self.store.upsert_prospects(targets, 'scale_outreach')
+        await self.store.upsert_contacts([contact for found in contacts for contact in found])
+        if incremental:
+            # Targets past target_count are not returned, so they stay new
+            await self.seen_outreach.mark(targets[:target_count])
                 
         return {
             'outreach_targets': targets[:target_count],
             'by_sector': self._group_by_sector(targets),
             'by_market': market,
-            'total_found': len(targets)
+            'total_found': len(targets),
+            'incremental': incremental,
+            'skipped_seen': skipped
         }
     
-    async def _search(self, query: str, num_results: int = 10) -> Dict:
-        """Execute search via Serper API"""
-        headers = {
-            'X-API-KEY': self.api_key,
-            'Content-Type': 'application/json'
-        }
-        
-        payload = {
-            'q': query,
-            'num': num_results,
-            'gl': 'us',
-            'hl': 'en'
-        }
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                self.base_url,
-                headers=headers,
-                json=payload,
-                timeout=30.0
-            )
-            
-        if response.status_code == 200:
-            return response.json()
-        raise Exception(f"Serper API error: {response.status_code}")
+    async def _search(self, query: str, num_results: int = 10, profile: str = 'precise') -> Dict:
+        """Execute search on the best available backend for the profile"""
+        cached = await self.cache.get(query, num_results, 'us', 'en', profile)
+        if cached is not None:
+            call_costs.saved('cache')
+            return cached
+        # Identical queries running elsewhere share one request
+        return await self.flights.do(
+            cache_key(query, num_results, 'us', 'en', profile),
+            lambda: self._fetch(query, num_results, profile)
+        )
+    
+    async def _fetch(self, query: str, num_results: int, profile: str) -> Dict:
+        """Search request for a query nobody else is fetching right now"""
+        results = await self.search.search(query, num_results, 'us', 'en', profile=profile)
+        await self.cache.set(query, num_results, 'us', 'en', results, profile)
+        return results
     
     def _extract_validation_prospects(self, search_results: Dict, market: str) -> List[Dict]:
         """Extract companies showing workflow pain signals"""
-        prospects = []
-        
-        for result in search_results.get('organic', []):
-            text = (result.get('title', '') + ' ' + result.get('snippet', '')).lower()
-            
-            # Pain signals to look for
-            pain_signals = {
-                'growing_pains': any(term in text for term in 
-                                   ['growing pains', 'scaling challenges', 'rapid growth']),
-                'workflow_issues': any(term in text for term in 
-                                     ['workflow', 'coordination', 'collaboration challenges']),
-                'hiring_creative': any(term in text for term in 
-                                     ['hiring creative', 'hiring marketing', 'building team']),
-                'series_funding': any(term in text for term in 
-                                    ['series a', 'series b', 'raised', 'funding']),
-                'operational': any(term in text for term in 
-                                 ['operations', 'efficiency', 'productivity'])
-            }
-            
-            if sum(pain_signals.values()) >= 2:  # At least 2 pain signals
-                prospects.append({
-                    'title': result.get('title'),
-                    'snippet': result.get('snippet'),
-                    'link': result.get('link'),
-                    'company_name': self._extract_company_name(result),
-                    'pain_signals': pain_signals,
-                    'market': market,
-                    'validation_score': sum(pain_signals.values()) / len(pain_signals)
-                })
-                
-        return prospects
+        return self._validation_prospects([(result, market) for result in search_results.get('organic', [])])
+    
+    def _validation_prospects(self, rows: List[tuple]) -> List[Dict]:
+        """Prospects with at least 2 pain signals from (search result, market) rows"""
+        return score_validation_results(rows, VALIDATION_SIGNALS, self._extract_company_name)
+    
+    async def _score_validation_prospects(self, prospects: List[Dict]) -> List[Dict]:
+        """Score and deduplicate prospects"""
+        # Deduplicate by company, keeping each company's best-scored prospect.
+        # "Acme Inc.", "Acme | LinkedIn" and acme.com resolve to one entity.
+        named = [prospect for prospect in prospects if prospect.get('company_name', '')]
+        entity_ids = await self.entities.resolve([(prospect['company_name'], prospect.get('link')) for prospect in named])
+        for prospect, entity_id in zip(named, entity_ids):
+            prospect['entity_id'] = entity_id
+        winners = best_per_key(entity_ids, [prospect.get('validation_score', 0) for prospect in named])
+        return [named[i] for i in winners]
     
     def _extract_company_name(self, result: Dict) -> str:
         """Extract company name from search result"""
@@ -260,30 +305,56 @@ class CalmOpsSearchService:
             title = title.replace(suffix, '')
         return title.split('-')[0].strip()
     
+    async def _fan_out(self, fn: Callable[..., Awaitable], items: List) -> List:
+        """Await fn on each item, at most SEARCH_FANOUT at once; results keep input order"""
+        slots = asyncio.Semaphore(SEARCH_FANOUT)
+        
+        async def bounded(item):
+            async with slots:
+                return await fn(item)
+        
+        return await asyncio.gather(*(bounded(item) for item in items))
+    
     async def _find_decision_makers(self, prospect: Dict) -> List[Dict]:
         """Find decision makers for a prospect company"""
         company = prospect.get('company_name')
+        if not company:
+            return []
         
-        # Search for specific roles
-        roles = ['Creative Director', 'CMO', 'VP Marketing', 'Marketing Operations Manager']
-        decision_makers = []
-        
-        for role in roles:
-            query = f"site:linkedin.com/in {role} {company}"
-            try:
-                results = await self._search(query, num_results=3)
-                for result in results.get('organic', []):
-                    decision_makers.append({
-                        'company': company,
-                        'role': role,
-                        'linkedin_url': result.get('link'),
-                        'name': self._extract_name_from_title(result.get('title', '')),
-                        'snippet': result.get('snippet')
-                    })
-            except:
-                continue
-                
-        return decision_makers
+        if CONTACT_LOOKUP == 'per_role':
+            lookups = await self._fan_out(lambda role: self._find_role(company, role), DECISION_MAKER_ROLES)
+            return [decision_maker for found in lookups for decision_maker in found]
+        return decision_makers(await self._company_contacts(company))
+    
+    async def _company_contacts(self, company: str) -> List[Dict]:
+        """Every LinkedIn contact at a company from one combined query, cached per company"""
+        contacts = await self.contacts.get(company)
+        if contacts is not None:
+            call_costs.saved('cache')
+            return contacts
+        try:
+            results = await self._search(contact_query(company), num_results=CONTACT_RESULTS)
+        except Exception as e:
+            print(f"LinkedIn search error: {e}")
+            return []
+        contacts = parse_contacts(company, results)
+        await self.contacts.set(company, contacts)
+        return contacts
+    
+    async def _find_role(self, company: str, role: str) -> List[Dict]:
+        """LinkedIn profiles for one role at one company"""
+        query = f"site:linkedin.com/in {role} {company}"
+        try:
+            results = await self._search(query, num_results=3)
+        except:
+            return []
+        return [{
+            'company': company,
+            'role': role,
+            'linkedin_url': result.get('link'),
+            'name': self._extract_name_from_title(result.get('title', '')),
+            'snippet': result.get('snippet')
+        } for result in results.get('organic', [])]
     
     def _extract_name_from_title(self, title: str) -> str:
         """Extract name from LinkedIn title"""
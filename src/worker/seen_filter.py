@@ -0,0 +1,183 @@
+import os
+import hashlib
+import redis
+import redis.asyncio as aioredis
+from typing import Dict, List
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from entities import AGGREGATOR_DOMAINS, canonical_domain, domain_label, label_agrees, normalize_name
+from redis_settings import connection_kwargs
+
+# Incremental sweeps: a persistent record of the search results a sweep has
+# already handled, so a repeat run only extracts, looks up contacts for and
+# writes outreach for what is new. Each sweep kind has its own Bloom filter,
+# a plain Redis bitmap at seen:{scope}. A result counts as seen when its URL
+# was seen before, or when it is on its company's own website and that
+# domain was (another page of a company already handled). A domain counts as
+# the company's only when its label agrees with the extracted company name,
+# so one article does not hide a news or blog host for good.
+#
+# Checking a result does not mark it: a sweep marks only the results it
+# emitted, once they are saved, so a run that fails, is requeued on shutdown
+# or truncates its results leaves the rest new for the next run. Two sweeps
+# running at once may both take a result.
+#
+# The default 2^24 bits with 7 hashes (2 MiB per scope) hold about 1.7M URLs
+# and domains at a 1% false-positive rate; a false positive skips a new result.
+# SEARCH_INCREMENTAL=1 turns incremental mode on by default; a task can set
+# 'incremental' either way. Redis errors count every result as new.
+SEARCH_INCREMENTAL = os.getenv('SEARCH_INCREMENTAL', '0') == '1'
+SEEN_FILTER_BITS = int(os.getenv('SEEN_FILTER_BITS', str(1 << 24)))
+SEEN_FILTER_HASHES = int(os.getenv('SEEN_FILTER_HASHES', '7'))
+STATS_KEY = 'seen_filter:stats'
+CHECK_BATCH = 2000   # results per script call, so one call never holds Redis for long
+
+# Returns, per member, 1 if all of its bits are set
+_CHECK = """
+local k = tonumber(ARGV[1])
+local seen = {}
+for i = 2, #ARGV, k do
+    local present = 1
+    for j = i, i + k - 1 do
+        if redis.call('GETBIT', KEYS[1], ARGV[j]) == 0 then
+            present = 0
+            break
+        end
+    end
+    seen[#seen + 1] = present
+end
+return seen
+"""
+
+_MARK = """
+for i = 1, #ARGV do
+    redis.call('SETBIT', KEYS[1], ARGV[i], 1)
+end
+return #ARGV
+"""
+
+
+def normalize_url(link: str) -> str:
+    """URL without scheme, www, fragment, trailing slash or utm_ parameters"""
+    parts = urlsplit(link.strip())
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query) if not k.lower().startswith('utm_')])
+    return urlunsplit(('', host, parts.path.rstrip('/'), query, ''))
+
+
+def members(result: Dict) -> List[str]:
+    """What a result is remembered by: its URL, and its domain when that is its company's site"""
+    link = result.get('link') or ''
+    if not link:
+        return []
+    found = [f"url:{normalize_url(link)}"]
+    domain = canonical_domain(link)
+    name = normalize_name(result.get('company_name') or result.get('company'))
+    if name and domain and domain not in AGGREGATOR_DOMAINS and label_agrees(name, domain_label(domain)):
+        found.append(f"domain:{domain}")
+    return found
+
+
+def bit_positions(member: str, bits: int = SEEN_FILTER_BITS, hashes: int = SEEN_FILTER_HASHES) -> List[int]:
+    digest = hashlib.blake2b(member.encode(), digest_size=16).digest()
+    h1, h2 = int.from_bytes(digest[:8], 'big'), int.from_bytes(digest[8:], 'big') | 1
+    return [(h1 + i * h2) % bits for i in range(hashes)]
+
+
+class _FilterBase:
+    def __init__(self, client, scope: str):
+        self.client = client
+        self.scope = scope
+        self.key = f"seen:{scope}"
+        self._check = client.register_script(_CHECK)
+        self._mark = client.register_script(_MARK)
+
+    @staticmethod
+    def _args(results: List[Dict]):
+        per_result = [members(result) for result in results]
+        args = [SEEN_FILTER_HASHES]
+        for found in per_result:
+            for member in found:
+                args.extend(bit_positions(member))
+        return per_result, args
+
+    @staticmethod
+    def _positions(results: List[Dict]) -> List[int]:
+        return [position for result in results for member in members(result) for position in bit_positions(member)]
+
+    @staticmethod
+    def _new(per_result, replies) -> List[bool]:
+        replies = iter(replies)
+        # A result without a link can't be remembered, so it is always new
+        return [not any([next(replies) for _ in found]) if found else True for found in per_result]
+
+    def _count(self, pipe, fresh: List[bool]):
+        pipe.hincrby(STATS_KEY, f"{self.scope}:new", sum(fresh))
+        pipe.hincrby(STATS_KEY, f"{self.scope}:seen", len(fresh) - sum(fresh))
+
+
+class SeenFilter(_FilterBase):
+    """Seen-result filter for synchronous sweeps"""
+
+    def __init__(self, scope: str, client=None):
+        super().__init__(client or redis.Redis(**connection_kwargs()), scope)
+
+    def check(self, results: List[Dict]) -> List[bool]:
+        """Whether each result is new to this sweep; marks nothing"""
+        fresh = []
+        try:
+            for start in range(0, len(results), CHECK_BATCH):
+                per_result, args = self._args(results[start:start + CHECK_BATCH])
+                replies = self._check(keys=[self.key], args=args) if len(args) > 1 else []
+                fresh.extend(self._new(per_result, replies))
+            with self.client.pipeline(transaction=False) as pipe:
+                self._count(pipe, fresh)
+                pipe.execute()
+        except redis.RedisError as e:
+            print(f"Seen filter unavailable, treating results as new: {e}")
+            return [True] * len(results)
+        return fresh
+
+    def mark(self, results: List[Dict]):
+        """Remember results the sweep has emitted and saved"""
+        try:
+            for start in range(0, len(results), CHECK_BATCH):
+                positions = self._positions(results[start:start + CHECK_BATCH])
+                if positions:
+                    self._mark(keys=[self.key], args=positions)
+        except redis.RedisError as e:
+            print(f"Seen filter unavailable, results not marked: {e}")
+
+
+class AsyncSeenFilter(_FilterBase):
+    """Seen-result filter for async sweeps"""
+
+    def __init__(self, scope: str, client=None):
+        super().__init__(client or aioredis.Redis(**connection_kwargs()), scope)
+
+    async def check(self, results: List[Dict]) -> List[bool]:
+        """Whether each result is new to this sweep; marks nothing"""
+        fresh = []
+        try:
+            for start in range(0, len(results), CHECK_BATCH):
+                per_result, args = self._args(results[start:start + CHECK_BATCH])
+                replies = await self._check(keys=[self.key], args=args) if len(args) > 1 else []
+                fresh.extend(self._new(per_result, replies))
+            async with self.client.pipeline(transaction=False) as pipe:
+                self._count(pipe, fresh)
+                await pipe.execute()
+        except redis.RedisError as e:
+            print(f"Seen filter unavailable, treating results as new: {e}")
+            return [True] * len(results)
+        return fresh
+
+    async def mark(self, results: List[Dict]):
+        """Remember results the sweep has emitted and saved"""
+        try:
+            for start in range(0, len(results), CHECK_BATCH):
+                positions = self._positions(results[start:start + CHECK_BATCH])
+                if positions:
+                    await self._mark(keys=[self.key], args=positions)
+        except redis.RedisError as e:
+            print(f"Seen filter unavailable, results not marked: {e}")
@@ -0,0 +1,165 @@
+import os
+import json
+import random
+import asyncio
+import hashlib
+import pathlib
+import httpx
+from typing import Dict, Optional
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# Local stand-in for google.serper.dev so the worker pipelines can run and be
+# load-tested with no network. Point the workers at it with
+# SERPER_URL=http://serper-standin:8080/search (any SERPER_API_KEY will do),
+# and set SEARCH_BULK_BACKENDS=serper and SEARCH_PRECISE_BACKENDS=serper so
+# no search goes to SearxNG or DuckDuckGo.
+#
+#   replay     serve the recorded fixture for a request, or a synthetic one
+#   record     forward to the real API with SERPER_API_KEY and save the reply
+#
+# Fixtures are JSON files under STANDIN_FIXTURES named by a hash of the
+# normalized query, num, gl and hl. Synthetic replies are derived from the
+# same hash, so a given query always gets the same results. Latency and
+# failures are injected in replay mode only:
+#   STANDIN_LATENCY     fixed:<s> | uniform:<lo>,<hi> | lognormal:<median>,<sigma>
+#   STANDIN_ERROR_RATE  share of requests answered with a 500
+#   STANDIN_429_RATE    share of requests answered with a 429
+#   STANDIN_SEED        seeds the latency/failure draws for repeatable runs
+STANDIN_MODE = os.getenv('STANDIN_MODE', 'replay')
+STANDIN_FIXTURES = pathlib.Path(os.getenv('STANDIN_FIXTURES', '/data/serper_fixtures'))
+STANDIN_LATENCY = os.getenv('STANDIN_LATENCY', 'lognormal:0.4,0.5')
+STANDIN_ERROR_RATE = float(os.getenv('STANDIN_ERROR_RATE', '0'))
+STANDIN_429_RATE = float(os.getenv('STANDIN_429_RATE', '0'))
+STANDIN_SEED = os.getenv('STANDIN_SEED')
+UPSTREAM_URL = os.getenv('STANDIN_UPSTREAM', 'https://google.serper.dev/search')
+
+app = FastAPI(title="Serper stand-in")
+rng = random.Random(int(STANDIN_SEED)) if STANDIN_SEED else random.Random()
+stats = {'served': 0, 'recorded': 0, 'replayed': 0, 'synthetic': 0, 'errors': 0, 'rate_limited': 0}
+
+
+def _latency_sampler():
+    kind, _, params = STANDIN_LATENCY.partition(':')
+    values = [float(v) for v in params.split(',') if v]
+    if kind == 'fixed':
+        return lambda: values[0]
+    if kind == 'uniform':
+        return lambda: rng.uniform(values[0], values[1])
+    if kind == 'lognormal':
+        median, sigma = values
+        return lambda: rng.lognormvariate(0, sigma) * median
+    raise ValueError(f"Unknown STANDIN_LATENCY: {STANDIN_LATENCY}")
+
+
+sample_latency = _latency_sampler()
+
+
+def fixture_digest(payload: Dict) -> str:
+    query = ' '.join(str(payload.get('q', '')).lower().split())
+    parts = [query, int(payload.get('num', 10)), payload.get('gl'), payload.get('hl')]
+    return hashlib.sha1(json.dumps(parts).encode()).hexdigest()
+
+
+def fixture_path(payload: Dict) -> pathlib.Path:
+    return STANDIN_FIXTURES / f"{fixture_digest(payload)}.json"
+
+
+def load_fixture(payload: Dict) -> Optional[Dict]:
+    path = fixture_path(payload)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())['response']
+
+
+def save_fixture(payload: Dict, response: Dict):
+    STANDIN_FIXTURES.mkdir(parents=True, exist_ok=True)
+    path = fixture_path(payload)
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps({'request': payload, 'response': response}))
+    tmp.replace(path)
+
+
+_FIRST = ['Maya', 'Jordan', 'Priya', 'Luis', 'Hannah', 'Omar', 'Grace', 'Mateo', 'Chloe', 'Noah']
+_LAST = ['Chen', 'Rivera', 'Patel', 'Okafor', 'Kim', 'Nguyen', 'Rossi', 'Levy', 'Brooks', 'Silva']
+_ROLES = ['Creative Director', 'CMO', 'VP Marketing', 'Marketing Operations Manager', 'Brand Designer']
+_COMPANIES = ['Northwind Studio', 'Brightline Media', 'Kestrel Labs', 'Harbor & Pine', 'Lumen Goods',
+              'Atlas Creative', 'Fieldnote', 'Copperleaf', 'Bluejay Health', 'Paloma Brands']
+_SIGNALS = ['growing pains', 'rapid growth', 'workflow', 'coordination', 'hiring creative',
+            'building team', 'Series A', 'Series B', 'raised funding', 'operations', 'efficiency',
+            'project management', 'delays', 'scaling', 'creative team', 'marketing operations']
+
+
+def synthetic_response(payload: Dict) -> Dict:
+    """Plausible results for any query, stable for a given request"""
+    query = str(payload.get('q', ''))
+    num = int(payload.get('num', 10))
+    local = random.Random(fixture_digest(payload))
+    organic = []
+    for position in range(1, num + 1):
+        company = local.choice(_COMPANIES)
+        slug = company.lower().replace(' & ', '-').replace(' ', '')
+        if 'linkedin.com/in' in query:
+            first, last = local.choice(_FIRST), local.choice(_LAST)
+            role = local.choice(_ROLES)
+            organic.append({
+                'title': f"{first} {last} - {role} - {company} | LinkedIn",
+                'link': f"https://www.linkedin.com/in/{first.lower()}-{last.lower()}-{local.randrange(16 ** 6):06x}",
+                'snippet': f"{role} at {company}. {local.choice(_SIGNALS).capitalize()} across the team.",
+                'position': position
+            })
+        else:
+            signals = local.sample(_SIGNALS, 3)
+            organic.append({
+                'title': f"{company} - {signals[0].capitalize()} | {local.choice(['Inc.', 'LinkedIn', 'Glassdoor'])}",
+                'link': f"https://www.{slug}.com/{local.choice(['about', 'careers', 'blog', 'news'])}",
+                'snippet': f"{company} is dealing with {signals[1]} and {signals[2]} as it grows to "
+                           f"{local.randrange(50, 200)} employees.",
+                'position': position
+            })
+    return {
+        'searchParameters': {'q': query, 'num': num, 'gl': payload.get('gl'), 'hl': payload.get('hl'), 'engine': 'standin'},
+        'organic': organic
+    }
+
+
+async def record(payload: Dict, api_key: Optional[str]) -> JSONResponse:
+    async with httpx.AsyncClient(timeout=30) as client:
+        upstream = await client.post(
+            UPSTREAM_URL,
+            headers={'X-API-KEY': os.getenv('SERPER_API_KEY') or api_key or '', 'Content-Type': 'application/json'},
+            json=payload
+        )
+    if upstream.status_code == 200:
+        save_fixture(payload, upstream.json())
+        stats['recorded'] += 1
+    return JSONResponse(upstream.json(), status_code=upstream.status_code)
+
+
+@app.post("/search")
+async def search(request: Request):
+    payload = await request.json()
+    stats['served'] += 1
+    if STANDIN_MODE == 'record':
+        return await record(payload, request.headers.get('x-api-key'))
+
+    await asyncio.sleep(max(0.0, sample_latency()))
+    draw = rng.random()
+    if draw < STANDIN_429_RATE:
+        stats['rate_limited'] += 1
+        return JSONResponse({'message': 'Too many requests'}, status_code=429)
+    if draw < STANDIN_429_RATE + STANDIN_ERROR_RATE:
+        stats['errors'] += 1
+        return JSONResponse({'message': 'Injected failure'}, status_code=500)
+
+    response = load_fixture(payload)
+    if response is not None:
+        stats['replayed'] += 1
+        return response
+    stats['synthetic'] += 1
+    return synthetic_response(payload)
+
+
+@app.get("/health")
+async def health():
+    return {'mode': STANDIN_MODE, 'fixtures': str(STANDIN_FIXTURES), 'latency': STANDIN_LATENCY, **stats}
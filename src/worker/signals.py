@@ -0,0 +1,71 @@
+from typing import Dict, List, Sequence, Set
+
+# Signal lexicons for the prospect extractors, built once at import and shared
+# by every extractor. With the optional pyahocorasick package a lexicon is a
+# single Aho-Corasick automaton that reports every term in one pass over the
+# text; without it, a precompiled tuple of terms is checked with C-level
+# substring tests. Either way matching keeps the old `term in text.lower()`
+# semantics: case-insensitive substrings, overlaps allowed.
+try:
+    import ahocorasick
+    AHOCORASICK = True
+except ImportError:
+    AHOCORASICK = False
+
+
+class SignalMatcher:
+    """All lexicon terms found in a text"""
+
+    def __init__(self, lexicon: Dict[str, Sequence[str]]):
+        self.lexicon = {signal: tuple(term.lower() for term in terms) for signal, terms in lexicon.items()}
+        self.order = tuple(dict.fromkeys(term for terms in self.lexicon.values() for term in terms))
+        self._automaton = None
+        if AHOCORASICK:
+            self._automaton = ahocorasick.Automaton()
+            for term in self.order:
+                self._automaton.add_word(term, term)
+            self._automaton.make_automaton()
+
+    def terms(self, text: str) -> Set[str]:
+        text = text.lower()
+        if self._automaton is not None:
+            return {term for _, term in self._automaton.iter(text)}
+        return {term for term in self.order if term in text}
+
+    def signals(self, text: str) -> Dict[str, bool]:
+        """Whether each signal has at least one of its terms in the text"""
+        found = self.terms(text)
+        return {signal: not found.isdisjoint(terms) for signal, terms in self.lexicon.items()}
+
+    def ordered_terms(self, text: str) -> List[str]:
+        """Terms found, in lexicon order"""
+        # A straight scan in order beats walking the automaton and sorting
+        # when the caller wants terms rather than signals
+        text = text.lower()
+        return [term for term in self.order if term in text]
+
+
+# CalmOpsSearchService._extract_validation_prospects
+VALIDATION_SIGNALS = SignalMatcher({
+    'growing_pains': ['growing pains', 'scaling challenges', 'rapid growth'],
+    'workflow_issues': ['workflow', 'coordination', 'collaboration challenges'],
+    'hiring_creative': ['hiring creative', 'hiring marketing', 'building team'],
+    'series_funding': ['series a', 'series b', 'raised', 'funding'],
+    'operational': ['operations', 'efficiency', 'productivity'],
+})
+
+# CalmOpsSearchService._extract_pilot_signals; each term is its own signal
+PILOT_SIGNALS = SignalMatcher({term: [term] for term in [
+    'workflow', 'project management', 'collaboration',
+    'creative team', 'marketing operations', 'delays',
+    'efficiency', 'productivity', 'scaling', 'growing'
+]})
+
+# CalmOpsWorker.task1_validate_problem, matched against the snippet
+PAIN_SIGNALS = SignalMatcher({
+    'hiring': ['hiring'],
+    'growing': ['growing', 'growth'],
+    'scaling': ['scaling'],
+    'workflow': ['workflow'],
+    'challenges': ['challenges'],
+})
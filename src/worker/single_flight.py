@@ -0,0 +1,155 @@
+import os
+import json
+import time
+import uuid
+import zlib
+import asyncio
+import redis
+import redis.asyncio as aioredis
+import call_costs
+from typing import Awaitable, Callable, Optional
+from redis_settings import connection_kwargs
+
+# Cross-process coalescing of identical external calls. The first caller
+# for a key takes a lease (flight:{kind}:{key}) and makes the call; anyone
+# asking for the same key meanwhile polls for the leader's result instead
+# of repeating it. Results are handed over through a short-lived key, so
+# this is not a cache. If the leader fails or dies, its lease goes away and
+# one of the waiters takes over. Redis errors fall back to calling directly.
+FLIGHT_LEASE = int(os.getenv('SINGLE_FLIGHT_LEASE', '300'))        # seconds
+FLIGHT_RESULT_TTL = int(os.getenv('SINGLE_FLIGHT_RESULT_TTL', '60'))
+POLL_INTERVAL = 0.25
+MAX_POLL_INTERVAL = 2.0
+STATS_KEY = 'single_flight:stats'
+
+_RELEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class _FlightBase:
+    def __init__(self, client, kind: str, lease: int, result_ttl: int):
+        self.client = client
+        self.kind = kind
+        self.lease = lease
+        self.result_ttl = result_ttl
+        self._release = client.register_script(_RELEASE)
+
+    def _keys(self, key: str):
+        lease_key = f"flight:{self.kind}:{key}"
+        return lease_key, f"{lease_key}:result"
+
+    @staticmethod
+    def _encode(value) -> bytes:
+        return zlib.compress(json.dumps(value).encode())
+
+    @staticmethod
+    def _decode(raw):
+        return json.loads(zlib.decompress(raw))
+
+
+class SingleFlight(_FlightBase):
+    """Single-flight for synchronous callers"""
+
+    def __init__(self, kind: str, client=None, lease: int = FLIGHT_LEASE, result_ttl: int = FLIGHT_RESULT_TTL):
+        super().__init__(client or redis.Redis(**connection_kwargs()), kind, lease, result_ttl)
+
+    def do(self, key: str, fn: Callable[[], Optional[object]]):
+        """Return fn(), or the result of an identical call already in flight.
+
+        A None result (the call failed softly) is not shared.
+        """
+        lease_key, result_key = self._keys(key)
+        token = uuid.uuid4().hex
+        interval = POLL_INTERVAL
+        waited = False
+        while True:
+            try:
+                raw = self.client.get(result_key)
+                if raw is not None:
+                    self.client.hincrby(STATS_KEY, f"{self.kind}:joined", 1)
+                    call_costs.saved('coalesced')
+                    return self._decode(raw)
+                leader = self.client.set(lease_key, token, nx=True, ex=self.lease)
+            except redis.RedisError as e:
+                print(f"Single-flight unavailable, calling directly: {e}")
+                return fn()
+            if leader:
+                break
+            if not waited:
+                print(f"Waiting on in-flight {self.kind} call {key[:12]}")
+                waited = True
+            time.sleep(interval)
+            interval = min(interval * 2, MAX_POLL_INTERVAL)
+
+        try:
+            value = fn()
+            if value is not None:
+                try:
+                    with self.client.pipeline(transaction=False) as pipe:
+                        pipe.setex(result_key, self.result_ttl, self._encode(value))
+                        pipe.hincrby(STATS_KEY, f"{self.kind}:led", 1)
+                        pipe.execute()
+                except redis.RedisError as e:
+                    print(f"Single-flight unavailable: {e}")
+            return value
+        finally:
+            try:
+                self._release(keys=[lease_key], args=[token])
+            except redis.RedisError:
+                pass
+
+
+class AsyncSingleFlight(_FlightBase):
+    """Single-flight for async callers; waiting does not block the event loop"""
+
+    def __init__(self, kind: str, client=None, lease: int = FLIGHT_LEASE, result_ttl: int = FLIGHT_RESULT_TTL):
+        super().__init__(client or aioredis.Redis(**connection_kwargs()), kind, lease, result_ttl)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]):
+        """Return await fn(), or the result of an identical call already in flight.
+
+        A None result (the call failed softly) is not shared.
+        """
+        lease_key, result_key = self._keys(key)
+        token = uuid.uuid4().hex
+        interval = POLL_INTERVAL
+        waited = False
+        while True:
+            try:
+                raw = await self.client.get(result_key)
+                if raw is not None:
+                    await self.client.hincrby(STATS_KEY, f"{self.kind}:joined", 1)
+                    call_costs.saved('coalesced')
+                    return self._decode(raw)
+                leader = await self.client.set(lease_key, token, nx=True, ex=self.lease)
+            except redis.RedisError as e:
+                print(f"Single-flight unavailable, calling directly: {e}")
+                return await fn()
+            if leader:
+                break
+            if not waited:
+                print(f"Waiting on in-flight {self.kind} call {key[:12]}")
+                waited = True
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, MAX_POLL_INTERVAL)
+
+        try:
+            value = await fn()
+            if value is not None:
+                try:
+                    async with self.client.pipeline(transaction=False) as pipe:
+                        pipe.setex(result_key, self.result_ttl, self._encode(value))
+                        pipe.hincrby(STATS_KEY, f"{self.kind}:led", 1)
+                        await pipe.execute()
+                except redis.RedisError as e:
+                    print(f"Single-flight unavailable: {e}")
+            return value
+        finally:
+            try:
+                await self._release(keys=[lease_key], args=[token])
+            except redis.RedisError:
+                pass
@@ -0,0 +1,17 @@
+import json
+
+# Completion/progress notifications for the API's /tasks/stream endpoint.
+# One pub/sub channel per task so subscribers only receive what they asked for.
+
+
+def task_channel(task_id: str) -> str:
+    return f"task_events:{task_id}"
+
+
+def publish_event(client, task_id: str, event: str, **data):
+    """Publish a task event; on a redis.asyncio client, await the return value.
+
+    'done' events carry no payload - the subscriber reads result:{id} itself.
+    """
+    message = {'task_id': task_id, 'event': event, **data}
+    return client.publish(task_channel(task_id), json.dumps(message))
@@ -0,0 +1,298 @@
+import os
+import json
+import time
+import socket
+import asyncio
+import threading
+from typing import Dict, List, NamedTuple, Optional
+from redis.exceptions import ResponseError
+
+# 'list' keeps the original lpush/brpop queue; 'streams' uses a Redis Stream
+# with a consumer group so tasks survive a worker crash and can be shared by
+# any number of worker replicas.
+QUEUE_BACKEND = os.getenv('QUEUE_BACKEND', 'list')
+CONSUMER_GROUP = os.getenv('QUEUE_GROUP', 'workers')
+CONSUMER_NAME = os.getenv('QUEUE_CONSUMER', f"{socket.gethostname()}-{os.getpid()}")
+
+# A pending entry that has not been touched for this long belongs to a dead
+# consumer and is handed to a live one. Live consumers refresh their own
+# entries well inside this window, so long LLM calls are never stolen.
+RECLAIM_IDLE_MS = int(os.getenv('QUEUE_RECLAIM_IDLE_MS', '300000'))
+RECLAIM_INTERVAL = 30
+
+# Interactive tasks (those carrying a request_id) are served first, but batch
+# work still gets at least this share of dequeues so it never starves.
+LANES = ('interactive', 'batch')
+BATCH_MIN_SHARE = float(os.getenv('QUEUE_BATCH_MIN_SHARE', '0.2'))
+
+
+class QueueItem(NamedTuple):
+    entry_id: Optional[str]
+    task: Dict
+    redelivered: bool
+    lane: str
+
+
+def task_lane(task: Dict) -> str:
+    return 'interactive' if task.get('request_id') else 'batch'
+
+
+def lane_key(name: str, lane: str) -> str:
+    # The batch lane keeps the bare queue name so older producers land there
+    return f"{name}:interactive" if lane == 'interactive' else name
+
+
+def stream_key(name: str) -> str:
+    return f"{name}:stream"
+
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class _QueueBase:
+    def __init__(self, client, name: str, backend: str = QUEUE_BACKEND):
+        self.client = client
+        self.name = name
+        self.backend = backend
+        self.keys = {lane: lane_key(name, lane) for lane in LANES}
+        self.streams = {lane: stream_key(key) for lane, key in self.keys.items()}
+        self.in_flight = {}
+        self._buffered: List[QueueItem] = []
+        self._next_reclaim = 0.0
+        self._group_ready = False
+        self._max_streak = max(1, round(1 / BATCH_MIN_SHARE) - 1) if BATCH_MIN_SHARE > 0 else None
+        self._streak = 0
+
+    def _lane_order(self):
+        if self._max_streak is not None and self._streak >= self._max_streak:
+            return ('batch', 'interactive')
+        return LANES
+
+    def _served(self, item: Optional[QueueItem]) -> Optional[QueueItem]:
+        if item is None:
+            return None
+        self._streak = 0 if item.lane == 'batch' else self._streak + 1
+        if item.entry_id is not None:
+            self.in_flight[item.entry_id] = item.lane
+        return item
+
+    def _lane_of(self, key) -> str:
+        key = _text(key)
+        for lane in LANES:
+            if key in (self.keys[lane], self.streams[lane]):
+                return lane
+        return 'batch'
+
+    def _from_list(self, resp) -> Optional[QueueItem]:
+        if not resp:
+            return None
+        key, raw = resp
+        return QueueItem(None, json.loads(raw), False, self._lane_of(key))
+
+    def _stash(self, stream, entries, redelivered: bool = False):
+        lane = self._lane_of(stream)
+        for entry_id, fields in entries:
+            if not fields:
+                continue
+            fields = {_text(k): _text(v) for k, v in fields.items()}
+            self._buffered.append(QueueItem(_text(entry_id), json.loads(fields['task']), redelivered, lane))
+
+    def _take_buffered(self) -> Optional[QueueItem]:
+        for lane in self._lane_order():
+            for i, item in enumerate(self._buffered):
+                if item.lane == lane:
+                    return self._buffered.pop(i)
+        return None
+
+    def _reclaim_due(self) -> bool:
+        if self._buffered or time.monotonic() < self._next_reclaim:
+            return False
+        self._next_reclaim = time.monotonic() + RECLAIM_INTERVAL
+        return True
+
+    def _reclaimed(self, stream, resp):
+        before = len(self._buffered)
+        self._stash(stream, resp[1], redelivered=True)
+        if len(self._buffered) > before:
+            print(f"Reclaimed {len(self._buffered) - before} pending task(s) from dead consumers")
+
+
+class TaskQueue(_QueueBase):
+    """Consumer side of a task queue, on a synchronous redis client"""
+
+    def _ensure_groups(self):
+        if self._group_ready:
+            return
+        for stream in self.streams.values():
+            try:
+                self.client.xgroup_create(stream, CONSUMER_GROUP, id='0', mkstream=True)
+            except ResponseError as e:
+                if 'BUSYGROUP' not in str(e):
+                    raise
+        self._group_ready = True
+
+    def _reclaim(self):
+        """Take over entries left pending by consumers that stopped acking"""
+        for stream in self.streams.values():
+            resp = self.client.xautoclaim(
+                stream, CONSUMER_GROUP, CONSUMER_NAME,
+                min_idle_time=RECLAIM_IDLE_MS, start_id='0-0', count=10
+            )
+            self._reclaimed(stream, resp)
+
+    def pop(self, timeout: int = 5) -> Optional[QueueItem]:
+        order = self._lane_order()
+        if self.backend != 'streams':
+            resp = self.client.brpop([self.keys[lane] for lane in order], timeout=timeout)
+            return self._served(self._from_list(resp))
+
+        self._ensure_groups()
+        if self._reclaim_due():
+            self._reclaim()
+        if not self._buffered:
+            for lane in order:
+                resp = self.client.xreadgroup(
+                    CONSUMER_GROUP, CONSUMER_NAME, {self.streams[lane]: '>'}, count=1
+                )
+                if resp:
+                    self._stash(*resp[0])
+                    break
+            else:
+                resp = self.client.xreadgroup(
+                    CONSUMER_GROUP, CONSUMER_NAME, {self.streams[lane]: '>' for lane in order},
+                    count=1, block=timeout * 1000
+                )
+                for stream, entries in resp or []:
+                    self._stash(stream, entries)
+        return self._served(self._take_buffered())
+
+    def ack(self, item: QueueItem):
+        """Remove a task from the queue once its result has been saved"""
+        if item.entry_id is None:
+            return
+        stream = self.streams[item.lane]
+        with self.client.pipeline(transaction=True) as pipe:
+            pipe.xack(stream, CONSUMER_GROUP, item.entry_id)
+            pipe.xdel(stream, item.entry_id)
+            pipe.execute()
+        self.in_flight.pop(item.entry_id, None)
+
+    def requeue(self, item: QueueItem, task: Dict):
+        """Put an unfinished task back on its lane (at the head, for list queues)"""
+        with self.client.pipeline(transaction=True) as pipe:
+            if item.entry_id is None:
+                pipe.rpush(self.keys[item.lane], json.dumps(task))
+            else:
+                pipe.xadd(self.streams[item.lane], {'task': json.dumps(task)})
+                pipe.xack(self.streams[item.lane], CONSUMER_GROUP, item.entry_id)
+                pipe.xdel(self.streams[item.lane], item.entry_id)
+            pipe.execute()
+        self.in_flight.pop(item.entry_id, None)
+
+    def start_keepalive(self):
+        """Reset the idle time of in-flight entries from a background thread"""
+        if self.backend != 'streams':
+            return
+
+        def _loop():
+            while True:
+                time.sleep(RECLAIM_IDLE_MS / 3000)
+                for entry_id, lane in list(self.in_flight.items()):
+                    try:
+                        self.client.xclaim(
+                            self.streams[lane], CONSUMER_GROUP, CONSUMER_NAME,
+                            min_idle_time=0, message_ids=[entry_id], justid=True
+                        )
+                    except Exception as e:
+                        print(f"Queue keepalive error: {e}")
+
+        threading.Thread(target=_loop, daemon=True).start()
+
+
+class AsyncTaskQueue(_QueueBase):
+    """Consumer side of a task queue, on a redis.asyncio client"""
+
+    async def _ensure_groups(self):
+        if self._group_ready:
+            return
+        for stream in self.streams.values():
+            try:
+                await self.client.xgroup_create(stream, CONSUMER_GROUP, id='0', mkstream=True)
+            except ResponseError as e:
+                if 'BUSYGROUP' not in str(e):
+                    raise
+        self._group_ready = True
+
+    async def _reclaim(self):
+        """Take over entries left pending by consumers that stopped acking"""
+        for stream in self.streams.values():
+            resp = await self.client.xautoclaim(
+                stream, CONSUMER_GROUP, CONSUMER_NAME,
+                min_idle_time=RECLAIM_IDLE_MS, start_id='0-0', count=10
+            )
+            self._reclaimed(stream, resp)
+
+    async def pop(self, timeout: int = 5) -> Optional[QueueItem]:
+        order = self._lane_order()
+        if self.backend != 'streams':
+            resp = await self.client.brpop([self.keys[lane] for lane in order], timeout=timeout)
+            return self._served(self._from_list(resp))
+
+        await self._ensure_groups()
+        if self._reclaim_due():
+            await self._reclaim()
+        if not self._buffered:
+            for lane in order:
+                resp = await self.client.xreadgroup(
+                    CONSUMER_GROUP, CONSUMER_NAME, {self.streams[lane]: '>'}, count=1
+                )
+                if resp:
+                    self._stash(*resp[0])
+                    break
+            else:
+                resp = await self.client.xreadgroup(
+                    CONSUMER_GROUP, CONSUMER_NAME, {self.streams[lane]: '>' for lane in order},
+                    count=1, block=timeout * 1000
+                )
+                for stream, entries in resp or []:
+                    self._stash(stream, entries)
+        return self._served(self._take_buffered())
+
+    async def ack(self, item: QueueItem):
+        """Remove a task from the queue once its result has been saved"""
+        if item.entry_id is None:
+            return
+        stream = self.streams[item.lane]
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.xack(stream, CONSUMER_GROUP, item.entry_id)
+            pipe.xdel(stream, item.entry_id)
+            await pipe.execute()
+        self.in_flight.pop(item.entry_id, None)
+
+    async def requeue(self, item: QueueItem, task: Dict):
+        """Put an unfinished task back on its lane (at the head, for list queues)"""
+        async with self.client.pipeline(transaction=True) as pipe:
+            if item.entry_id is None:
+                pipe.rpush(self.keys[item.lane], json.dumps(task))
+            else:
+                pipe.xadd(self.streams[item.lane], {'task': json.dumps(task)})
+                pipe.xack(self.streams[item.lane], CONSUMER_GROUP, item.entry_id)
+                pipe.xdel(self.streams[item.lane], item.entry_id)
+            await pipe.execute()
+        self.in_flight.pop(item.entry_id, None)
+
+    async def keepalive(self):
+        """Reset the idle time of entries this consumer is still working on"""
+        if self.backend != 'streams':
+            return
+        while True:
+            await asyncio.sleep(RECLAIM_IDLE_MS / 3000)
+            for entry_id, lane in list(self.in_flight.items()):
+                try:
+                    await self.client.xclaim(
+                        self.streams[lane], CONSUMER_GROUP, CONSUMER_NAME,
+                        min_idle_time=0, message_ids=[entry_id], justid=True
+                    )
+                except Exception as e:
+                    print(f"Queue keepalive error: {e}")
@@ -0,0 +1,76 @@
+import time
+from typing import Dict
+from task_queue import lane_key
+
+# Per-task status records written by the API at enqueue time
+# (src/api/task_status.py) and moved along here by the workers:
+#   task:{id}              hash: status, type, week, lane, enqueued/started/finished times
+#   queue_index:{lane key} zset of queued task ids scored by enqueue time
+#   week_progress:{week}   hash of '{type}:{status}' counters
+#   task_durations         hash holding a moving average of task run time
+STATUS_TTL = 7 * 24 * 3600
+
+_TRANSITION = """
+local status = ARGV[1]
+local now = tonumber(ARGV[2])
+redis.call('ZREM', KEYS[3], ARGV[4])
+local current = redis.call('HGET', KEYS[1], 'status')
+if (not current) or current == status or current == 'done' or current == 'failed' then
+    return 0
+end
+local task_type = redis.call('HGET', KEYS[1], 'type')
+redis.call('HSET', KEYS[1], 'status', status)
+if status == 'running' then
+    redis.call('HSET', KEYS[1], 'started_at', now)
+elseif status == 'queued' then
+    -- requeued after a drain: back into the index at its original position
+    redis.call('ZADD', KEYS[3], redis.call('HGET', KEYS[1], 'enqueued_at') or now, ARGV[4])
+elseif status == 'done' or status == 'failed' then
+    redis.call('HSET', KEYS[1], 'finished_at', now)
+    local started = tonumber(redis.call('HGET', KEYS[1], 'started_at'))
+    if started then
+        local avg = tonumber(redis.call('HGET', KEYS[4], 'avg_seconds'))
+        local took = now - started
+        if avg then took = avg * 0.9 + took * 0.1 end
+        redis.call('HSET', KEYS[4], 'avg_seconds', took)
+    end
+end
+redis.call('HINCRBY', KEYS[2], task_type .. ':' .. current, -1)
+redis.call('HINCRBY', KEYS[2], task_type .. ':' .. status, 1)
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+
+def status_key(task_id: str) -> str:
+    return f"task:{task_id}"
+
+
+def week_key(week) -> str:
+    return f"week_progress:{week}"
+
+
+def queue_index_key(name: str, lane: str) -> str:
+    return f"queue_index:{lane_key(name, lane)}"
+
+
+class TaskStatus:
+    """Moves task status records through queued -> running -> done/failed.
+
+    Works with both redis clients; on redis.asyncio await the return value.
+    Tasks without a status record (e.g. pushed by hand) are left alone.
+    """
+
+    def __init__(self, client, queue_name: str):
+        self.queue_name = queue_name
+        self._transition = client.register_script(_TRANSITION)
+
+    def set(self, task: Dict, lane: str, status: str):
+        task_id = task.get('id')
+        keys = [
+            status_key(task_id),
+            week_key(task.get('week', 'none')),
+            queue_index_key(self.queue_name, lane),
+            'task_durations'
+        ]
+        return self._transition(keys=keys, args=[status, time.time(), STATUS_TTL, task_id])
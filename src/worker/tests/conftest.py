@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The worker modules import each other by bare name, as they do in the container
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
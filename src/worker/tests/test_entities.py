@@ -0,0 +1,56 @@
+import fakeredis
+import redis
+from entities import ENTITY_INDEX_TTL, KEY_PREFIX, EntityIndex, resolve
+
+
+def test_homepage_and_own_blog_post():
+    # A non-company title on the company's own host marks it shared; the
+    # homepage record must still resolve by its name
+    ids, _ = resolve([
+        ('Acme', 'https://acme.com/'),
+        ('5 workflow tips for creative teams', 'https://acme.com/blog/tips'),
+    ], {}, {})
+    assert len(ids) == 2
+    assert ids[0] != ids[1]
+
+
+def test_publisher_host_does_not_merge_companies():
+    ids, new = resolve([
+        ('Kestrel Labs', 'https://www.businessinsider.com/kestrel-raises'),
+        ('Paloma Brands', 'https://www.businessinsider.com/paloma-hires'),
+        ('Kestrel Labs', 'https://kestrellabs.com/'),
+    ], {}, {})
+    assert ids[0] != ids[1]
+    assert ids[0] == ids[2]
+    assert 'domain:businessinsider.com' not in new
+
+
+def test_company_site_pages_merge_by_domain():
+    ids, _ = resolve([
+        ('Acme Studios', 'https://acme.com/about'),
+        ('Acme', 'https://www.acme.com/'),
+    ], {}, {})
+    assert ids[0] == ids[1]
+
+
+def test_shared_host_is_not_indexed():
+    client = fakeredis.FakeRedis()
+    index = EntityIndex(client)
+    records = [
+        ('Acme', 'https://acme.com/'),
+        ('5 workflow tips for creative teams', 'https://acme.com/blog/tips'),
+    ]
+    ids = index.resolve(records)
+    assert client.get(f"{KEY_PREFIX}:domain:acme.com") is None
+    assert 0 < client.ttl(f"{KEY_PREFIX}:name:acme") <= ENTITY_INDEX_TTL
+    # The same company gets the same id in a later run, from the index
+    assert index.resolve([('Acme Inc.', None)]) == ids[:1]
+
+
+def test_index_survives_redis_errors():
+    class Down:
+        def pipeline(self, transaction=False):
+            raise redis.ConnectionError('down')
+
+    ids = EntityIndex(Down()).resolve([('Acme', 'https://acme.com/'), ('Acme Inc', None)])
+    assert ids[0] == ids[1]
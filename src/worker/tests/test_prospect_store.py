@@ -0,0 +1,47 @@
+import sqlite3
+from prospect_store import ProspectStore
+
+VALIDATED = [
+    {'company_name': 'Acme Studio', 'link': 'https://acme.com', 'market': 'ny', 'validation_score': 0.8},
+    {'company_name': 'Bolt', 'link': 'https://bolt.io', 'market': 'ny', 'validation_score': 0.4},
+]
+
+
+def test_pilot_scores_are_kept_apart_from_validation_scores(tmp_path):
+    store = ProspectStore(tmp_path / 'prospects.db')
+    store.upsert_prospects(VALIDATED, 'validate_problem')
+    # Lower than the validation score, which a shared column would have kept instead
+    store.upsert_prospects([{**VALIDATED[0], 'signals': ['efficiency'], 'pilot_score': 0.2}], 'find_pilots')
+    acme, bolt = store.top_by_market('ny', source='validate_problem')
+    assert (acme['company_name'], acme['validation_score'], acme['pilot_score']) == ('Acme Studio', 0.8, 0.2)
+    assert bolt['company_name'] == 'Bolt'
+
+
+def test_reuse_filters_by_source(tmp_path):
+    store = ProspectStore(tmp_path / 'prospects.db')
+    store.upsert_prospects(VALIDATED, 'validate_problem')
+    store.upsert_prospects([{'company_name': 'Zed', 'link': 'https://zed.dev', 'market': 'ny'}], 'scale_outreach')
+    assert [p['company_name'] for p in store.top_by_market('ny', source='scale_outreach')] == ['Zed']
+    # Task 1's plain score is a validation score
+    store.upsert_prospects([{'company': 'Kite', 'link': 'https://kite.co', 'market': 'ny', 'score': 0.6}],
+                           'validate_problem')
+    ranked = store.top_by_market('ny', source='validate_problem')
+    assert [p['company_name'] for p in ranked] == ['Acme Studio', 'Kite', 'Bolt']
+
+
+def test_older_database_gets_score_columns(tmp_path):
+    path = tmp_path / 'prospects.db'
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE prospects (
+            id INTEGER PRIMARY KEY, prospect_key TEXT NOT NULL, market TEXT NOT NULL DEFAULT '',
+            company TEXT, domain TEXT, link TEXT, sector TEXT, score REAL, source TEXT, data TEXT,
+            first_seen TEXT NOT NULL, last_seen TEXT NOT NULL, times_seen INTEGER NOT NULL DEFAULT 1,
+            UNIQUE (prospect_key, market)
+        );
+        INSERT INTO prospects (prospect_key, market, company, score, source, first_seen, last_seen)
+        VALUES ('k', 'ny', 'Acme', 0.5, 'validate_problem', '2026-01-01', '2026-01-01');
+    """)
+    conn.close()
+    [acme] = ProspectStore(path).top_by_market('ny', source='validate_problem')
+    assert acme['validation_score'] == 0.5 and 'score' not in acme
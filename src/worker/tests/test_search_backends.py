@@ -0,0 +1,114 @@
+import time
+import asyncio
+import fakeredis
+import httpx
+import pytest
+import http_pool
+import search_backends
+from search_backends import AsyncSearchRouter, SearchRouter
+
+DDG_PAGE = (
+    '<a class="result__a" href="https://acme.com/">Acme</a>'
+    '<a class="result__snippet" href="https://acme.com/">Creative studio</a>'
+)
+SERPER_REPLY = {'organic': [{'title': 'Acme', 'link': 'https://acme.com/', 'snippet': '', 'position': 1}]}
+SEARXNG_REPLY = {'results': [{'title': 'Acme', 'url': 'https://acme.com/', 'content': ''}]}
+
+
+def _backend(request: httpx.Request) -> str:
+    if request.url.host == 'html.duckduckgo.com':
+        return 'duckduckgo'
+    if request.url.host == 'searxng':
+        return 'searxng'
+    return 'serper'
+
+
+def _handler(calls, failing=(), slow=(), empty=()):
+    def handle(request):
+        name = _backend(request)
+        calls.append(name)
+        if name in slow:
+            time.sleep(0.2)
+        if name in failing:
+            return httpx.Response(500)
+        if name == 'duckduckgo':
+            return httpx.Response(200, text='<html>Unfortunately, bots use DuckDuckGo too.</html>'
+                                  if name in empty else DDG_PAGE)
+        if name == 'searxng':
+            return httpx.Response(200, json={'results': [], 'unresponsive_engines': [['google', 'timeout']]}
+                                  if name in empty else SEARXNG_REPLY)
+        return httpx.Response(200, json=SERPER_REPLY)
+    return handle
+
+
+@pytest.fixture
+def fast_hedge(monkeypatch):
+    monkeypatch.setattr(search_backends, 'SEARCH_HEDGE_DELAY', 0.05)
+
+
+def _sync_router(monkeypatch, handler) -> SearchRouter:
+    monkeypatch.setattr(http_pool, '_sync_client', httpx.Client(transport=httpx.MockTransport(handler)))
+    return SearchRouter(fakeredis.FakeRedis(), serper_api_key='key', hedge=True)
+
+
+def test_primary_failing_before_hedge_falls_to_secondary(monkeypatch):
+    calls = []
+    router = _sync_router(monkeypatch, _handler(calls, failing={'searxng'}))
+    results = router.search('acme', profile='bulk')
+    # No request went to DuckDuckGo before SearxNG failed, so it is next, not Serper
+    assert results['backend'] == 'duckduckgo'
+    assert calls == ['searxng', 'duckduckgo']
+
+
+def test_hedged_pair_failing_moves_past_both(monkeypatch, fast_hedge):
+    calls = []
+    router = _sync_router(monkeypatch, _handler(calls, failing={'searxng', 'duckduckgo'}, slow={'searxng'}))
+    results = router.search('acme', profile='bulk')
+    assert results['backend'] == 'serper'
+    assert calls == ['searxng', 'duckduckgo', 'serper']
+    assert router.hedges == 1
+
+
+def test_no_free_hedge_thread_runs_unhedged(monkeypatch, fast_hedge):
+    monkeypatch.setattr(search_backends, 'SEARCH_HEDGE_WORKERS', 1)
+    calls = []
+    router = _sync_router(monkeypatch, _handler(calls, failing={'searxng'}, slow={'searxng'}))
+    # The primary holds the only thread, so DuckDuckGo is tried after it fails, not raced
+    assert router.search('acme', profile='bulk')['backend'] == 'duckduckgo'
+    assert calls == ['searxng', 'duckduckgo']
+    assert router.hedges == 0
+
+
+def test_empty_replies_fall_back(monkeypatch):
+    calls = []
+    router = _sync_router(monkeypatch, _handler(calls, empty={'searxng', 'duckduckgo'}))
+    router.hedge = False
+    assert router.search('acme', profile='bulk')['backend'] == 'serper'
+    assert calls == ['searxng', 'duckduckgo', 'serper']
+
+
+def test_plan_ranks_by_measured_health(monkeypatch):
+    router = _sync_router(monkeypatch, _handler([]))
+    assert [b.name for b in router.plan('bulk')] == ['searxng', 'duckduckgo', 'serper']
+    # DuckDuckGo measured clearly faster than SearxNG moves ahead; Serper, unmeasured, stays last
+    router.health['searxng'].record(3.0, True)
+    router.health['duckduckgo'].record(0.5, True)
+    assert [b.name for b in router.plan('bulk')] == ['duckduckgo', 'searxng', 'serper']
+    # A small difference does not override the profile's order
+    router.health['searxng'].latency = 0.6
+    assert [b.name for b in router.plan('bulk')] == ['searxng', 'duckduckgo', 'serper']
+
+
+def test_async_primary_failing_before_hedge_falls_to_secondary(monkeypatch):
+    calls = []
+
+    async def handle(request):
+        return _handler(calls, failing={'searxng'})(request)
+
+    async def run():
+        monkeypatch.setattr(http_pool, '_async_client', httpx.AsyncClient(transport=httpx.MockTransport(handle)))
+        router = AsyncSearchRouter(fakeredis.FakeAsyncRedis(), serper_api_key='key', hedge=True)
+        return await router.search('acme', profile='bulk')
+
+    assert asyncio.run(run())['backend'] == 'duckduckgo'
+    assert calls == ['searxng', 'duckduckgo']
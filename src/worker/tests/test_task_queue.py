@@ -0,0 +1,78 @@
+import json
+import fakeredis
+import pytest
+import task_queue
+from task_queue import TaskQueue, lane_key, stream_key
+
+
+def _push(client, task, backend='streams'):
+    key = lane_key('q', task_queue.task_lane(task))
+    if backend == 'streams':
+        client.xadd(stream_key(key), {'task': json.dumps(task)})
+    else:
+        client.lpush(key, json.dumps(task))
+
+
+def _ids(queue, count):
+    items = [queue.pop(timeout=1) for _ in range(count)]
+    for item in items:
+        queue.ack(item)
+    return [item.task['id'] for item in items]
+
+
+@pytest.mark.parametrize('backend', ['streams', 'list'])
+def test_interactive_lane_first(backend):
+    client = fakeredis.FakeRedis()
+    for n in range(2):
+        _push(client, {'id': f"b{n}"}, backend)
+    for n in range(2):
+        _push(client, {'id': f"i{n}", 'request_id': 'r'}, backend)
+    assert _ids(TaskQueue(client, 'q', backend), 4) == ['i0', 'i1', 'b0', 'b1']
+
+
+def test_batch_lane_gets_its_share():
+    client = fakeredis.FakeRedis()
+    _push(client, {'id': 'b0'})
+    for n in range(6):
+        _push(client, {'id': f"i{n}", 'request_id': 'r'})
+    # BATCH_MIN_SHARE 0.2: at most four interactive tasks in a row
+    assert _ids(TaskQueue(client, 'q', 'streams'), 7) == ['i0', 'i1', 'i2', 'i3', 'b0', 'i4', 'i5']
+
+
+def test_ack_removes_the_entry():
+    client = fakeredis.FakeRedis()
+    _push(client, {'id': 'b0'})
+    queue = TaskQueue(client, 'q', 'streams')
+    item = queue.pop(timeout=1)
+    assert client.xpending(stream_key('q'), task_queue.CONSUMER_GROUP)['pending'] == 1
+    queue.ack(item)
+    assert client.xpending(stream_key('q'), task_queue.CONSUMER_GROUP)['pending'] == 0
+    assert client.xlen(stream_key('q')) == 0
+    assert queue.in_flight == {}
+
+
+def test_unacked_task_is_reclaimed_by_another_consumer(monkeypatch):
+    client = fakeredis.FakeRedis()
+    _push(client, {'id': 'b0'})
+    monkeypatch.setattr(task_queue, 'CONSUMER_NAME', 'dead')
+    first = TaskQueue(client, 'q', 'streams').pop(timeout=1)
+    assert not first.redelivered
+
+    monkeypatch.setattr(task_queue, 'CONSUMER_NAME', 'live')
+    monkeypatch.setattr(task_queue, 'RECLAIM_IDLE_MS', 0)
+    queue = TaskQueue(client, 'q', 'streams')
+    item = queue.pop(timeout=1)
+    assert (item.task['id'], item.entry_id, item.redelivered) == ('b0', first.entry_id, True)
+    queue.ack(item)
+    assert client.xpending(stream_key('q'), task_queue.CONSUMER_GROUP)['pending'] == 0
+
+
+def test_requeue_puts_the_task_back_with_its_checkpoint():
+    client = fakeredis.FakeRedis()
+    _push(client, {'id': 'i0', 'request_id': 'r'})
+    queue = TaskQueue(client, 'q', 'streams')
+    item = queue.pop(timeout=1)
+    queue.requeue(item, {**item.task, 'checkpoint': {'search': {'k': 1}}})
+    again = queue.pop(timeout=1)
+    assert again.lane == 'interactive' and again.task['checkpoint'] == {'search': {'k': 1}}
+    assert client.xlen(stream_key(lane_key('q', 'interactive'))) == 1
@@ -1,9 +1,42 @@
 import os
 import redis
+import redis.asyncio as aioredis
 import json
 import time
+import signal
+import asyncio
 import requests
-from datetime import datetime, timedelta
+import http_pool
+from search_cache import AsyncSearchCache, cache_key
+from single_flight import AsyncSingleFlight
+from search_backends import AsyncSearchRouter, SearchError
+from signals import PAIN_SIGNALS
+from task_queue import AsyncTaskQueue
+from task_events import publish_event
+from task_status import TaskStatus
+from result_codec import RESULT_TTL, result_key, encode_result
+from prospect_store import AsyncProspectStore, reuse_cutoff
+from seen_filter import SEARCH_INCREMENTAL, AsyncSeenFilter
+import checkpoint
+import call_costs
+from checkpoint import DRAIN_TIMEOUT
+
+# Each external resource gets its own concurrency pool so that tasks waiting
+# on a saturated Ollama model do not hold up cheap Serper searches.
+# OLLAMA_MODEL_CONCURRENCY overrides the per-model default, e.g.
+# "llama3.1:70b=1,mistral:latest=3".
+SERPER_CONCURRENCY = int(os.getenv('SERPER_CONCURRENCY', '16'))
+OLLAMA_CONCURRENCY = int(os.getenv('OLLAMA_CONCURRENCY', '1'))
+OLLAMA_MODEL_CONCURRENCY = {
+    model.strip(): int(limit)
+    for model, _, limit in (
+        entry.rpartition('=') for entry in os.getenv('OLLAMA_MODEL_CONCURRENCY', '').split(',') if '=' in entry
+    )
+}
+
+# scale_outreach reuses a market's stored targets (see prospect_store.py)
+# instead of searching it again once at least this many are on record
+TARGET_REUSE_MIN = int(os.getenv('TARGET_REUSE_MIN', '10'))
 
 class CalmOpsWorker:
     def __init__(self):
@@ -14,6 +47,10 @@ class CalmOpsWorker:
         )
         self.serper_api_key = os.getenv('SERPER_API_KEY')
         self.ollama_host = 'http://host.docker.internal:11434'
+        # Number of tasks processed concurrently; 1 keeps the old one-at-a-time behaviour
+        self.concurrency = max(1, int(os.getenv('WORKER_CONCURRENCY', '1')))
+        self.serper_slots = asyncio.Semaphore(SERPER_CONCURRENCY)
+        self.ollama_slots = {}
         
         # Test connections
         print(f"Worker initialized. Serper API: {bool(self.serper_api_key)}")
@@ -28,80 +65,237 @@ class CalmOpsWorker:
             print(f"Warning: Ollama not reachable: {e}")
     
     def run(self):
-        print("CalmOps Worker listening for tasks...")
-        while True:
-            try:
-                task_json = self.redis_client.brpop('nanika_queue', timeout=5)
-                if task_json:
-                    task = json.loads(task_json[1])
-                    print(f"Processing: {task['type']} - {task.get('week', 'N/A')}")
-                    
-                    # Route to appropriate task handler
-                    handlers = {
-                        'validate_problem': self.task1_validate_problem,
-                        'create_framework': self.task2_create_framework,
-                        'generate_landing': self.task3_generate_landing,
-                        'find_pilots': self.task4_find_pilots,
-                        'create_case_study': self.task5_create_case_study,
-                        'setup_operations': self.task6_setup_operations,
-                        'launch_content': self.task7_launch_content,
-                        'develop_referrals': self.task8_develop_referrals,
-                        'scale_outreach': self.task9_scale_outreach,
-                        'close_full_price': self.task10_close_full_price
-                    }
-                    
-                    handler = handlers.get(task['type'], self.unknown_task)
-                    result = handler(task)
-                    
-                    # Save result
-                    self.redis_client.setex(
-                        f"result:{task['id']}", 
-                        3600, 
-                        json.dumps(result)
-                    )
-                    print(f"Completed task {task['id']}")
-            except Exception as e:
-                print(f"Error: {e}")
-                time.sleep(5)
+        asyncio.run(self.run_async())
     
-    def search_companies(self, query):
-        """Common search function using Serper"""
-        headers = {
-            'X-API-KEY': self.serper_api_key,
-            'Content-Type': 'application/json'
-        }
+    async def run_async(self):
+        """Keep up to WORKER_CONCURRENCY tasks in flight at once.
         
-        response = requests.post(
-            'https://google.serper.dev/search',
-            headers=headers,
-            json={'q': query, 'num': 10},
-            timeout=30
+        On SIGTERM/SIGINT stop dequeuing, give in-flight tasks DRAIN_TIMEOUT
+        seconds, then requeue the rest with their checkpoints.
+        """
+        print(f"CalmOps Worker listening for tasks (concurrency={self.concurrency})...")
+        self.async_redis = aioredis.Redis(
+            host=os.getenv('REDIS_HOST', 'redis'),
+            port=6379,
+            decode_responses=True
+        )
+        # Results are stored in binary form (see result_codec.py)
+        self.result_redis = aioredis.Redis(
+            host=os.getenv('REDIS_HOST', 'redis'),
+            port=6379
         )
+        self.http = http_pool.get_async_client()
+        self.search_cache = AsyncSearchCache(self.result_redis)
+        self.search = AsyncSearchRouter(self.result_redis, self.serper_api_key, self.serper_slots)
+        self.search_flights = AsyncSingleFlight('serper', self.result_redis)
+        self.generate_flights = AsyncSingleFlight('ollama', self.result_redis)
+        self.prospects = AsyncProspectStore()
+        self.seen_validate = AsyncSeenFilter('validate', self.result_redis)
+        self.queue = AsyncTaskQueue(self.async_redis, 'nanika_queue')
+        self.status = TaskStatus(self.async_redis, 'nanika_queue')
+        keepalive = asyncio.create_task(self.queue.keepalive())
+        in_flight = set()
+        
+        stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stopping.set)
+        stop_wait = asyncio.create_task(stopping.wait())
         
-        if response.status_code == 200:
-            return response.json()
-        return None
+        try:
+            while not stopping.is_set():
+                # Only pull a task off the queue once there is a free slot for it
+                if len(in_flight) >= self.concurrency:
+                    await asyncio.wait(in_flight | {stop_wait}, return_when=asyncio.FIRST_COMPLETED)
+                    continue
+                try:
+                    item = await self.queue.pop(timeout=5)
+                except Exception as e:
+                    print(f"Error: {e}")
+                    await asyncio.sleep(5)
+                    continue
+                if not item:
+                    continue
+                
+                t = asyncio.create_task(self.process_task(item))
+                in_flight.add(t)
+                t.add_done_callback(in_flight.discard)
+        finally:
+            stop_wait.cancel()
+            if in_flight:
+                print(f"Draining {len(in_flight)} task(s), up to {DRAIN_TIMEOUT}s")
+                _, unfinished = await asyncio.wait(set(in_flight), timeout=DRAIN_TIMEOUT)
+                for t in unfinished:
+                    t.cancel()
+                await asyncio.gather(*unfinished, return_exceptions=True)
+            keepalive.cancel()
+            await http_pool.aclose_async_client()
+            await self.async_redis.aclose()
+            await self.result_redis.aclose()
+    
+    async def process_task(self, item):
+        task = item.task
+        progress = checkpoint.begin(task)
+        ledger = call_costs.begin()
+        try:
+            # A redelivered task may already have finished before its worker died
+            if item.redelivered and await self.result_redis.exists(result_key(task['id'])):
+                await self.queue.ack(item)
+                return
+            
+            print(f"Processing: {task['type']} - {task.get('week', 'N/A')}")
+            await self.status.set(task, item.lane, 'running')
+            await self.report_progress(task, f"started {task['type']}")
+            
+            # Route to appropriate task handler
+            handlers = {
+                'validate_problem': self.task1_validate_problem,
+                'create_framework': self.task2_create_framework,
+                'generate_landing': self.task3_generate_landing,
+                'find_pilots': self.task4_find_pilots,
+                'create_case_study': self.task5_create_case_study,
+                'setup_operations': self.task6_setup_operations,
+                'launch_content': self.task7_launch_content,
+                'develop_referrals': self.task8_develop_referrals,
+                'scale_outreach': self.task9_scale_outreach,
+                'close_full_price': self.task10_close_full_price
+            }
+            
+            handler = handlers.get(task['type'], self.unknown_task)
+            result = await handler(task)
+            result['external_calls'] = call_costs.summary(ledger)
+            await self.record_costs(task, ledger)
+            
+            await self.save_result(task, result)
+            await self.status.set(task, item.lane, 'failed' if 'error' in result else 'done')
+            await publish_event(self.async_redis, task['id'], 'done')
+            await self.queue.ack(item)
+            print(f"Completed task {task['id']}")
+        except asyncio.CancelledError:
+            # Drain deadline passed: hand the task and its partial progress back
+            await self.requeue_task(item, progress)
+            raise
+        except Exception as e:
+            print(f"Error processing task {task.get('id')}: {e}")
+            error_result = {'error': str(e), 'task_id': task.get('id'), 'external_calls': call_costs.summary(ledger)}
+            try:
+                await self.record_costs(task, ledger)
+                await self.save_result(task, error_result)
+                await self.status.set(task, item.lane, 'failed')
+                await publish_event(self.async_redis, task.get('id'), 'done')
+                await self.queue.ack(item)
+            except Exception as e:
+                print(f"Error saving failure for task {task.get('id')}: {e}")
+    
+    async def requeue_task(self, item, progress):
+        """Put a task cut off by a shutdown back on the queue with its checkpoint"""
+        try:
+            await self.queue.requeue(item, checkpoint.with_checkpoint(item.task, progress))
+            await self.status.set(item.task, item.lane, 'queued')
+            saved = sum(len(calls) for calls in progress.values())
+            print(f"Requeued task {item.task.get('id')} with {saved} checkpointed call(s)")
+        except Exception as e:
+            print(f"Could not requeue task {item.task.get('id')}: {e}")
+    
+    async def record_costs(self, task, ledger):
+        """Add the task's external calls to its handler's running totals"""
+        try:
+            await call_costs.flush(self.async_redis, task.get('type', 'unknown'), ledger)
+        except Exception as e:
+            print(f"Could not record call costs for {task.get('id')}: {e}")
+    
+    async def save_result(self, task, result):
+        """Compress the result (offloading large ones to disk) and store it with a TTL"""
+        payload = await asyncio.to_thread(encode_result, task['id'], result)
+        await self.result_redis.setex(result_key(task['id']), RESULT_TTL, payload)
     
-    def analyze_with_ollama(self, prompt, model="llama3.1:70b"):
+    async def report_progress(self, task, message):
+        """Push a progress event to anyone streaming this task"""
+        try:
+            await publish_event(self.async_redis, task['id'], 'progress', message=message)
+        except Exception as e:
+            print(f"Could not publish progress for {task['id']}: {e}")
+    
+    async def search_companies(self, query, profile='precise'):
+        """Common search function; 'bulk' sweeps prefer the free local engine"""
+        key = checkpoint.memo_key('serper', query, 10, profile)
+        cached = checkpoint.recall('search', key)
+        if cached is not None:
+            call_costs.saved('checkpoint')
+            return cached
+        cached = await self.search_cache.get(query, 10, profile=profile)
+        if cached is not None:
+            call_costs.saved('cache')
+            checkpoint.remember('search', key, cached)
+            return cached
+        
+        # Identical queries running on other tasks share one request
+        results = await self.search_flights.do(cache_key(query, 10, profile=profile), lambda: self._fetch_search(query, profile))
+        checkpoint.remember('search', key, results)
+        return results
+    
+    async def _fetch_search(self, query, profile):
+        """Search request for a query nobody else is fetching right now"""
+        try:
+            results = await self.search.search(query, 10, profile=profile)
+        except SearchError as e:
+            print(f"Search error: {e}")
+            return None
+        await self.search_cache.set(query, 10, None, None, results, profile)
+        return results
+    
+    def ollama_slot(self, model):
+        """Semaphore bounding concurrent generations on one Ollama model"""
+        if model not in self.ollama_slots:
+            limit = OLLAMA_MODEL_CONCURRENCY.get(model, OLLAMA_CONCURRENCY)
+            self.ollama_slots[model] = asyncio.Semaphore(max(1, limit))
+        return self.ollama_slots[model]
+    
+    async def analyze_with_ollama(self, prompt, model="llama3.1:70b"):
         """Use Ollama for analysis"""
+        key = checkpoint.memo_key(model, prompt)
+        cached = checkpoint.recall('generate', key)
+        if cached is not None:
+            call_costs.saved('checkpoint')
+            return cached
+        
         try:
-            response = requests.post(
-                f"{self.ollama_host}/api/generate",
-                json={
-                    "model": model,
-                    "prompt": prompt,
-                    "stream": False
-                },
-                timeout=120
-            )
-            if response.status_code == 200:
-                return response.json().get('response', '')
-            return "Analysis unavailable"
+            # Identical prompts running on other tasks share one generation
+            analysis = await self.generate_flights.do(key, lambda: self._generate(prompt, model))
         except Exception as e:
             return f"Analysis failed: {e}"
+        if analysis is None:
+            return "Analysis unavailable"
+        checkpoint.remember('generate', key, analysis)
+        return analysis
+    
+    async def _generate(self, prompt, model):
+        """Ollama generation for a prompt nobody else is running right now"""
+        async with self.ollama_slot(model):
+            started = time.monotonic()
+            try:
+                response = await self.http.post(
+                    f"{self.ollama_host}/api/generate",
+                    json={
+                        "model": model,
+                        "prompt": prompt,
+                        "stream": False
+                    },
+                    timeout=120
+                )
+            except Exception:
+                call_costs.record('generate', model, time.monotonic() - started, ok=False)
+                raise
+        seconds = time.monotonic() - started
+        if response.status_code == 200:
+            body = response.json()
+            call_costs.record('generate', model, seconds, len(response.content), tokens=body.get('eval_count', 0))
+            return body.get('response', '')
+        call_costs.record('generate', model, seconds, len(response.content), ok=False)
+        return None
     
     # TASK 1: Validate Problem (Week 1)
-    def task1_validate_problem(self, task):
+    async def task1_validate_problem(self, task):
         """Find 10 companies with workflow challenges"""
         market = task.get('market', 'new_york')
         
@@ -112,39 +306,46 @@ class CalmOpsWorker:
             f"creative agencies {market} scaling project management"
         ]
         
+        await self.report_progress(task, f"searching {len(queries)} queries in {market}")
+        search_results = await asyncio.gather(*[self.search_companies(query, 'bulk') for query in queries])
+        items = [item for results in search_results if results for item in results.get('organic', [])]
+        
         all_prospects = []
-        for query in queries:
-            results = self.search_companies(query)
-            if results:
-                for item in results.get('organic', []):
-                    snippet = item.get('snippet', '').lower()
-                    title = item.get('title', '')
-                    
-                    # Look for pain signals
-                    pain_signals = {
-                        'hiring': 'hiring' in snippet,
-                        'growing': 'growing' in snippet or 'growth' in snippet,
-                        'scaling': 'scaling' in snippet,
-                        'workflow': 'workflow' in snippet,
-                        'challenges': 'challenges' in snippet
-                    }
-                    
-                    if sum(pain_signals.values()) >= 2:
-                        all_prospects.append({
-                            'company': self.extract_company_name(title),
-                            'snippet': item.get('snippet'),
-                            'link': item.get('link'),
-                            'pain_signals': pain_signals,
-                            'pain_score': sum(pain_signals.values())
-                        })
+        for item in items:
+            title = item.get('title', '')
+            pain_signals = PAIN_SIGNALS.signals(item.get('snippet', ''))
+            
+            if sum(pain_signals.values()) >= 2:
+                all_prospects.append({
+                    'company': self.extract_company_name(title),
+                    'snippet': item.get('snippet'),
+                    'link': item.get('link'),
+                    'pain_signals': pain_signals,
+                    'pain_score': sum(pain_signals.values()),
+                    'score': sum(pain_signals.values()) / len(pain_signals),
+                    'market': market
+                })
+        
+        # Incremental runs leave out prospects an earlier run already handled
+        skipped = 0
+        incremental = task.get('incremental', SEARCH_INCREMENTAL)
+        if incremental:
+            fresh = await self.seen_validate.check(all_prospects)
+            skipped = len(all_prospects) - sum(fresh)
+            all_prospects = [prospect for prospect, new in zip(all_prospects, fresh) if new]
         
         # Sort by pain score
         all_prospects.sort(key=lambda x: x['pain_score'], reverse=True)
         top_10 = all_prospects[:10]
+        await self.prospects.upsert_prospects(all_prospects, 'validate_problem')
+        if incremental:
+            # Only the top 10 are returned, so the rest stay new for the next run
+            await self.seen_validate.mark(top_10)
         
         # Generate outreach messages with Ollama
-        outreach_messages = []
-        for prospect in top_10[:3]:  # Just top 3 for demo
+        await self.report_progress(task, f"{len(all_prospects)} prospects found, drafting outreach")
+        
+        async def draft_message(prospect):
             prompt = f"""
             Create a LinkedIn outreach message for this prospect:
             Company: {prospect['company']}
@@ -160,15 +361,19 @@ class CalmOpsWorker:
             Keep under 100 words.
             """
             
-            message = self.analyze_with_ollama(prompt)
-            outreach_messages.append({
+            message = await self.analyze_with_ollama(prompt)
+            return {
                 'company': prospect['company'],
                 'message': message
-            })
+            }
+        
+        # Generations queue on the model's slot, in top-10 order
+        outreach_messages = list(await asyncio.gather(*[draft_message(p) for p in top_10[:3]]))  # Just top 3 for demo
         
         return {
             'task': 'Week 1: Validate Problem',
             'prospects_found': len(all_prospects),
+            'skipped_seen': skipped,
             'top_10_prospects': top_10,
             'outreach_messages': outreach_messages,
             'success_metric': f"{len(top_10)}/10 prospects identified",
@@ -176,7 +381,7 @@ class CalmOpsWorker:
         }
     
     # TASK 2: Create MVP Framework (Week 1-2)
-    def task2_create_framework(self, task):
+    async def task2_create_framework(self, task):
         """Generate assessment framework documents"""
         prompt = """
         Create a simple 2-week workflow assessment framework for creative teams:
@@ -190,7 +395,7 @@ class CalmOpsWorker:
         Format as a practical framework that can be explained in 10 minutes.
         """
         
-        framework = self.analyze_with_ollama(prompt)
+        framework = await self.analyze_with_ollama(prompt)
         
         return {
             'task': 'Week 2: Create MVP Framework',
@@ -205,7 +410,7 @@ class CalmOpsWorker:
         }
     
     # TASK 3: Generate Landing Page (Week 2)
-    def task3_generate_landing(self, task):
+    async def task3_generate_landing(self, task):
         """Generate landing page copy and structure"""
         prompt = """
         Create landing page copy for CalmOps workflow consulting:
@@ -222,7 +427,7 @@ class CalmOpsWorker:
         Keep it concise and conversion-focused.
         """
         
-        landing_copy = self.analyze_with_ollama(prompt)
+        landing_copy = await self.analyze_with_ollama(prompt)
         
         return {
             'task': 'Week 2: Build Landing Page',
@@ -233,18 +438,23 @@ class CalmOpsWorker:
         }
     
     # TASK 4: Find Pilot Candidates (Week 2-3)
-    def task4_find_pilots(self, task):
+    async def task4_find_pilots(self, task):
         """Identify best pilot candidates from validated prospects"""
         prospects = task.get('validated_prospects', [])
         
+        if not prospects and reuse_cutoff():
+            # Earlier validation runs for the market, instead of new searches
+            prospects = await self.prospects.top_by_market(
+                task.get('market', 'new_york'), 10, seen_since=reuse_cutoff(), source='validate_problem'
+            )
+        
         if not prospects:
             # Search for them if not provided
-            validation_result = self.task1_validate_problem(task)
+            validation_result = await self.task1_validate_problem(task)
             prospects = validation_result.get('top_10_prospects', [])
         
         # Score for pilot fit
-        pilot_scores = []
-        for prospect in prospects[:5]:
+        async def score_prospect(prospect):
             prompt = f"""
             Score this company as a pilot candidate (0-10):
             {json.dumps(prospect, indent=2)}
@@ -258,12 +468,14 @@ class CalmOpsWorker:
             Return just a number 0-10 and brief reason.
             """
             
-            score_response = self.analyze_with_ollama(prompt)
-            pilot_scores.append({
+            score_response = await self.analyze_with_ollama(prompt)
+            return {
                 'company': prospect.get('company'),
                 'score': score_response,
                 'prospect_data': prospect
-            })
+            }
+        
+        pilot_scores = list(await asyncio.gather(*[score_prospect(p) for p in prospects[:5]]))
         
         # Generate pilot pitch
         pitch_template = """
@@ -286,7 +498,7 @@ class CalmOpsWorker:
         }
     
     # TASK 5: Create Case Study (Week 4)
-    def task5_create_case_study(self, task):
+    async def task5_create_case_study(self, task):
         """Generate case study from pilot results"""
         pilot_data = task.get('pilot_data', {
             'company': 'Example Agency',
@@ -309,7 +521,7 @@ class CalmOpsWorker:
         Make it compelling and specific.
         """
         
-        case_study = self.analyze_with_ollama(prompt)
+        case_study = await self.analyze_with_ollama(prompt)
         
         return {
             'task': 'Week 4: Create Case Study',
@@ -319,7 +531,7 @@ class CalmOpsWorker:
         }
     
     # TASK 6: Setup Operations (Week 3-4)
-    def task6_setup_operations(self, task):
+    async def task6_setup_operations(self, task):
         """Business operations checklist"""
         return {
             'task': 'Week 3-4: Setup Operations',
@@ -336,7 +548,7 @@ class CalmOpsWorker:
         }
     
     # TASK 7: Launch Content Marketing (Week 4-5)
-    def task7_launch_content(self, task):
+    async def task7_launch_content(self, task):
         """Generate content marketing pieces"""
         case_study = task.get('case_study', 'Recent pilot showed 30% improvement')
         
@@ -350,7 +562,7 @@ class CalmOpsWorker:
         - Include a hook and call to action
         """
         
-        content_ideas = self.analyze_with_ollama(prompt)
+        content_ideas = await self.analyze_with_ollama(prompt)
         
         return {
             'task': 'Week 4-5: Launch Content',
@@ -364,7 +576,7 @@ class CalmOpsWorker:
         }
     
     # TASK 8: Develop Referral System (Week 5)
-    def task8_develop_referrals(self, task):
+    async def task8_develop_referrals(self, task):
         """Create referral program materials"""
         prompt = """
         Create a simple referral program for CalmOps:
@@ -376,7 +588,7 @@ class CalmOpsWorker:
         Keep it simple and easy to execute.
         """
         
-        referral_program = self.analyze_with_ollama(prompt)
+        referral_program = await self.analyze_with_ollama(prompt)
         
         return {
             'task': 'Week 5: Develop Referrals',
@@ -386,25 +598,53 @@ class CalmOpsWorker:
         }
     
     # TASK 9: Scale Outreach (Week 5-6)
-    def task9_scale_outreach(self, task):
+    async def task9_scale_outreach(self, task):
         """Find 50 target companies for outreach"""
         markets = task.get('markets', ['new_york', 'new_jersey', 'south_florida', 'los_angeles'])
         
-        all_targets = []
-        for market in markets:
-            query = f"creative agencies {market} 50-200 employees marketing teams"
-            results = self.search_companies(query)
-            
+        # Markets with enough recent targets on record are not searched again
+        stored = {}
+        cutoff = reuse_cutoff()
+        if cutoff:
+            found = await asyncio.gather(*[
+                self.prospects.top_by_market(market, 50, seen_since=cutoff, source='scale_outreach')
+                for market in markets
+            ])
+            stored = {market: targets for market, targets in zip(markets, found) if len(targets) >= TARGET_REUSE_MIN}
+        to_search = [market for market in markets if market not in stored]
+        
+        await self.report_progress(task, f"searching {len(to_search)} markets, {len(stored)} on record")
+        search_results = await asyncio.gather(*[
+            self.search_companies(f"creative agencies {market} 50-200 employees marketing teams", 'bulk')
+            for market in to_search
+        ])
+        
+        found_targets = []
+        for market, results in zip(to_search, search_results):
             if results:
                 for item in results.get('organic', []):
-                    all_targets.append({
+                    found_targets.append({
                         'company': self.extract_company_name(item.get('title', '')),
                         'market': market,
                         'link': item.get('link'),
                         'snippet': item.get('snippet', '')
                     })
+        await self.prospects.upsert_prospects(found_targets, 'scale_outreach')
+        
+        all_targets = []
+        for market in markets:
+            if market in stored:
+                all_targets.extend({
+                    'company': target['company'],
+                    'market': market,
+                    'link': target.get('link'),
+                    'snippet': target.get('snippet', '')
+                } for target in stored[market])
+            else:
+                all_targets.extend(target for target in found_targets if target['market'] == market)
         
         # Generate outreach sequence
+        await self.report_progress(task, f"{len(all_targets)} targets found, drafting outreach sequence")
         prompt = """
         Create a 3-touch outreach sequence:
         1. Initial LinkedIn message
@@ -414,7 +654,7 @@ class CalmOpsWorker:
         Reference case study results. Keep each under 100 words.
         """
         
-        outreach_sequence = self.analyze_with_ollama(prompt)
+        outreach_sequence = await self.analyze_with_ollama(prompt)
         
         return {
             'task': 'Week 5-6: Scale Outreach',
@@ -426,7 +666,7 @@ class CalmOpsWorker:
         }
     
     # TASK 10: Close Full Price Clients (Week 6-7)
-    def task10_close_full_price(self, task):
+    async def task10_close_full_price(self, task):
         """Generate sales materials for full-price offering"""
         prompt = """
         Create a sales pitch for $8,500 CalmOps assessment:
@@ -441,7 +681,7 @@ class CalmOpsWorker:
         Use case study as social proof.
         """
         
-        sales_pitch = self.analyze_with_ollama(prompt)
+        sales_pitch = await self.analyze_with_ollama(prompt)
         
         return {
             'task': 'Week 6-7: Close Full Price',
@@ -458,7 +698,7 @@ class CalmOpsWorker:
             title = title.replace(suffix, '')
         return title.split('-')[0].split('|')[0].strip()
     
-    def unknown_task(self, task):
+    async def unknown_task(self, task):
         return {'error': f"Unknown task type: {task.get('type')}"}
 
 if __name__ == "__main__":
@@ -6,6 +6,9 @@ import httpx
 import redis
 import pathlib
 import datetime
+from task_queue import TaskQueue
+import checkpoint
+from checkpoint import DrainTimeout, GracefulDrain
 
 REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
 OLLAMA = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
@@ -13,6 +16,7 @@ ART_DIR = pathlib.Path("/app/artifacts")
 
 ART_DIR.mkdir(parents=True, exist_ok=True)
 r = redis.Redis.from_url(REDIS_URL)
+queue = TaskQueue(r, "nanika:tasks")
 
 def call_ollama(model: str, prompt: str, timeout_s: int = 120) -> str:
     body = {"model": model, "prompt": prompt, "stream": False}
@@ -30,41 +34,61 @@ def save_artifact(text: str, name: str) -> str:
     return str(path)
 
 # Simple worker loop
-while True:
-    try:
-        item = r.brpop("nanika:tasks", timeout=5)
-        if not item:
-            continue
+queue.start_keepalive()
+drain = GracefulDrain()
+item, progress = None, None
+try:
+    while not drain.stopping:
+        item = None
+        try:
+            item = queue.pop(timeout=5)
+            if not item:
+                continue
 
-        _, raw = item
-        task = json.loads(raw)
+            task = item.task
 
-        intent = task.get("intent", "")
-        instruction = task.get("instruction", "")
-        request_id = task.get("request_id", "")
+            intent = task.get("intent", "")
+            instruction = task.get("instruction", "")
+            request_id = task.get("request_id", "")
         
-        # Simple prompt
-        prompt = f"""you are nanika. minimal, lowercase, direct.
+            # Simple prompt
+            prompt = f"""you are nanika. minimal, lowercase, direct.
 
 task: {instruction}
 
 be specific and actionable. no fluff."""
 
-        answer = call_ollama("llama3.1:70b-instruct-q4_K_M", prompt)
+            answer = call_ollama("llama3.1:70b-instruct-q4_K_M", prompt)
         
-        # Save
-        timestamp = datetime.datetime.now().strftime("%H%M%S")
-        artifact_path = save_artifact(answer, f"{intent}_{timestamp}")
+            # Save
+            timestamp = datetime.datetime.now().strftime("%H%M%S")
+            artifact_path = save_artifact(answer, f"{intent}_{timestamp}")
         
-        print(f"[saved] {artifact_path}")
-        print(f"[response preview] {answer[:200]}...")
+            print(f"[saved] {artifact_path}")
+            print(f"[response preview] {answer[:200]}...")
         
-        # Save for UI
-        if request_id:
-            response_key = f"nanika:response:{request_id}"
-            r.setex(response_key, 300, json.dumps({"text": answer}))
+            # Save for UI
+            if request_id:
+                response_key = f"nanika:response:{request_id}"
+                r.setex(response_key, 300, json.dumps({"text": answer}))
 
-    except Exception as e:
-        print(f"[error] {e}")
+            queue.ack(item)
+            item = None
+
+        except Exception as e:
+            print(f"[error] {e}")
+            if item:
+                try:
+                    queue.ack(item)
+                except Exception as e:
+                    print(f"[error] ack failed: {e}")
+            item = None
     
-    time.sleep(0.2)
+        time.sleep(0.2)
+except DrainTimeout:
+    # Shutdown deadline hit mid-task: put it back for the next worker
+    if item:
+        queue.requeue(item, checkpoint.with_checkpoint(item.task, progress))
+        print(f"[requeued] {item.task.get('intent', 'task')}")
+finally:
+    drain.done()
@@ -5,43 +5,38 @@ import httpx
 import redis
 import pathlib
 import datetime
-from urllib.parse import quote
+from task_queue import TaskQueue
+import checkpoint
+from checkpoint import DrainTimeout, GracefulDrain
+from search_backends import SearchRouter, SearchError
 
 REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
 OLLAMA = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
 ART_DIR = pathlib.Path("/app/artifacts")
 
 r = redis.Redis.from_url(REDIS_URL)
+queue = TaskQueue(r, "nanika:tasks")
+search = SearchRouter(r)
 
 def search_web(query: str) -> str:
-    """Search using DuckDuckGo HTML version (no API key needed)"""
+    """Search the free backends first (local SearxNG, then DuckDuckGo)"""
+    key = checkpoint.memo_key('web', query)
+    cached = checkpoint.recall('search', key)
+    if cached is not None:
+        return cached
+    
     print(f"[web search] {query}")
     try:
-        with httpx.Client(follow_redirects=True) as client:
-            # Use DuckDuckGo HTML version
-            response = client.get(
-                f"https://html.duckduckgo.com/html/?q={quote(query)}",
-                headers={"User-Agent": "Mozilla/5.0"}
-            )
-            
-            if response.status_code == 200:
-                # Basic extraction - you'd want to parse this better
-                text = response.text
-                # Extract result snippets (quick and dirty)
-                results = []
-                lines = text.split('\n')
-                for i, line in enumerate(lines):
-                    if 'result__snippet' in line and i+1 < len(lines):
-                        snippet = lines[i+1].strip().replace('<b>', '').replace('</b>', '')
-                        if snippet and len(snippet) > 20:
-                            results.append(snippet)
-                
-                if results:
-                    return f"Search results for '{query}':\n" + "\n".join(results[:5])
-            
-        return f"No results found for: {query}"
-    except Exception as e:
+        results = search.search(query, 5, profile='bulk')
+    except SearchError as e:
         return f"Search failed: {e}"
+    
+    snippets = [item['snippet'] for item in results.get('organic', []) if len(item.get('snippet', '')) > 20]
+    if not snippets:
+        return f"No results found for: {query}"
+    found = f"Search results for '{query}':\n" + "\n".join(snippets[:5])
+    checkpoint.remember('search', key, found)
+    return found
 
 def scrape_url(url: str) -> str:
     """Scrape content from a URL"""
@@ -81,36 +76,41 @@ def save_artifact(text: str, name: str) -> str:
 
 print("[nanika] あい - ready with web access")
 
-while True:
-    try:
-        item = r.brpop("nanika:tasks", timeout=5)
-        if not item:
-            continue
+queue.start_keepalive()
+drain = GracefulDrain()
+item, progress = None, None
+try:
+    while not drain.stopping:
+        item = None
+        try:
+            item = queue.pop(timeout=5)
+            if not item:
+                continue
             
-        _, raw = item
-        task = json.loads(raw)
-        instruction = task.get('instruction', '')
+            task = item.task
+            progress = checkpoint.begin(task)
+            instruction = task.get('instruction', '')
         
-        print(f"[task] {instruction[:50]}...")
+            print(f"[task] {instruction[:50]}...")
         
-        # Check if this needs web search
-        needs_search = any(word in instruction.lower() for word in [
-            'real', 'actual', 'find', 'search', 'companies', 'website', 
-            'research', 'identify', 'current', 'latest'
-        ])
+            # Check if this needs web search
+            needs_search = any(word in instruction.lower() for word in [
+                'real', 'actual', 'find', 'search', 'companies', 'website', 
+                'research', 'identify', 'current', 'latest'
+            ])
         
-        web_context = ""
-        if needs_search:
-            # Extract what to search for
-            if 'companies' in instruction.lower():
-                search_query = "creative agencies 50-200 employees creative director"
-                web_context = search_web(search_query)
+            web_context = ""
+            if needs_search:
+                # Extract what to search for
+                if 'companies' in instruction.lower():
+                    search_query = "creative agencies 50-200 employees creative director"
+                    web_context = search_web(search_query)
                 
-                # Try another search for more specific results
-                search_query2 = "mid-size creative agencies workflow problems"
-                web_context += "\n\n" + search_web(search_query2)
+                    # Try another search for more specific results
+                    search_query2 = "mid-size creative agencies workflow problems"
+                    web_context += "\n\n" + search_web(search_query2)
         
-        prompt = f"""you are nanika. you have web access. never hallucinate.
+            prompt = f"""you are nanika. you have web access. never hallucinate.
 
 web search results:
 {web_context if web_context else "no web search performed"}
@@ -122,15 +122,31 @@ if you cannot find real information, say "cannot find real data for this request
 never make up company names or data.
 be minimal and direct. lowercase."""
 
-        answer = call_ollama("llama3.1:70b-instruct-q4_K_M", prompt)
+            answer = call_ollama("llama3.1:70b-instruct-q4_K_M", prompt)
+        
+            path = save_artifact(answer, task.get('intent', 'task'))
+            print(f"[saved] {path}")
         
-        path = save_artifact(answer, task.get('intent', 'task'))
-        print(f"[saved] {path}")
+            if task.get('request_id'):
+                r.setex(f"nanika:response:{task['request_id']}", 300, json.dumps({"text": answer}))
         
-        if task.get('request_id'):
-            r.setex(f"nanika:response:{task['request_id']}", 300, json.dumps({"text": answer}))
+            queue.ack(item)
+            item = None
             
-    except Exception as e:
-        print(f"[error] {e}")
+        except Exception as e:
+            print(f"[error] {e}")
+            if item:
+                try:
+                    queue.ack(item)
+                except Exception as e:
+                    print(f"[error] ack failed: {e}")
+            item = None
     
-    time.sleep(0.5)
+        time.sleep(0.5)
+except DrainTimeout:
+    # Shutdown deadline hit mid-task: put it back for the next worker
+    if item:
+        queue.requeue(item, checkpoint.with_checkpoint(item.task, progress))
+        print(f"[requeued] {item.task.get('intent', 'task')}")
+finally:
+    drain.done()
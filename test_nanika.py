@@ -1,6 +1,5 @@
 import requests
 import json
-import time
 
 BASE_URL = "http://localhost:8000"
 
@@ -18,10 +17,16 @@ def test_nanika():
     
     task_id = validation.json()['task_id']
     
-    # Check result after a few seconds
-    time.sleep(5)
-    result = requests.get(f"{BASE_URL}/task/{task_id}")
-    print(f"Result: {json.dumps(result.json(), indent=2)}")
+    # Follow progress until the worker pushes the result
+    with requests.get(f"{BASE_URL}/tasks/stream", params={"ids": task_id}, stream=True) as stream:
+        for line in stream.iter_lines(decode_unicode=True):
+            if not line.startswith("data: "):
+                continue
+            event = json.loads(line[len("data: "):])
+            if event["event"] == "done":
+                print(f"Result: {json.dumps(event['result'], indent=2)}")
+            else:
+                print(f"Progress: {event.get('message')}")
 
 if __name__ == "__main__":
     test_nanika()
\ No newline at end of file